@@ -4,17 +4,20 @@ from admin_auto_filters.filters import AutocompleteFilterFactory
 from dateutil.relativedelta import MO, relativedelta
 from django.contrib import admin
 from django.contrib.admin import SimpleListFilter
+from django.contrib.auth import get_user_model
 from django.db.models import Count
-from django.db.models.functions import Concat, Length
+from django.db.models.functions import Concat
 from django.utils import timezone
 
 from .models import (
+    ExportManifestEntry,
     ExternalInvitation,
     ExternalInvitationMessage,
     ExternalNomination,
     ExternalUser,
     ExternalUserToken,
     Nomination,
+    NominationSummary,
     ReviewerRole,
     ReviewForm,
     ReviewFormQuestion,
@@ -24,6 +27,27 @@ from .models import (
     StageCode,
 )
 from .util.email_sender import invite_personal_message, send_invite_email
+from .workflow import schedule_default_stages
+
+User = get_user_model()
+
+
+def with_profiles(*users):
+    """
+    The select_related lookups for the users, including their profiles when the resourcing
+    app provides them.
+    """
+    if hasattr(User, "profile"):
+        return tuple(f"{user}__profile" for user in users)
+    return users
+
+
+def answered(nomination):
+    """
+    The number of answered questions of a nomination, from its summary.
+    """
+    summary = getattr(nomination, "summary", None)
+    return summary.answered if summary else 0
 
 
 class ReviewStageInline(admin.StackedInline):
@@ -82,18 +106,20 @@ class ReviewPeriodAdmin(admin.ModelAdmin):
 
     @admin.action(description="Add default stages")
     def add_default_stages(self, request, queryset):
-        for period in queryset:
-            period.add_default_stages()
+        added = schedule_default_stages(queryset)
+        self.message_user(request, f"Added {added} stages")
 
     @admin.action(description="Add forms")
     def add_forms(self, request, queryset):
         for period in queryset:
-            period.add_forms()
+            diff = period.add_forms()
+            self.message_user(request, f"{period}: {diff}")
 
     @admin.action(description="Nominate Line Managers")
     def nominate_line_managers(self, request, queryset):
         for period in queryset:
-            period.nominate_line_managers()
+            result = period.nominate_line_managers()
+            self.message_user(request, f"{period}: {result}")
 
 
 class PeriodFilter(SimpleListFilter):
@@ -127,19 +153,16 @@ class NominationAdmin(admin.ModelAdmin):
         "role",
     )
     search_fields = ("reviewee__email", "reviewer__email", "external_email")
+    list_select_related = ("period", "summary") + with_profiles("reviewer", "reviewee")
 
     def desc(self, obj):
         return str(obj)
 
     def get_responses(self, obj):
-        return obj.response_count
+        return answered(obj)
 
-    get_responses.short_description = "Response Count"
-    get_responses.admin_order_field = "response_count"
-
-    def get_queryset(self, request):
-        qs = super(NominationAdmin, self).get_queryset(request)
-        return qs.annotate(response_count=Count("responses"))
+    get_responses.short_description = "Answered"
+    get_responses.admin_order_field = "summary__answered"
 
 
 class ReviewFormQuestionInline(admin.TabularInline):
@@ -178,6 +201,11 @@ class ReviewFormResponseAdmin(admin.ModelAdmin):
         "nomination__invitation__user__email",
     )
     readonly_fields = ("nomination", "question")
+    list_select_related = (
+        "question__form",
+        "nomination__period",
+        "nomination__invitation__user",
+    ) + with_profiles("nomination__reviewer", "nomination__reviewee")
 
     def get_review_form(self, obj):
         return obj.question.form.title
@@ -223,9 +251,13 @@ class ReviewFormResponseAdmin(admin.ModelAdmin):
     period.admin_order_field = "nomination__period"
 
     def answer_length(self, obj):
-        return f"{len(obj.value)}"
+        return f"{obj.value_length}"
+
+    answer_length.admin_order_field = "value_length"
 
-    answer_length.admin_order_field = Length("value")
+    def get_queryset(self, request):
+        # The answers themselves aren't shown, and can be long
+        return super().get_queryset(request).defer("value")
 
 
 @admin.register(ExternalUser)
@@ -267,10 +299,50 @@ class ExternalInvitationMessageAdmin(admin.ModelAdmin):
 
 @admin.register(ExternalUserToken)
 class ExternalUserTokenAdmin(admin.ModelAdmin):
-    list_display = ("email", "short_secret", "expiry", "redeemed", "client_ip")
+    list_display = ("email", "short_secret_hash", "expiry", "redeemed", "client_ip")
 
-    def short_secret(self, obj):
-        return f"{obj.secret[:10]}..."
+    def short_secret_hash(self, obj):
+        return f"{obj.secret_hash[:10]}..."
+
+
+@admin.register(NominationSummary)
+class NominationSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        "nomination",
+        "period",
+        "role",
+        "status",
+        "answered",
+        "questions",
+        "words",
+        "last_modified",
+    )
+    list_filter = (PeriodFilter, "status", "role")
+    list_select_related = ("period",) + with_profiles(
+        "nomination__reviewer", "nomination__reviewee"
+    )
+    readonly_fields = (
+        "nomination",
+        "period",
+        "role",
+        "questions",
+        "answered",
+        "words",
+        "first_modified",
+        "last_modified",
+        "status",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ExportManifestEntry)
+class ExportManifestEntryAdmin(admin.ModelAdmin):
+    list_display = ("nomination", "target", "exported", "content_hash")
+    list_filter = ("target",)
+    list_select_related = ("nomination",)
+    autocomplete_fields = ("nomination",)
 
 
 def create_invitation(modeladmin, request, queryset):
@@ -313,6 +385,9 @@ class ExternalNominationAdmin(admin.ModelAdmin):
     )
     search_fields = ("external_email", "reviewee__username", "invitation__user__email")
     actions = [create_invitation, send_invitation]
+    list_select_related = ("period", "invitation__user", "summary") + with_profiles(
+        "reviewee"
+    )
 
     def desc(self, obj):
         return str(obj)
@@ -325,9 +400,10 @@ class ExternalNominationAdmin(admin.ModelAdmin):
 
     def get_invitation_message_count(self, obj):
         if obj.invitation:
-            return obj.invitation.messages.count()
+            return obj.message_count
 
     get_invitation_message_count.short_description = "Messages Sent"
+    get_invitation_message_count.admin_order_field = "message_count"
 
     def get_invitation_user(self, obj):
         if obj.invitation and obj.invitation.user:
@@ -336,10 +412,10 @@ class ExternalNominationAdmin(admin.ModelAdmin):
     get_invitation_user.short_description = "Invitation Accepted"
 
     def get_responses(self, obj):
-        return obj.response_count
+        return answered(obj)
 
-    get_responses.short_description = "Response Count"
-    get_responses.admin_order_field = "response_count"
+    get_responses.short_description = "Answered"
+    get_responses.admin_order_field = "summary__answered"
 
     def get_queryset(self, request):
         qs = (
@@ -347,4 +423,4 @@ class ExternalNominationAdmin(admin.ModelAdmin):
             .get_queryset(request)
             .filter(role=ReviewerRole.EXTERNAL)
         )
-        return qs.annotate(response_count=Count("responses"))
+        return qs.annotate(message_count=Count("invitation__messages"))
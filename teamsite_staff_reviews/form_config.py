@@ -0,0 +1,238 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+import yaml
+from django.conf import settings
+
+from . import fixtures
+from .models import ReviewerRole, ReviewRound
+from .util.files import private_directory
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FORMS = Path(fixtures.__file__).parent / "current-questions.yml"
+
+# Bump when the definitions change shape, so that old pickles are ignored
+CACHE_VERSION = 1
+
+
+class FormConfigError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class QuestionDefinition:
+    title: str
+    description: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class FormDefinition:
+    role: str
+    title: str
+    description: Optional[str]
+    questions: Tuple[QuestionDefinition, ...]
+
+
+@dataclass(frozen=True)
+class FormConfig:
+    """
+    A validated form configuration: the forms of a period and their questions, in order.
+    The year and period are only given in the files for a specific period.
+    """
+
+    forms: Tuple[FormDefinition, ...]
+    year: Optional[int] = None
+    period: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data, source="configuration") -> "FormConfig":
+        """
+        Validates a parsed configuration, raising FormConfigError for the first problem.
+
+        :param source: Where the configuration came from, for the error messages
+        """
+
+        def check(condition, message):
+            if not condition:
+                raise FormConfigError(f"{source}: {message}")
+
+        def optional_text(data, key, where):
+            value = data.get(key)
+            check(value is None or isinstance(value, str), f"{where}{key} must be text")
+            return value
+
+        check(isinstance(data, Mapping), "must be a mapping")
+        check(isinstance(data.get("forms"), list), "forms must be a list")
+        year, period = data.get("year"), data.get("period")
+        check(year is None or isinstance(year, int), "year must be a number")
+        check(
+            period is None or period in ReviewRound.values,
+            f"period must be one of {', '.join(ReviewRound.values)}",
+        )
+
+        forms = []
+        for ix, formdata in enumerate(data["forms"]):
+            where = f"forms[{ix}]."
+            check(isinstance(formdata, Mapping), f"{where} must be a mapping")
+            role = formdata.get("role")
+            check(
+                role in ReviewerRole.values,
+                f"{where}role must be one of {', '.join(ReviewerRole.values)}",
+            )
+            check(
+                role not in {f.role for f in forms}, f"{where}role {role} is repeated"
+            )
+            form_title = formdata.get("title")
+            check(
+                isinstance(form_title, str) and form_title, f"{where}title is required"
+            )
+            check(
+                isinstance(formdata.get("questions"), list),
+                f"{where}questions must be a list",
+            )
+
+            questions = []
+            for qx, questiondata in enumerate(formdata["questions"]):
+                qwhere = f"{where}questions[{qx}]."
+                check(isinstance(questiondata, Mapping), f"{qwhere} must be a mapping")
+                title = questiondata.get("title")
+                check(isinstance(title, str) and title, f"{qwhere}title is required")
+                questions.append(
+                    QuestionDefinition(
+                        title, optional_text(questiondata, "description", qwhere)
+                    )
+                )
+
+            forms.append(
+                FormDefinition(
+                    role,
+                    form_title,
+                    optional_text(formdata, "description", where),
+                    tuple(questions),
+                )
+            )
+
+        return cls(tuple(forms), year, period)
+
+
+class FormConfigRegistry:
+    """
+    Loads form configuration files once. Definitions are kept in memory by path and
+    modification time, and pickled to a cache directory so that other processes don't have
+    to parse the YAML again. A file is reloaded when it changes.
+
+    Unpickling runs code from the cache, so with private the cache directory is created
+    readable only by this user when first used, and the disk cache is turned off if anyone
+    else owns it or can write to it.
+
+    :param cache_dir: The directory for the pickles, or None for no disk cache
+    :param private: Check that the cache directory is private to this user
+    """
+
+    def __init__(self, cache_dir: Union[str, Path, None] = None, private=False):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.__checked = not private
+        self.__configs: Dict[Path, Tuple[int, FormConfig]] = {}
+
+    def get(self, path: Union[str, Path, None] = None) -> FormConfig:
+        """
+        :param path: The configuration file, by default the current questions
+        """
+        path = Path(path or DEFAULT_FORMS).resolve()
+        mtime = path.stat().st_mtime_ns
+        cached = self.__configs.get(path)
+        if cached is None or cached[0] != mtime:
+            config = self.__read_cache(path, mtime)
+            if config is None:
+                config = self.__parse(path)
+                self.__write_cache(path, mtime, config)
+            self.__configs[path] = mtime, config
+        return self.__configs[path][1]
+
+    def clear(self):
+        self.__configs.clear()
+
+    @staticmethod
+    def __parse(path: Path) -> FormConfig:
+        with open(path) as FILE:
+            data = yaml.safe_load(FILE)
+        return FormConfig.from_dict(data, source=str(path))
+
+    def __cache_file(self, path: Path) -> Optional[Path]:
+        if not self.__checked:
+            self.cache_dir = private_directory(self.cache_dir)
+            self.__checked = True
+        if self.cache_dir is None:
+            return None
+        name = hashlib.sha1(str(path).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{name}.pickle"
+
+    def __read_cache(self, path: Path, mtime: int) -> Optional[FormConfig]:
+        cache_file = self.__cache_file(path)
+        if cache_file is None or not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, "rb") as FILE:
+                version, cached_path, cached_mtime, config = pickle.load(FILE)
+        except Exception:
+            log.warning(f"Ignoring unreadable form cache {cache_file}", exc_info=True)
+            return None
+        if (version, cached_path, cached_mtime) != (CACHE_VERSION, str(path), mtime):
+            return None
+        return config
+
+    def __write_cache(self, path: Path, mtime: int, config: FormConfig):
+        cache_file = self.__cache_file(path)
+        if cache_file is None:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # Written to a temporary file first so other processes never read half a pickle
+            fd, temp_name = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as FILE:
+                pickle.dump((CACHE_VERSION, str(path), mtime, config), FILE)
+            os.replace(temp_name, cache_file)
+        except OSError:
+            log.warning(f"Could not write form cache {cache_file}", exc_info=True)
+
+
+def default_registry() -> FormConfigRegistry:
+    """
+    A registry caching to STAFF_REVIEWS_FORM_CACHE_DIR if it is set, or else to a private
+    directory in the project's BASE_DIR. Without either, configurations are only cached in
+    memory.
+    """
+    cache_dir = getattr(settings, "STAFF_REVIEWS_FORM_CACHE_DIR", None)
+    if cache_dir is not None:
+        return FormConfigRegistry(cache_dir)
+    base_dir = getattr(settings, "BASE_DIR", None)
+    if base_dir is None:
+        return FormConfigRegistry()
+    return FormConfigRegistry(
+        Path(base_dir) / ".cache" / "staff-reviews-forms", private=True
+    )
+
+
+registry = default_registry()
+
+
+def get_form_config(configuration=None) -> FormConfig:
+    """
+    The form configuration to import, from the registry unless it has already been loaded.
+
+    :param configuration: A FormConfig, a parsed configuration or a file, by default the
+        current questions
+    """
+    if isinstance(configuration, FormConfig):
+        return configuration
+    elif isinstance(configuration, Mapping):
+        return FormConfig.from_dict(configuration)
+    else:
+        return registry.get(configuration)
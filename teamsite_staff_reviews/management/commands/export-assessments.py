@@ -1,10 +1,8 @@
 from django.core.management import BaseCommand
-from reviews.models import Nomination, ReviewerRole, ReviewPeriod, User
-from reviews.reports.review_export.exporter import (
-    __export_nominations,
-    export_all_assessments,
+
+from teamsite_staff_reviews.models import ReviewerRole, ReviewPeriod, User
+from teamsite_staff_reviews.reports.review_export.exporter import (
     export_by_reviewee,
-    export_nominations,
     save_to_fs,
     save_to_sharepoint,
 )
@@ -18,8 +16,9 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("location", type=str, default="sharepoint:feedback:")
         parser.add_argument("--user", "-u", type=str, nargs="?")
+        parser.add_argument("--workers", "-w", type=int, default=None)
 
-    def handle(self, *args, location, user, **options):
+    def handle(self, *args, location, user, workers, **options):
         period = ReviewPeriod.objects.get_current()
         if period is None:
             print("No current review cycle found")
@@ -35,4 +34,10 @@ class Command(BaseCommand):
         else:
             saver = save_to_fs(location)
 
-        export_all_assessments(saver, **query)
+        export_by_reviewee(
+            saver,
+            task_name="assessments",
+            workers=workers,
+            role=ReviewerRole.ASSESSMENT_PT_1,
+            **query,
+        )
@@ -1,14 +1,19 @@
-from pathlib import Path
-from tempfile import TemporaryDirectory
+from contextlib import nullcontext
 
 import requests
 from django.core.management import BaseCommand
 from django.db.models import Q
 from office365.api.auth import get_token
 from office365.api.sharepoint import API_URL
-from reviews.models import Nomination, ReviewerRole, ReviewPeriod, User
-from reviews.util.word_export.assessment_pt2 import AssessmentDocumentPart2
-from reviews.util.word_export.review import ReviewDocument
+
+from teamsite_staff_reviews.models import Nomination, ReviewerRole, ReviewPeriod, User
+from teamsite_staff_reviews.reports.review_export.planner import ExportPlan
+from teamsite_staff_reviews.util.upload import UploadQueue, sharepoint_uploader
+from teamsite_staff_reviews.util.word_export.assessment_pt2 import (
+    AssessmentDocumentPart2,
+)
+from teamsite_staff_reviews.util.word_export.review import ReviewDocument
+from teamsite_staff_reviews.util.word_export.snapshot import ExportSnapshot
 
 
 class Command(BaseCommand):
@@ -22,6 +27,14 @@ class Command(BaseCommand):
         parser.add_argument("--line-manager", "-lm", action="store_true")
         parser.add_argument("--feedback-given", "-fg", action="store_true")
         parser.add_argument("--print-folder", "-pf", action="store_true")
+        parser.add_argument("--workers", "-w", type=int, default=None)
+        parser.add_argument(
+            "--concurrent-uploads",
+            "-c",
+            type=int,
+            default=None,
+            help="Upload this many files at once in the background",
+        )
 
     def handle(
         self,
@@ -31,6 +44,8 @@ class Command(BaseCommand):
         feedback_given,
         users_resume_from,
         print_folder,
+        workers,
+        concurrent_uploads,
         **options,
     ):
         period = ReviewPeriod.objects.get_current()
@@ -46,11 +61,18 @@ class Command(BaseCommand):
         if print_folder:
             print_folder_link(period, users)
 
+        uploads = []
         if line_manager:
-            upload_line_manager_files(period, users)
-
+            uploads += line_manager_files(period, users)
         if feedback_given:
-            upload_feedback_provided(period, users)
+            uploads += feedback_provided_files(period, users)
+
+        queue = UploadQueue(concurrent_uploads) if concurrent_uploads else None
+        with queue or nullcontext():
+            render_and_upload(uploads, workers=workers, queue=queue)
+
+        if queue is not None:
+            print(queue.summary())
 
 
 def print_folder_link(period, users):
@@ -68,40 +90,54 @@ def print_folder_link(period, users):
         print(user.profile.short_name, data.get("webUrl"))
 
 
-def upload_file(
-    user, filename, bytes, content_type="application/binary", access_token=None
-):
-    if len(bytes) / 1024**2 > 4:
-        raise Exception("Large file upload not currently implemented")
-
-    if access_token is None:
-        access_token = get_token()
-
-    params = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": content_type,
-    }
-    response = requests.put(
-        f"{API_URL}/users/{user.email}/drive/special/documents:/HR Matters/{filename}:/content",
-        headers=params,
-        data=bytes,
+def hr_matters_url(user, filename):
+    return (
+        f"{API_URL}/users/{user.email}/drive/special/documents:/HR Matters/{filename}"
     )
-    response.raise_for_status()
-    return response.json()
 
 
-def save_file_to_sharepoint(path, owner_user, filename):
-    access_token = get_token()
+def save_file_to_sharepoint(uploader, source, owner_user, filename):
     print(owner_user.email, filename)
     try:
-        with open(path, "rb") as FILE:
-            data = FILE.read()
-            upload_file(owner_user, filename, data, access_token=access_token)
+        uploader.upload(source, hr_matters_url(owner_user, filename))
     except Exception as e:
         print(" ** FAILED TO UPLOAD", e)
 
 
-def upload_line_manager_files(period, users=None):
+def render_and_upload(uploads, workers=None, queue=None):
+    """
+    Renders the (document class, nomination, owner, filename) uploads, possibly in parallel,
+    and uploads each document to its owner's drive as it is rendered, or in the background
+    with a queue. Each nomination is rendered once, however many owners it is uploaded to.
+    """
+    snapshot = ExportSnapshot(
+        Nomination.objects.filter(pk__in={nom.pk for _, nom, _, _ in uploads})
+    )
+    records = {record.pk: record for record in snapshot}
+    plan = ExportPlan()
+    for document_class, nom, owner, filename in uploads:
+        # Nominations that can't be exported are logged by the snapshot
+        if nom.pk in records:
+            plan.add(document_class, [records[nom.pk]], (owner, filename))
+
+    uploader = sharepoint_uploader()
+    for bundle, buffer in plan.render(workers):
+        owner, filename = bundle.destination
+        if queue is None:
+            save_file_to_sharepoint(uploader, buffer, owner, filename)
+        else:
+            queue.submit(
+                f"{owner.email}/{filename}",
+                buffer,
+                uploader.upload,
+                hr_matters_url(owner, filename),
+            )
+
+
+def line_manager_files(period, users=None):
+    """
+    The appraisal forms and reviews to upload to the line managers' drives.
+    """
     # First we create PT2 forms
     nom_query = Nomination.objects.filter(
         period=period, role=ReviewerRole.ASSESSMENT_PT_1
@@ -111,43 +147,45 @@ def upload_line_manager_files(period, users=None):
 
     period_name = f"{period}"
 
+    uploads = []
     for nom in nom_query:
         report = nom.reviewee
         name = f"{report.first_name} {report.last_name}"
-        with TemporaryDirectory() as dirname:
-            path = Path(dirname) / "review.docx"
-            doc = AssessmentDocumentPart2(nom)
-            doc.save(path.absolute())
-
-            save_file_to_sharepoint(
-                path, nom.reviewer, f"{period_name}/Reports/{name}/Appraisal Form.docx"
+        uploads.append(
+            (
+                AssessmentDocumentPart2,
+                nom,
+                nom.reviewer,
+                f"{period_name}/Reports/{name}/Appraisal Form.docx",
             )
+        )
 
         for report_nom in Nomination.objects.filter(
             ~Q(role=ReviewerRole.ASSESSMENT_PT_1),
             period=period,
             reviewee=report,
         ):
-            with TemporaryDirectory() as dirname:
-                path = Path(dirname) / "review.docx"
-                doc = ReviewDocument(report_nom)
-                doc.save(path.absolute())
+            if report_nom.external_name:
+                reviewer = report_nom.external_name
+            else:
+                reviewer = (
+                    f"{report_nom.reviewer.first_name} {report_nom.reviewer.last_name}"
+                )
 
-                if report_nom.external_name:
-                    reviewer = report_nom.external_name
-                else:
-                    reviewer = f"{report_nom.reviewer.first_name} {report_nom.reviewer.last_name}"
+            filename = f"{ReviewerRole(report_nom.role).label}"
+            if report_nom.role != ReviewerRole.SELF_ASSESSMENT:
+                filename += f" - {reviewer}"
 
-                filename = f"{ReviewerRole(report_nom.role).label}"
-                if report_nom.role != ReviewerRole.SELF_ASSESSMENT:
-                    filename += f" - {reviewer}"
+            filename = f"{period_name}/Reports/{name}/{filename}.docx"
+            uploads.append((ReviewDocument, report_nom, nom.reviewer, filename))
 
-                filename = f"{period_name}/Reports/{name}/{filename}.docx"
+    return uploads
 
-                save_file_to_sharepoint(path, nom.reviewer, filename)
 
-
-def upload_feedback_provided(period, users=None):
+def feedback_provided_files(period, users=None):
+    """
+    The reviews to upload to the reviewers' drives.
+    """
     # Then we export all provided
     nom_query = Nomination.objects.filter(period=period).exclude(
         role=ReviewerRole.ASSESSMENT_PT_1
@@ -157,16 +195,17 @@ def upload_feedback_provided(period, users=None):
 
     period_name = f"{period}"
 
+    uploads = []
     for nom in nom_query:
         reviewee = nom.reviewee
         name = f"{reviewee.first_name} {reviewee.last_name}"
-        with TemporaryDirectory() as dirname:
-            path = Path(dirname) / "review.docx"
-            doc = ReviewDocument(nom)
-            doc.save(path.absolute())
-
-            save_file_to_sharepoint(
-                path,
+        uploads.append(
+            (
+                ReviewDocument,
+                nom,
                 nom.reviewer,
                 f"{period_name}/Feedback Provided/{ReviewerRole(nom.role).label} - {name}.docx",
             )
+        )
+
+    return uploads
@@ -1,11 +1,15 @@
+from contextlib import nullcontext
+
 from django.core.management import BaseCommand
-from reviews.models import ReviewPeriod
-from reviews.reports.review_export.exporter import (
+
+from teamsite_staff_reviews.models import ReviewPeriod
+from teamsite_staff_reviews.reports.review_export.exporter import (
     export_by_reviewee,
-    export_nominations,
+    export_changed_reviews,
     save_to_fs,
     save_to_sharepoint,
 )
+from teamsite_staff_reviews.util.upload import UploadQueue
 
 
 class Command(BaseCommand):
@@ -15,9 +19,38 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--task-name", type=str, nargs="?")
+        parser.add_argument("--workers", "-w", type=int, default=None)
+        parser.add_argument(
+            "--changed",
+            "-c",
+            action="store_true",
+            help="Only export documents that changed since the last export",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="With --changed, check every nomination rather than only those with new responses",
+        )
+        parser.add_argument(
+            "--concurrent-uploads",
+            "-u",
+            type=int,
+            default=None,
+            help="Upload this many files at once in the background",
+        )
         parser.add_argument("location", type=str, default="sharepoint:feedback:")
 
-    def handle(self, *args, location, task_name, **options):
+    def handle(
+        self,
+        *args,
+        location,
+        task_name,
+        workers,
+        changed,
+        full,
+        concurrent_uploads,
+        **options,
+    ):
         period = ReviewPeriod.objects.get_current()
         if period is None:
             print("No current review cycle found")
@@ -28,6 +61,30 @@ class Command(BaseCommand):
         else:
             saver = save_to_fs(location)
 
-        export_by_reviewee(
-            saver, period=period, task_name=task_name, export_reviewee=True
-        )
+        queue = UploadQueue(concurrent_uploads) if concurrent_uploads else None
+        with queue or nullcontext():
+            if changed:
+                summary = export_changed_reviews(
+                    saver,
+                    location,
+                    full=full,
+                    workers=workers,
+                    queue=queue,
+                    period=period,
+                )
+                print(
+                    "Checked {checked}, exported {exported} single and {grouped} grouped "
+                    "documents, {failed} failed".format(**summary)
+                )
+            else:
+                export_by_reviewee(
+                    saver,
+                    period=period,
+                    task_name=task_name,
+                    export_reviewee=True,
+                    workers=workers,
+                    queue=queue,
+                )
+
+        if queue is not None:
+            print(queue.summary())
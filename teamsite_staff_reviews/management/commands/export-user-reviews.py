@@ -1,7 +1,13 @@
+from pathlib import Path
+
 from django.contrib.auth import get_user_model
-from django.core.management import BaseCommand
-from reviews.models import Nomination, ReviewPeriod
-from reviews.reports.review_export.exporter import nomination_list_to_word
+from django.core.management import BaseCommand, CommandError
+
+from teamsite_staff_reviews.models import Nomination, ReviewPeriod
+from teamsite_staff_reviews.reports.review_export.exporter import save_plan, save_to_fs
+from teamsite_staff_reviews.reports.review_export.planner import ExportPlan
+from teamsite_staff_reviews.util.word_export.review import ReviewDocument
+from teamsite_staff_reviews.util.word_export.snapshot import ExportSnapshot
 
 User = get_user_model()
 
@@ -22,10 +28,18 @@ class Command(BaseCommand):
             return
 
         reviewee = User.objects.get(username__icontains=user)
-        nomination_list = Nomination.objects.filter(period=period, reviewee=reviewee)
+        nominations = Nomination.objects.filter(period=period, reviewee=reviewee)
+        records = list(ExportSnapshot(nominations.order_by("pk")))
+        if not records:
+            print(f"No reviews found for {reviewee.username}")
+            return
 
         if filename is None:
             filename = f"{reviewee.first_name} {reviewee.last_name}.docx"
+        path = Path(filename)
 
-        nomination_list_to_word(nomination_list, filename)
+        plan = ExportPlan()
+        plan.add(ReviewDocument, records, (str(path.parent), path.name))
+        if save_plan(plan, save_to_fs(".")):
+            raise CommandError(f"Failed to write {filename}")
         print(f"Wrote to {filename}")
@@ -3,7 +3,8 @@ from datetime import datetime
 from django.contrib.auth import get_user_model
 from django.core.management import BaseCommand
 from django.utils.timezone import make_aware
-from reviews.models import Nomination, ReviewerRole, ReviewPeriod
+
+from teamsite_staff_reviews.models import Nomination, ReviewerRole, ReviewPeriod
 
 User = get_user_model()
 
@@ -35,5 +36,4 @@ class Command(BaseCommand):
 
         for n in noms:
             print("Updating closes for", n, date)
-            n.closes_override = date
-            n.save()
+        noms.set_closes_override(date)
@@ -3,7 +3,8 @@ from datetime import datetime
 from django.contrib.auth import get_user_model
 from django.core.management import BaseCommand
 from django.utils.timezone import make_aware
-from reviews.models import Nomination, ReviewPeriod
+
+from teamsite_staff_reviews.models import Nomination, ReviewPeriod
 
 User = get_user_model()
 
@@ -30,5 +31,4 @@ class Command(BaseCommand):
         noms = Nomination.objects.filter(reviewer=user, period=period)
         for n in noms:
             print("Updating closes for", n, date)
-            n.closes_override = date
-            n.save()
+        noms.set_closes_override(date)
@@ -1,6 +1,6 @@
-import yaml
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
+from teamsite_staff_reviews.form_config import FormConfigError, registry
 from teamsite_staff_reviews.models import ReviewPeriod
 
 
@@ -15,14 +15,30 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("filename", type=str)
-
-    def handle(self, *args, filename, **options):
-        print(f"Opening {filename}")
-        with open(filename) as FILE:
-            data = yaml.safe_load(FILE)
-
-        print(f"Found data for {data['period']} {data['year']}")
-
-        period = ReviewPeriod.objects.get(year=data["year"], round=data["period"])
-
-        period.add_forms()
+        parser.add_argument(
+            "--dry-run",
+            "-n",
+            action="store_true",
+            default=False,
+            help="Print the changes without making them",
+        )
+
+    def handle(self, *args, filename, dry_run, **options):
+        self.stdout.write(f"Opening {filename}")
+        try:
+            configuration = registry.get(filename)
+        except FormConfigError as e:
+            raise CommandError(str(e))
+        if configuration.year is None or configuration.period is None:
+            raise CommandError(f"{filename} does not give the year and period")
+
+        self.stdout.write(f"Found data for {configuration.period} {configuration.year}")
+
+        period = ReviewPeriod.objects.get(
+            year=configuration.year, round=configuration.period
+        )
+
+        diff = period.add_forms(configuration=configuration, dry_run=dry_run)
+        for line in diff.lines():
+            self.stdout.write(line)
+        self.stdout.write(f"{'Would make' if dry_run else 'Made'}: {diff}")
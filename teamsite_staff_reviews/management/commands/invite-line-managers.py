@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
 from django.core.management import BaseCommand
-from office365.api.auth import get_token
-from office365.api.sharepoint.file import get_file_metadata, grant_permission
-from office365.api.sharepoint.util import parse_sharepoint_path
-from reviews.models import Nomination, ReviewPeriod
+from office365.api.sharepoint import API_URL
+from office365.api.sharepoint.file import grant_permission
+
+from teamsite_staff_reviews.models import Nomination, ReviewPeriod
+from teamsite_staff_reviews.util.sharepoint import FolderResolver
+from teamsite_staff_reviews.util.upload import sharepoint_uploader
 
 User = get_user_model()
 
@@ -20,6 +22,7 @@ class Command(BaseCommand):
             return
 
         location = "feedback:"
+        folders = FolderResolver(sharepoint_uploader(), API_URL)
 
         reviewee_ids = set()
         for r in Nomination.objects.filter(period=period).values("reviewee").distinct():
@@ -39,14 +42,12 @@ class Command(BaseCommand):
             print(dir, "to", email)
 
             try:
-                access_token = get_token()
-                drive, filename = parse_sharepoint_path(
-                    f"{location}/{dir}", access_token=access_token
-                )
-                metadata = get_file_metadata(
-                    drive["id"], filename, access_token=access_token
+                drive, folder_id = folders.location_folder(
+                    f"{location}/{dir}", create=False
                 )
-                grant_permission(drive["id"], metadata["id"], email)
+                if folder_id is None:
+                    raise FileNotFoundError(dir)
+                grant_permission(drive["id"], folder_id, email)
             except:
                 print(f"Skipping {dir}")
                 pass
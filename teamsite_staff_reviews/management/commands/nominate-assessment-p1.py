@@ -1,7 +1,15 @@
+import sys
+
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.utils.timezone import now
-from reviews.models import Nomination, ReviewerRole, ReviewStage
+
+from teamsite_staff_reviews.models import Nomination, ReviewerRole, ReviewStage
+from teamsite_staff_reviews.reports.assessment_reconciliation import (
+    WRITERS,
+    reconcile_assessments,
+)
+from teamsite_staff_reviews.workflow import sync_nominations
 
 User = get_user_model()
 
@@ -13,9 +21,12 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--report", action="store_true", default=False)
+        parser.add_argument(
+            "--format", "-f", choices=list(WRITERS), default="text", dest="format_"
+        )
         parser.add_argument("--create", action="store_true", default=False)
 
-    def handle(self, *args, report, create, **options):
+    def handle(self, *args, report, create, format_, **options):
         stage = (
             ReviewStage.objects.filter(
                 code="OPEN",
@@ -33,51 +44,32 @@ class Command(BaseCommand):
         closes_stage = ReviewStage.objects.filter(code="PART1", period=period).first()
 
         if report:
-            self.report(closes_stage)
+            self.report(closes_stage, format_)
 
         if create:
             self.create(closes_stage)
 
-    def report(self, closes_stage):
-        reviewee_list = Nomination.objects.filter(
-            period=closes_stage.period
-        ).values_list("reviewee", flat=True)
-        for reviewee in set(reviewee_list):
-            reviewee = User.objects.get(pk=reviewee)
-            line_manager = reviewee.profile.line_manager
-            if line_manager is None:
-                print("No line manager found for", reviewee)
-            else:
-                try:
-                    nom = Nomination.objects.get(
-                        period=closes_stage.period,
-                        role=ReviewerRole.ASSESSMENT_PT_1,
-                        reviewer=line_manager,
-                        reviewee=reviewee,
-                    )
-                except Nomination.DoesNotExist:
-                    print(
-                        f"No nomination found for {line_manager} to assess {reviewee}"
-                    )
+    def report(self, closes_stage, format="text"):
+        discrepancies = reconcile_assessments(closes_stage.period)
+        WRITERS[format](discrepancies, sys.stdout)
 
     def create(self, closes_stage):
         direct_reports = Nomination.objects.filter(
-            period=closes_stage.period, role=ReviewerRole.DIRECT_REPORT
-        )
-        for dr in direct_reports:
-            if dr.reviewer is not None:
-                nom, created = Nomination.objects.get_or_create(
-                    period=closes_stage.period,
-                    role=ReviewerRole.ASSESSMENT_PT_1,
-                    reviewer=dr.reviewee,
-                    reviewee=dr.reviewer,
-                    defaults=dict(
-                        closes_override=closes_stage.date,
-                    ),
-                )
-                if not created:
-                    nom.closes_override = closes_stage.date
-                    nom.save()
-                print(
-                    f"{'Created' if created else 'Updated'} nomination for {nom.reviewer} to assess {nom.reviewee}"
+            period=closes_stage.period,
+            role=ReviewerRole.DIRECT_REPORT,
+            reviewer__isnull=False,
+        ).values_list("reviewer_id", "reviewee_id")
+        result = sync_nominations(
+            closes_stage.period,
+            ReviewerRole.ASSESSMENT_PT_1,
+            (
+                dict(
+                    reviewer_id=line_manager,
+                    reviewee_id=staff,
+                    closes_override=closes_stage.date,
                 )
+                for staff, line_manager in direct_reports
+            ),
+            fields=("closes_override",),
+        )
+        print(f"Assessment part 1 nominations: {result}")
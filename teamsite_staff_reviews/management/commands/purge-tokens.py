@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from teamsite_staff_reviews.tasks.tokens import purge_tokens
+
+
+class Command(BaseCommand):
+    help = """
+    Deletes expired and redeemed external login tokens
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-days", type=int, default=7)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, keep_days, batch_size, **options):
+        deleted = purge_tokens(keep_days=keep_days, batch_size=batch_size)
+        print(f"Deleted {deleted} tokens")
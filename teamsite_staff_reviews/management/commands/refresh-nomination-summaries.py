@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from teamsite_staff_reviews.models import Nomination, NominationSummary, ReviewPeriod
+
+
+class Command(BaseCommand):
+    help = """
+    Recomputes the nomination summaries, e.g. after importing responses or changing forms
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period", "-p", type=str, help='e.g. "2022 MY"')
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, period, batch_size, **options):
+        nominations = Nomination.objects.order_by("pk")
+        if period is not None:
+            period_name = period
+            period = ReviewPeriod.objects.round(period)
+            if period is None:
+                print(f"No review period {period_name} found")
+                return
+            nominations = nominations.filter(period=period)
+
+        ids = list(nominations.values_list("pk", flat=True))
+        for start in range(0, len(ids), batch_size):
+            NominationSummary.objects.refresh(ids[start : start + batch_size])
+        print(f"Refreshed {len(ids)} nomination summaries")
@@ -2,23 +2,16 @@ from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.utils.timezone import now
 from resourcing.models import Profile
-from reviews.models import (
-    Nomination,
-    ReviewerRole,
-    ReviewForm,
-    ReviewFormQuestion,
-    ReviewFormResponse,
-    ReviewPeriod,
-    ReviewRound,
-    ReviewStage,
-)
+
+from teamsite_staff_reviews.models import ReviewerRole, ReviewStage
+from teamsite_staff_reviews.workflow import sync_nominations
 
 User = get_user_model()
 
 
 class Command(BaseCommand):
     help = """
-    Nominates Line Managers for the current review cycle
+    Nominates staff to assess themselves for the current review cycle
     """
 
     def add_arguments(self, parser):
@@ -44,7 +37,7 @@ class Command(BaseCommand):
             return
 
         user_map = {}
-        for user in Profile.objects.current():
+        for user in Profile.objects.current().select_related("user"):
             user_map[user.user.pk] = user.user
 
         for ex in excludes:
@@ -55,10 +48,9 @@ class Command(BaseCommand):
             except KeyError:
                 pass
 
-        for user in user_map.values():
-            nom, created = Nomination.objects.update_or_create(
-                reviewee=user,
-                reviewer=user,
-                role=ReviewerRole.SELF_ASSESSMENT,
-                period=stage.period,
-            )
+        result = sync_nominations(
+            stage.period,
+            ReviewerRole.SELF_ASSESSMENT,
+            (dict(reviewer_id=pk, reviewee_id=pk) for pk in user_map),
+        )
+        print(f"Self assessments: {result}")
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_closes(apps, schema_editor):
+    Nomination = apps.get_model("teamsite_staff_reviews", "Nomination")
+    ReviewStage = apps.get_model("teamsite_staff_reviews", "ReviewStage")
+    feedback_close = ReviewStage.objects.filter(
+        period=OuterRef("period"), code="FEEDBACK_CLOSE"
+    ).values("date")[:1]
+    Nomination.objects.update(
+        closes=Coalesce("closes_override", Subquery(feedback_close))
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nomination",
+            name="closes",
+            field=models.DateTimeField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(populate_closes, migrations.RunPython.noop),
+    ]
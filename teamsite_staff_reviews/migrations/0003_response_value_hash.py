@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:41
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def populate_value_hash(apps, schema_editor):
+    ReviewFormResponse = apps.get_model("teamsite_staff_reviews", "ReviewFormResponse")
+    batch = []
+    for response in ReviewFormResponse.objects.only("value").iterator():
+        value = response.value or ""
+        response.value_hash = hashlib.sha1(value.encode("utf-8")).hexdigest()
+        batch.append(response)
+        if len(batch) >= 1000:
+            ReviewFormResponse.objects.bulk_update(batch, ["value_hash"])
+            batch = []
+    ReviewFormResponse.objects.bulk_update(batch, ["value_hash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0002_nomination_closes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reviewformresponse",
+            name="value_hash",
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.RunPython(populate_value_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0003_response_value_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportManifestEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("target", models.CharField(max_length=255)),
+                ("content_hash", models.CharField(max_length=40)),
+                ("exported", models.DateTimeField()),
+                (
+                    "nomination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="exports",
+                        to="teamsite_staff_reviews.nomination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "export manifest entries",
+                "unique_together": {("nomination", "target")},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:02
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Length
+
+
+def populate_value_length(apps, schema_editor):
+    ReviewFormResponse = apps.get_model("teamsite_staff_reviews", "ReviewFormResponse")
+    ReviewFormResponse.objects.update(value_length=Coalesce(Length("value"), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0004_export_manifest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reviewformresponse",
+            name="value_length",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_value_length, migrations.RunPython.noop),
+    ]
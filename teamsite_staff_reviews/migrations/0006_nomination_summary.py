@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0005_response_value_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NominationSummary",
+            fields=[
+                (
+                    "nomination",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="teamsite_staff_reviews.nomination",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("PM", "Project Manager"),
+                            ("DR", "Direct Report"),
+                            ("WT", "Wider Team"),
+                            ("EX", "External"),
+                            ("SA", "Self-Assessment"),
+                            ("A1", "Assessment - Part 1"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                ("questions", models.PositiveIntegerField(default=0)),
+                ("answered", models.PositiveIntegerField(default=0)),
+                ("words", models.PositiveIntegerField(default=0)),
+                ("first_modified", models.DateTimeField(blank=True, null=True)),
+                ("last_modified", models.DateTimeField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("N", "Not started"),
+                            ("P", "In progress"),
+                            ("C", "Complete"),
+                        ],
+                        default="N",
+                        max_length=1,
+                    ),
+                ),
+                (
+                    "period",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="nomination_summaries",
+                        to="teamsite_staff_reviews.reviewperiod",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "nomination summaries",
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0006_nomination_summary"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="externalusertoken",
+            name="secret",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="externalinvitationmessage",
+            index=models.Index(
+                fields=["invitation", "sent_time"], name="invitation_message_sent"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nomination",
+            index=models.Index(
+                fields=["period", "reviewer"], name="nomination_period_reviewer"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nomination",
+            index=models.Index(
+                fields=["period", "reviewee"], name="nomination_period_reviewee"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nomination",
+            index=models.Index(
+                fields=["period", "role"], name="nomination_period_role"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reviewstage",
+            index=models.Index(
+                fields=["period", "code", "date"], name="stage_period_code"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reviewstage",
+            index=models.Index(fields=["code", "date"], name="stage_code_date"),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:20
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_secrets(apps, schema_editor):
+    ExternalUserToken = apps.get_model("teamsite_staff_reviews", "ExternalUserToken")
+    batch = []
+    for token in ExternalUserToken.objects.only("secret").iterator():
+        token.secret_hash = hashlib.sha256(token.secret.encode("utf-8")).hexdigest()
+        batch.append(token)
+        if len(batch) >= 1000:
+            ExternalUserToken.objects.bulk_update(batch, ["secret_hash"])
+            batch = []
+    ExternalUserToken.objects.bulk_update(batch, ["secret_hash"])
+
+
+def delete_tokens(apps, schema_editor):
+    # The secrets can't be recovered from their hashes, so the tokens can't be kept
+    ExternalUserToken = apps.get_model("teamsite_staff_reviews", "ExternalUserToken")
+    ExternalUserToken.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0007_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="externalusertoken",
+            name="secret_hash",
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_secrets, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="externalusertoken",
+            name="secret",
+        ),
+        # Unapplying deletes the tokens before the secret column is added back
+        migrations.RunPython(migrations.RunPython.noop, delete_tokens),
+        migrations.AlterField(
+            model_name="externalusertoken",
+            name="secret_hash",
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="externalusertoken",
+            name="expiry",
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="externalusertoken",
+            name="redeemed",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
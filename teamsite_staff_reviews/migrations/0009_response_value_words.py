@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+def count_words(apps, schema_editor):
+    ReviewFormResponse = apps.get_model("teamsite_staff_reviews", "ReviewFormResponse")
+    batch = []
+    for response in ReviewFormResponse.objects.only("value").iterator():
+        response.value_words = len(response.value.split()) if response.value else 0
+        batch.append(response)
+        if len(batch) >= 1000:
+            ReviewFormResponse.objects.bulk_update(batch, ["value_words"])
+            batch = []
+    ReviewFormResponse.objects.bulk_update(batch, ["value_words"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0008_token_secret_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reviewformresponse",
+            name="value_words",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_words, migrations.RunPython.noop),
+    ]
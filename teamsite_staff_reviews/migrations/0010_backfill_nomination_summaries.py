@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:02
+
+from django.db import migrations
+from django.db.models import Count, Max, Min, Q, Sum
+
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    """
+    Creates the summaries of the nominations that had responses before summaries were
+    kept, from the word counts stored on the responses.
+    """
+    Nomination = apps.get_model("teamsite_staff_reviews", "Nomination")
+    NominationSummary = apps.get_model("teamsite_staff_reviews", "NominationSummary")
+    ReviewFormQuestion = apps.get_model("teamsite_staff_reviews", "ReviewFormQuestion")
+    ReviewFormResponse = apps.get_model("teamsite_staff_reviews", "ReviewFormResponse")
+
+    questions = {
+        (period_id, role): count
+        for period_id, role, count in ReviewFormQuestion.objects.values_list(
+            "form__period_id", "form__role"
+        ).annotate(count=Count("pk"))
+    }
+    nominations = list(Nomination.objects.values_list("pk", "period_id", "role"))
+    for start in range(0, len(nominations), BATCH_SIZE):
+        batch = nominations[start : start + BATCH_SIZE]
+        totals = {
+            row["nomination_id"]: row
+            for row in ReviewFormResponse.objects.filter(
+                nomination_id__in=[pk for pk, _, _ in batch]
+            )
+            .values("nomination_id")
+            .annotate(
+                answered=Count("pk", filter=Q(value_words__gt=0)),
+                words=Sum("value_words"),
+                first_modified=Min("created"),
+                last_modified=Max("last_modified"),
+            )
+            .order_by()
+        }
+        summaries = []
+        for pk, period_id, role in batch:
+            total = totals.get(pk, {})
+            summary = NominationSummary(
+                nomination_id=pk,
+                period_id=period_id,
+                role=role,
+                questions=questions.get((period_id, role), 0),
+                answered=total.get("answered", 0),
+                words=total.get("words") or 0,
+                first_modified=total.get("first_modified"),
+                last_modified=total.get("last_modified"),
+            )
+            if summary.answered == 0:
+                summary.status = "N"
+            elif summary.answered < summary.questions:
+                summary.status = "P"
+            else:
+                summary.status = "C"
+            summaries.append(summary)
+        NominationSummary.objects.bulk_create(summaries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teamsite_staff_reviews", "0009_response_value_words"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
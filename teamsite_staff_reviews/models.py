@@ -1,13 +1,25 @@
+import hashlib
 import secrets
 import string
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any, Dict
 
-from dateutil.relativedelta import MO, relativedelta
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.utils import timezone
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
 
 User = get_user_model()
@@ -82,7 +94,7 @@ class StageCode(Enum):
 
     @property
     def index(self):
-        return list(type(self)).index(self)
+        return self._index
 
     @property
     def morning(self):
@@ -100,7 +112,7 @@ class StageCode(Enum):
 
     @property
     def label(self):
-        return f"{self.index+1 }. {self._label}"
+        return self._numbered_label
 
     @property
     def title(self):
@@ -116,7 +128,15 @@ class StageCode(Enum):
 
     @classmethod
     def choices(cls):
-        return tuple((i.name, i.label) for i in cls)
+        return cls._choices
+
+
+# The position and label of each stage never change, so are worked out once
+for _index, _code in enumerate(StageCode):
+    _code._index = _index
+    _code._numbered_label = f"{_index + 1}. {_code._label}"
+StageCode._choices = tuple((code.name, code.label) for code in StageCode)
+del _index, _code
 
 
 class ReviewPeriodQuerySet(models.QuerySet):
@@ -134,7 +154,14 @@ class ReviewPeriodQuerySet(models.QuerySet):
         year, period = value.split(" ", 1)
         year = int(year)
         period = ReviewRound(period)
-        return self.filter(year=year, period=period).first()
+        return self.filter(year=year, round=period).first()
+
+    def with_cycle(self):
+        """
+        Prefetches the stages and forms of each period so that the stage and form lookups
+        below can be answered without further queries.
+        """
+        return self.prefetch_related("stages", "forms")
 
 
 class ReviewPeriod(models.Model):
@@ -150,37 +177,39 @@ class ReviewPeriod(models.Model):
     def round_label(self):
         return ReviewRound(self.round).label
 
-    def add_default_stages(self):
-        current_date = timezone.now().replace(
-            hour=12, minute=0, second=0, microsecond=0
-        )
-        current_date += relativedelta(weekday=MO(1))
-
-        for stage in StageCode:
-            if stage != StageCode.OTHER:
-                stage, created = ReviewStage.objects.get_or_create(
-                    period=self,
-                    code=stage.name,
-                    defaults={
-                        "date": stage.get_time(current_date),
-                        "visible": stage.visible,
-                        "title": stage.title,
-                        "description": stage.description,
-                        "configuration": stage.configuration,
-                    },
-                )
+    def get_stage(self, code):
+        for stage in self.stages.all():
+            if stage.code == code:
+                return stage
+        return None
+
+    def get_current_stage(self):
+        current = None
+        for stage in self.stages.all():
+            if stage.date <= now() and (current is None or stage.date >= current.date):
+                current = stage
+        return current
+
+    def get_form(self, role):
+        for form in self.forms.all():
+            if form.role == role:
+                return form
+        return None
 
-                current_date = stage.date + timedelta(weeks=1)
+    def add_default_stages(self, **kwargs):
+        from teamsite_staff_reviews.workflow import schedule_default_stages
+
+        return schedule_default_stages([self], **kwargs)
 
     def add_forms(self, **kwargs):
         from teamsite_staff_reviews.workflow import create_review_form
 
-        create_review_form(self, **kwargs)
+        return create_review_form(self, **kwargs)
 
     def nominate_line_managers(self):
         from teamsite_staff_reviews.workflow import nominate_line_managers as nominate
 
-        nominate(self)
+        return nominate(self)
 
     def __str__(self):
         return f"{self.year} {self.round_label}"
@@ -212,6 +241,93 @@ class ReviewStage(models.Model):
 
     class Meta:
         ordering = ["date"]
+        indexes = [
+            models.Index(fields=["period", "code", "date"], name="stage_period_code"),
+            models.Index(fields=["code", "date"], name="stage_code_date"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_code = instance.__dict__.get("code")
+        return instance
+
+    def _affects_closes(self):
+        codes = {self.code, getattr(self, "_loaded_code", None)}
+        return StageCode.FEEDBACK_CLOSE.name in codes
+
+    def save(self, *args, **kwargs):
+        super(ReviewStage, self).save(*args, **kwargs)
+        if self._affects_closes():
+            Nomination.objects.filter(period_id=self.period_id).recompute_closes()
+        self._loaded_code = self.code
+
+    def delete(self, *args, **kwargs):
+        result = super(ReviewStage, self).delete(*args, **kwargs)
+        if self._affects_closes():
+            Nomination.objects.filter(period_id=self.period_id).recompute_closes()
+        return result
+
+
+def feedback_close_date():
+    return Subquery(
+        ReviewStage.objects.filter(
+            period=OuterRef("period"), code=StageCode.FEEDBACK_CLOSE.name
+        ).values("date")[:1]
+    )
+
+
+class NominationQuerySet(models.QuerySet):
+    def recompute_closes(self):
+        """
+        Recalculates the effective deadline of every nomination in a single statement.
+        """
+        return self.update(closes=Coalesce("closes_override", feedback_close_date()))
+
+    def set_closes_override(self, value):
+        """
+        Sets (or with None, clears) the deadline override and the effective deadline together.
+        """
+        if value is None:
+            return self.update(closes_override=None, closes=feedback_close_date())
+        else:
+            return self.update(closes_override=value, closes=value)
+
+    def changed_since_export(self, target):
+        """
+        Nominations that have never been exported to the target, or whose responses were
+        modified after the last export.
+        """
+        exported = ExportManifestEntry.objects.filter(
+            nomination=OuterRef("pk"), target=target
+        ).values("exported")[:1]
+        return self.annotate(
+            last_exported=Subquery(exported),
+            responses_modified=Max("responses__last_modified"),
+        ).filter(
+            Q(last_exported__isnull=True) | Q(responses_modified__gt=F("last_exported"))
+        )
+
+    def progress(self) -> Dict[str, Any]:
+        """
+        Totals of the nomination summaries, e.g. for a period's progress. Nominations without
+        a summary yet count as not started.
+        """
+        not_started = Q(summary__isnull=True) | Q(
+            summary__status=SummaryStatus.NOT_STARTED
+        )
+        return self.aggregate(
+            nominations=Count("pk"),
+            not_started=Count("pk", filter=not_started),
+            in_progress=Count(
+                "pk", filter=Q(summary__status=SummaryStatus.IN_PROGRESS)
+            ),
+            complete=Count("pk", filter=Q(summary__status=SummaryStatus.COMPLETE)),
+            questions=Coalesce(Sum("summary__questions"), 0),
+            answered=Coalesce(Sum("summary__answered"), 0),
+            words=Coalesce(Sum("summary__words"), 0),
+            last_modified=Max("summary__last_modified"),
+        )
 
 
 class Nomination(models.Model):
@@ -233,10 +349,35 @@ class Nomination(models.Model):
     )
 
     closes_override = models.DateTimeField(null=True, blank=True)
+    closes = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    objects = NominationQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.closes = self.get_closes()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "closes_override" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "closes"}
+        super(Nomination, self).save(*args, **kwargs)
+
+    def get_closes(self):
+        if self.closes_override is not None:
+            return self.closes_override
+        else:
+            return (
+                ReviewStage.objects.filter(
+                    period_id=self.period_id, code=StageCode.FEEDBACK_CLOSE.name
+                )
+                .values_list("date", flat=True)
+                .first()
+            )
 
     @property
     def form(self):
-        return ReviewForm.objects.get(period=self.period, role=self.role)
+        form = self.period.get_form(self.role)
+        if form is None:
+            raise ReviewForm.DoesNotExist(f"No {self.role} form for {self.period}")
+        return form
 
     @property
     def reviewer_name(self):
@@ -245,18 +386,6 @@ class Nomination(models.Model):
         else:
             return f"{self.reviewer.first_name} {self.reviewer.last_name}"
 
-    @property
-    def closes(self):
-        if self.closes_override is not None:
-            return self.closes_override
-        else:
-            try:
-                return ReviewStage.objects.get(
-                    period=self.period, code="FEEDBACK_CLOSE"
-                ).date
-            except ReviewStage.DoesNotExist:
-                return None
-
     def __str__(self):
         if self.external_name or self.external_email:
             return f"{self.external_name} ({self.external_email}) => {self.reviewee.profile.short_name}"
@@ -266,6 +395,15 @@ class Nomination(models.Model):
     class Meta:
         unique_together = ["reviewee", "reviewer", "external_email"]
         ordering = ["reviewer__username", "reviewee__username"]
+        indexes = [
+            models.Index(
+                fields=["period", "reviewer"], name="nomination_period_reviewer"
+            ),
+            models.Index(
+                fields=["period", "reviewee"], name="nomination_period_reviewee"
+            ),
+            models.Index(fields=["period", "role"], name="nomination_period_role"),
+        ]
 
 
 class ReviewForm(models.Model):
@@ -302,6 +440,76 @@ class ReviewFormQuestion(models.Model):
         return f"{self.form} - {self.sequence} - {self.title}"
 
 
+def hash_value(value):
+    return hashlib.sha1((value or "").encode("utf-8")).hexdigest()
+
+
+def count_words(value):
+    return len(value.split()) if value else 0
+
+
+class ReviewFormResponseQuerySet(models.QuerySet):
+    def upsert(self, nomination, values):
+        """
+        Saves the values (a mapping of question id to text) for a nomination. Values whose hash
+        matches the stored one are skipped, and the rest are inserted or updated with a single
+        statement.
+
+        :return: The number of responses written
+        """
+        hashes = {
+            question_id: hash_value(value) for question_id, value in values.items()
+        }
+        stored = {
+            question_id: (value_hash, words)
+            for question_id, value_hash, words in self.filter(
+                nomination=nomination, question_id__in=hashes
+            ).values_list("question_id", "value_hash", "value_words")
+        }
+        changed = [
+            self.model(
+                nomination=nomination,
+                question_id=question_id,
+                value=value,
+                value_hash=hashes[question_id],
+                value_length=len(value or ""),
+                value_words=count_words(value),
+            )
+            for question_id, value in values.items()
+            if stored.get(question_id, (None, 0))[0] != hashes[question_id]
+        ]
+        if changed:
+            self.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["nomination", "question"],
+                update_fields=[
+                    "value",
+                    "value_hash",
+                    "value_length",
+                    "value_words",
+                    "last_modified",
+                ],
+            )
+            before = [stored.get(r.question_id, (None, 0))[1] for r in changed]
+            after = [r.value_words for r in changed]
+            NominationSummary.objects.add_changes(
+                nomination.pk,
+                answered=sum(map(bool, after)) - sum(map(bool, before)),
+                words=sum(after) - sum(before),
+                created=min(r.created for r in changed),
+                last_modified=max(r.last_modified for r in changed),
+            )
+        return len(changed)
+
+    def delete(self):
+        # Bulk deletes skip the model's delete, so the summaries are refreshed here
+        nomination_ids = set(self.values_list("nomination_id", flat=True))
+        result = super().delete()
+        NominationSummary.objects.refresh(nomination_ids)
+        return result
+
+
 class ReviewFormResponse(models.Model):
     nomination = models.ForeignKey(
         Nomination, on_delete=models.CASCADE, related_name="responses"
@@ -310,13 +518,58 @@ class ReviewFormResponse(models.Model):
         ReviewFormQuestion, on_delete=models.CASCADE, related_name="responses"
     )
     value = models.TextField(null=True, blank=True)
+    value_hash = models.CharField(max_length=40, blank=True, editable=False)
+    # Kept with the value so that answers can be sorted by length without measuring them all
+    value_length = models.PositiveIntegerField(default=0, editable=False)
+    # and so that the nomination summaries can be updated without reading the answers
+    value_words = models.PositiveIntegerField(default=0, editable=False)
 
     created = models.DateTimeField(blank=True, auto_now_add=True)
     last_modified = models.DateTimeField(blank=True, auto_now=True)
 
+    objects = ReviewFormResponseQuerySet.as_manager()
+
     class Meta:
         unique_together = ["nomination", "question"]
 
+    def save(self, *args, **kwargs):
+        self.value_hash = hash_value(self.value)
+        self.value_length = len(self.value or "")
+        self.value_words = count_words(self.value)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "value" in update_fields:
+            kwargs["update_fields"] = {
+                *update_fields,
+                "value_hash",
+                "value_length",
+                "value_words",
+            }
+
+        before = 0
+        if not self._state.adding:
+            before = (
+                ReviewFormResponse.objects.filter(pk=self.pk)
+                .values_list("value_words", flat=True)
+                .first()
+            ) or 0
+        super(ReviewFormResponse, self).save(*args, **kwargs)
+        NominationSummary.objects.add_changes(
+            self.nomination_id,
+            answered=bool(self.value_words) - bool(before),
+            words=self.value_words - before,
+            created=self.created,
+            last_modified=self.last_modified,
+        )
+
+    def delete(self, *args, **kwargs):
+        result = super(ReviewFormResponse, self).delete(*args, **kwargs)
+        NominationSummary.objects.add_changes(
+            self.nomination_id,
+            answered=-bool(self.value_words),
+            words=-self.value_words,
+        )
+        return result
+
 
 class ExternalUser(models.Model):
     email = models.EmailField(unique=True)
@@ -368,19 +621,64 @@ class ExternalInvitationMessage(models.Model):
     sent_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
     message = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["invitation", "sent_time"], name="invitation_message_sent"
+            ),
+        ]
+
+
+def hash_secret(secret):
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+class ExternalUserTokenQuerySet(models.QuerySet):
+    def get_by_secret(self, secret):
+        """
+        Returns the token for a secret, looked up by its hash.
+        """
+        return self.get(secret_hash=hash_secret(secret))
+
+    def purge(self, keep: timedelta = timedelta(days=7), batch_size=1000):
+        """
+        Deletes the tokens that expired or were redeemed more than keep ago, batch_size at a
+        time so that the table isn't locked for long.
+
+        :return: The number of tokens deleted
+        """
+        cutoff = now() - keep
+        stale = self.filter(Q(expiry__lt=cutoff) | Q(redeemed__lt=cutoff))
+        deleted = 0
+        while True:
+            batch = list(stale.values_list("pk", flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            deleted += self.filter(pk__in=batch).delete()[0]
+
 
 class ExternalUserToken(models.Model):
+    """
+    A single use link for an external user to log in. Only a hash of the secret is stored;
+    the secret itself is only available as token.secret on the instance that created it.
+    """
+
     email = models.EmailField()
     code = models.PositiveIntegerField(null=True)
 
-    secret = models.CharField(max_length=100)
-    expiry = models.DateTimeField()
-    redeemed = models.DateTimeField(null=True, blank=True)
+    secret_hash = models.CharField(max_length=64, unique=True, editable=False)
+    expiry = models.DateTimeField(db_index=True)
+    redeemed = models.DateTimeField(null=True, blank=True, db_index=True)
     client_ip = models.GenericIPAddressField(null=True, blank=True)
 
+    objects = ExternalUserTokenQuerySet.as_manager()
+
+    secret = None
+
     def save(self, *args, **kwargs):
-        if not self.secret:
+        if not self.secret_hash:
             self.secret = secrets.token_urlsafe(50)
+            self.secret_hash = hash_secret(self.secret)
         if not self.expiry:
             self.expiry = now() + timedelta(minutes=120)
         super(ExternalUserToken, self).save(*args, **kwargs)
@@ -389,8 +687,218 @@ class ExternalUserToken(models.Model):
     def expired(self):
         return self.expiry < now()
 
+    def redeem(self, client_ip=None) -> bool:
+        """
+        Marks the token as redeemed, unless it already has been, e.g. by a request at the
+        same time, with a single conditional update.
+
+        :return: Whether the token was redeemed by this call
+        """
+        redeemed = now()
+        updated = ExternalUserToken.objects.filter(
+            pk=self.pk, redeemed__isnull=True
+        ).update(redeemed=redeemed, client_ip=client_ip)
+        if updated:
+            self.redeemed, self.client_ip = redeemed, client_ip
+        return bool(updated)
+
+
+class ExportManifestQuerySet(models.QuerySet):
+    def record(self, target, hashes, exported):
+        """
+        Records the export of nominations to the target with a single statement.
+
+        :param target: The export location
+        :param hashes: A mapping of nomination id to the hash of the exported content
+        :param exported: The time the export data was loaded
+        """
+        return self.bulk_create(
+            [
+                self.model(
+                    nomination_id=nomination_id,
+                    target=target,
+                    content_hash=content_hash,
+                    exported=exported,
+                )
+                for nomination_id, content_hash in hashes.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["nomination", "target"],
+            update_fields=["content_hash", "exported"],
+        )
+
+
+class ExportManifestEntry(models.Model):
+    """
+    What was last exported for a nomination to an export target, so that later exports
+    only regenerate documents whose content has changed.
+    """
+
+    nomination = models.ForeignKey(
+        Nomination, on_delete=models.CASCADE, related_name="exports"
+    )
+    target = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=40)
+    exported = models.DateTimeField()
+
+    objects = ExportManifestQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ["nomination", "target"]
+        verbose_name_plural = "export manifest entries"
+
+
+class SummaryStatus(models.TextChoices):
+    NOT_STARTED = "N", "Not started"
+    IN_PROGRESS = "P", "In progress"
+    COMPLETE = "C", "Complete"
+
+
+class NominationSummaryQuerySet(models.QuerySet):
+    def add_changes(
+        self, nomination_id, answered=0, words=0, created=None, last_modified=None
+    ):
+        """
+        Adds the changes made by saving or deleting responses to a nomination's summary
+        with a single statement, without reading the responses. A nomination without a
+        summary yet is refreshed instead.
+
+        :param nomination_id: The pk of the nomination
+        :param answered: The change in the number of answered questions
+        :param words: The change in the number of words
+        :param created: When the earliest response saved was created
+        :param last_modified: When the responses were saved
+        :return: The number of summaries written
+        """
+        # The conditions are on the counts before the change
+        changes = dict(
+            answered=F("answered") + answered,
+            words=F("words") + words,
+            status=Case(
+                When(answered__lte=-answered, then=Value(SummaryStatus.NOT_STARTED)),
+                When(
+                    answered__lt=F("questions") - answered,
+                    then=Value(SummaryStatus.IN_PROGRESS),
+                ),
+                default=Value(SummaryStatus.COMPLETE),
+            ),
+        )
+        if created is not None:
+            changes["first_modified"] = Coalesce(
+                "first_modified", Value(created, output_field=models.DateTimeField())
+            )
+        if last_modified is not None:
+            changes["last_modified"] = Value(last_modified)
+        updated = self.filter(nomination_id=nomination_id).update(**changes)
+        if not updated:
+            return self.refresh([nomination_id])
+        return updated
+
+    def refresh(self, nomination_ids):
+        """
+        Recomputes the summaries of the nominations from their responses, and writes them
+        with a single statement.
+
+        :param nomination_ids: The pks of the nominations
+        :return: The number of summaries written
+        """
+        nominations = Nomination.objects.filter(pk__in=nomination_ids).values_list(
+            "pk", "period_id", "role"
+        )
+        questions = {
+            (period_id, role): count
+            for period_id, role, count in ReviewFormQuestion.objects.filter(
+                form__period_id__in={period_id for _, period_id, _ in nominations}
+            )
+            .values_list("form__period_id", "form__role")
+            .annotate(count=Count("pk"))
+        }
+        summaries = {
+            pk: self.model(
+                nomination_id=pk,
+                period_id=period_id,
+                role=role,
+                questions=questions.get((period_id, role), 0),
+            )
+            for pk, period_id, role in nominations
+        }
+        if not summaries:
+            return 0
+
+        for nomination_id, words, created, last_modified in (
+            ReviewFormResponse.objects.filter(nomination_id__in=summaries)
+            .values_list("nomination_id", "value_words", "created", "last_modified")
+            .iterator()
+        ):
+            summary = summaries[nomination_id]
+            summary.add_response(words, created, last_modified)
+
+        self.bulk_create(
+            summaries.values(),
+            update_conflicts=True,
+            unique_fields=["nomination"],
+            update_fields=[
+                "period",
+                "role",
+                "questions",
+                "answered",
+                "words",
+                "first_modified",
+                "last_modified",
+                "status",
+            ],
+        )
+        return len(summaries)
+
+
+class NominationSummary(models.Model):
+    """
+    How far a nomination has got, kept up to date as its responses are saved, so that
+    progress can be reported without reading the responses.
+    """
+
+    nomination = models.OneToOneField(
+        Nomination,
+        on_delete=models.CASCADE,
+        related_name="summary",
+        primary_key=True,
+    )
+    period = models.ForeignKey(
+        ReviewPeriod, on_delete=models.CASCADE, related_name="nomination_summaries"
+    )
+    role = models.CharField(max_length=2, choices=ReviewerRole.choices)
+    questions = models.PositiveIntegerField(default=0)
+    answered = models.PositiveIntegerField(default=0)
+    words = models.PositiveIntegerField(default=0)
+    first_modified = models.DateTimeField(null=True, blank=True)
+    last_modified = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(
+        max_length=1, choices=SummaryStatus.choices, default=SummaryStatus.NOT_STARTED
+    )
+
+    objects = NominationSummaryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "nomination summaries"
+
+    def add_response(self, words, created, last_modified):
+        if words:
+            self.answered += 1
+            self.words += words
+        if self.first_modified is None or created < self.first_modified:
+            self.first_modified = created
+        if self.last_modified is None or last_modified > self.last_modified:
+            self.last_modified = last_modified
+
+        if self.answered == 0:
+            self.status = SummaryStatus.NOT_STARTED
+        elif self.answered < self.questions:
+            self.status = SummaryStatus.IN_PROGRESS
+        else:
+            self.status = SummaryStatus.COMPLETE
+
 
-class ExternalNominationManager(models.Manager):
+class ExternalNominationManager(models.Manager.from_queryset(NominationQuerySet)):
     def all(self):
         return super().filter(role=ReviewerRole.EXTERNAL)
 
@@ -0,0 +1,131 @@
+import csv
+import json
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from django.contrib.auth import get_user_model
+
+from teamsite_staff_reviews.models import Nomination, ReviewerRole, ReviewPeriod
+
+User = get_user_model()
+
+NO_LINE_MANAGER = "no_line_manager"
+MISSING = "missing"
+DUPLICATE = "duplicate"
+ORPHANED = "orphaned"
+
+FIELDS = ["issue", "reviewee_id", "reviewee", "reviewer_id", "reviewer", "nominations"]
+
+
+@dataclass
+class Discrepancy:
+    """
+    A difference between a period's Part 1 assessment nominations and the line managers of
+    its reviewees: the line manager should be nominated to assess each reviewee once.
+    """
+
+    issue: str
+    reviewee_id: int
+    reviewer_id: Optional[int] = None
+    nominations: Tuple[int, ...] = ()
+    reviewee: str = ""
+    reviewer: str = ""
+
+    def __str__(self):
+        if self.issue == NO_LINE_MANAGER:
+            return f"No line manager found for {self.reviewee}"
+        elif self.issue == MISSING:
+            return f"No nomination found for {self.reviewer} to assess {self.reviewee}"
+        elif self.issue == DUPLICATE:
+            return (
+                f"{len(self.nominations)} nominations for {self.reviewer} to assess "
+                f"{self.reviewee}: {', '.join(map(str, self.nominations))}"
+            )
+        else:
+            return (
+                f"Nomination {self.nominations[0]} for {self.reviewer or 'nobody'} to "
+                f"assess {self.reviewee} is not for their line manager"
+            )
+
+
+def current_line_managers(user_ids) -> Dict[int, Optional[int]]:
+    from resourcing.models import Profile
+
+    return dict(
+        Profile.objects.filter(user_id__in=user_ids).values_list(
+            "user_id", "line_manager_id"
+        )
+    )
+
+
+def reconcile_assessments(
+    period: ReviewPeriod, line_managers: Dict[int, Optional[int]] = None
+) -> List[Discrepancy]:
+    """
+    Finds the reviewees of the period without a Part 1 assessment by their line manager,
+    the assessments nominated more than once, and the assessments by anybody else.
+
+    :param line_managers: The line manager of each user by pk, by default from resourcing
+    """
+    nominations = Nomination.objects.filter(period=period)
+    reviewees = set(nominations.values_list("reviewee_id", flat=True).distinct())
+    assessments = defaultdict(list)
+    for pk, reviewer_id, reviewee_id in (
+        nominations.filter(role=ReviewerRole.ASSESSMENT_PT_1)
+        .order_by("pk")
+        .values_list("pk", "reviewer_id", "reviewee_id")
+    ):
+        assessments[reviewee_id, reviewer_id].append(pk)
+
+    if line_managers is None:
+        line_managers = current_line_managers(reviewees)
+
+    discrepancies = []
+    for reviewee in sorted(reviewees):
+        line_manager = line_managers.get(reviewee)
+        if line_manager is None:
+            discrepancies.append(Discrepancy(NO_LINE_MANAGER, reviewee))
+        elif (reviewee, line_manager) not in assessments:
+            discrepancies.append(Discrepancy(MISSING, reviewee, line_manager))
+
+    for (reviewee, reviewer), pks in sorted(
+        assessments.items(), key=lambda item: item[1]
+    ):
+        if reviewer is None or line_managers.get(reviewee) != reviewer:
+            discrepancies.extend(
+                Discrepancy(ORPHANED, reviewee, reviewer, (pk,)) for pk in pks
+            )
+        elif len(pks) > 1:
+            discrepancies.append(Discrepancy(DUPLICATE, reviewee, reviewer, tuple(pks)))
+
+    users = User.objects.in_bulk(
+        {d.reviewee_id for d in discrepancies}
+        | {d.reviewer_id for d in discrepancies if d.reviewer_id is not None}
+    )
+    for discrepancy in discrepancies:
+        discrepancy.reviewee = str(users.get(discrepancy.reviewee_id, ""))
+        discrepancy.reviewer = str(users.get(discrepancy.reviewer_id, ""))
+    return discrepancies
+
+
+def write_text(discrepancies: List[Discrepancy], file: TextIO):
+    for discrepancy in discrepancies:
+        print(discrepancy, file=file)
+
+
+def write_csv(discrepancies: List[Discrepancy], file: TextIO):
+    writer = csv.DictWriter(file, FIELDS)
+    writer.writeheader()
+    for discrepancy in discrepancies:
+        row = asdict(discrepancy)
+        row["nominations"] = " ".join(map(str, discrepancy.nominations))
+        writer.writerow(row)
+
+
+def write_json(discrepancies: List[Discrepancy], file: TextIO):
+    json.dump([asdict(d) for d in discrepancies], file, indent=2)
+    file.write("\n")
+
+
+WRITERS = {"text": write_text, "csv": write_csv, "json": write_json}
@@ -1,117 +1,213 @@
 import logging
+import shutil
 from pathlib import Path
-from tempfile import TemporaryDirectory
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
-from django.db.models import QuerySet
-from office365.api.sharepoint.file import upload_file
-from office365.api.sharepoint.util import parse_sharepoint_path
-from reviews.models import Nomination, ReviewerRole
-from reviews.util.word_export.assessment import AssessmentDocument
-from reviews.util.word_export.review import ReviewDocument
+from django.db.models import Q
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.models import ExportManifestEntry, Nomination, ReviewerRole
+from teamsite_staff_reviews.reports.review_export.planner import ExportPlan
+from teamsite_staff_reviews.util.sharepoint import FolderResolver
+from teamsite_staff_reviews.util.upload import UploadQueue, sharepoint_uploader
+from teamsite_staff_reviews.util.word_export.records import NominationRecord
+from teamsite_staff_reviews.util.word_export.review import ReviewDocument
+from teamsite_staff_reviews.util.word_export.snapshot import ExportSnapshot
 
 logger = logging.getLogger(__name__)
 
 
-def nomination_to_word(nomination: Nomination, filename):
+def single_review_location(record: NominationRecord) -> Tuple[str, str]:
+    dir = f"{record.period}/responses/{record.reviewee_name}"
+    if record.role == ReviewerRole.ASSESSMENT_PT_1:
+        filename = (
+            f"{record.period} - {record.reviewee_name} - {record.form_title}.docx"
+        )
+    else:
+        filename = f"{record.reviewer_name} - {record.form_title}.docx"
+    return dir, filename
+
+
+def grouped_review_location(record: NominationRecord) -> Tuple[str, str]:
+    dir = f"{record.period}/responses/{record.reviewee_name}"
+    filename = f"{record.period} - {record.reviewee_name} - All Feedback.docx"
+    return dir, filename
+
+
+def export_by_reviewee(
+    saver,
+    task_name=None,
+    export_reviewee=False,
+    workers: int = None,
+    queue: UploadQueue = None,
+    **query,
+):
     """
-    Export a nomination to a Word document.
-    :param nomination:
-    :param filename:
-    :return:
+    Export the reviews matching the query as single documents and, with export_reviewee,
+    also as one combined document per reviewee. With a queue, the documents are saved in
+    the background.
     """
-    if nomination.role == ReviewerRole.ASSESSMENT_PT_1:
-        document = AssessmentDocument(nomination)
-        document.save(filename)
-    else:
-        document = ReviewDocument(nomination)
-        document.save(filename)
+    if queue is not None:
+        saver = queue.saver(saver)
+    queryset = Nomination.objects.filter(**query)
+    logger.info("Exporting %s nominations (%s)", queryset.count(), task_name or "")
+
+    snapshot = ExportSnapshot(queryset.order_by("reviewee__username"))
+    plan = ExportPlan()
+    for record in snapshot:
+        plan.add_single(record, single_review_location(record))
+    if export_reviewee:
+        plan_grouped_reviews(plan, snapshot)
+    save_plan(plan, saver, workers)
 
 
-def nomination_list_to_word(nomination_list: List[Nomination], filename):
+def plan_grouped_reviews(plan: ExportPlan, records: Iterable[NominationRecord]):
     """
-    Export a list of nominations to a Word document.
-    :param nomination_list:
-    :param filename:
-    :return:
+    Adds a document per reviewee with all their reviews, except for the assessments.
     """
-    document = ReviewDocument(*nomination_list)
-    document.save(filename)
+    groups: Dict[object, List[NominationRecord]] = {}
+    for record in records:
+        if record.role != ReviewerRole.ASSESSMENT_PT_1:
+            groups.setdefault(record.reviewee_id, []).append(record)
+    for members in groups.values():
+        plan.add(ReviewDocument, members, grouped_review_location(members[0]))
+    return groups
 
 
-def export_nominations(nomination_query: QuerySet) -> Tuple[Nomination, Path]:
+def save_plan(plan: ExportPlan, saver, workers: int = None) -> set:
     """
-    A generator that yields a tuple of (nomination, path) for each nomination in the query.
+    Renders the plan, whose destinations are (dir, filename) tuples, and saves the
+    documents.
 
-    :param nomination_query: The nominations to export.
-    :return:
+    :return: The pks of the nominations in documents that failed to save
     """
-    with TemporaryDirectory() as dirname:
-        reviewee_set = set()
-        for nomination in nomination_query.order_by("reviewee__username"):
-            reviewee_set.add((nomination.reviewee_id, nomination.period_id))
-            path = Path(dirname) / f"nomination-{nomination.pk}.docx"
-            nomination_to_word(nomination, path.absolute())
-            yield nomination, path
-
-
-def export_grouped_nominations(
-    nomination_query: QuerySet, order_by: str
-) -> Tuple[Dict, Path]:
+    failed = set()
+    for bundle, buffer in plan.render(workers):
+        dir, filename = bundle.destination
+        try:
+            saver(buffer, dir, filename)
+        except:
+            logger.exception("Failed to save reviews to %s/%s", dir, filename)
+            failed.update(r.pk for r in bundle.records)
+    return failed
+
+
+def export_changed_reviews(
+    saver,
+    target: str,
+    full: bool = False,
+    workers: int = None,
+    queue: UploadQueue = None,
+    **query,
+) -> Dict[str, int]:
     """
-    A generator that yields a tuple of (nomination info, path) for a summary documentation for each nomination
-    group in the query. Nominations are grouped by the 'order_by' argument.
-
-    :param nomination_query: The nominations to export.
-    :param order_by: The field to group by.
-    :return:
+    Exports the single and grouped documents for the reviews matching the query that have
+    changed since they were last exported to the target, and records what was exported in
+    the export manifest.
+
+    :param saver: The saver for the documents
+    :param target: The export location, used to keep a manifest per location
+    :param full: Check every nomination, not only those with responses modified since the
+        last export
+    :param workers: The number of rendering processes
+    :param queue: An upload queue to save the documents in the background
+    :return: A summary of the export
     """
-    with TemporaryDirectory() as dirname:
-
-        def flush(group, nominations: List[Nomination]):
-            if group is None:
-                return None
-            if len(nominations) == 0:
-                yield None
-            path = Path(dirname) / f"reviewee-{group}.docx"
-            nomination_list_to_word(nominations, path.absolute())
-            yield dict(order_by=order_by, group=group, nominations=nominations), path
-
-        last_group = None
-        group_members: List[Nomination] = []
-        for nomination in nomination_query.order_by(order_by):
-            group = getattr(nomination, order_by)
-            if group != last_group:
-                for r in flush(last_group, group_members):
-                    if r is not None:
-                        yield r
-            last_group = group
-            group_members.append(nomination)
-        for r in flush(last_group, group_members):
-            if r is not None:
-                yield r
+    if queue is not None:
+        saver = queue.saver(saver)
+    # The nominations in each saved file, to match them to queued upload results
+    saved: Dict[str, set] = {}
+
+    queryset = Nomination.objects.filter(**query)
+    candidates = queryset if full else queryset.changed_since_export(target)
+
+    started = now()
+    snapshot = ExportSnapshot(
+        Nomination.objects.filter(pk__in=candidates.values("pk")).order_by(
+            "reviewee__username"
+        )
+    )
+    manifest = dict(
+        ExportManifestEntry.objects.filter(
+            target=target, nomination_id__in=[r.pk for r in snapshot]
+        ).values_list("nomination_id", "content_hash")
+    )
+    hashes = {record.pk: record.content_hash for record in snapshot}
+    changed = [
+        record for record in snapshot if manifest.get(record.pk) != hashes[record.pk]
+    ]
+
+    plan = ExportPlan()
+    for record in changed:
+        plan.add_single(record, single_review_location(record))
+
+    reviewees = {
+        r.reviewee_id for r in changed if r.role != ReviewerRole.ASSESSMENT_PT_1
+    }
+    groups = plan_grouped_reviews(
+        plan,
+        ExportSnapshot(
+            queryset.filter(
+                ~Q(role=ReviewerRole.ASSESSMENT_PT_1), reviewee__in=reviewees
+            ).order_by("reviewee__username")
+        ),
+    )
+
+    for bundle in plan.bundles:
+        dir, filename = bundle.destination
+        saved.setdefault(f"{dir}/{filename}", set()).update(
+            r.pk for r in bundle.records
+        )
+    failed = save_plan(plan, saver, workers)
+
+    if queue is not None:
+        for result in queue.join():
+            if not result.ok:
+                failed.update(saved.get(result.name, ()))
+
+    # Unchanged nominations are recorded too, to move their watermark past the check
+    ExportManifestEntry.objects.record(
+        target,
+        {pk: content_hash for pk, content_hash in hashes.items() if pk not in failed},
+        exported=started,
+    )
+
+    summary = dict(
+        checked=len(snapshot),
+        exported=len(changed),
+        grouped=len(groups),
+        failed=len(failed & set(hashes)),
+    )
+    logger.info("Exported changed reviews to %s: %s", target, summary)
+    return summary
 
 
 def save_to_fs(location):
     if location is None or location == "":
         location = "."
 
-    def saver(path, dir, filename):
+    def saver(source, dir, filename):
         dir = Path(location) / dir
         dir.mkdir(parents=True, exist_ok=True)
         filename = dir / filename
-        Path(path).rename(filename)
+        if isinstance(source, (str, Path)):
+            Path(source).rename(filename)
+        else:
+            with open(filename, "wb") as FILE:
+                shutil.copyfileobj(source, FILE)
         logger.info(f"Saved {filename}")
 
     return saver
 
 
 def save_to_sharepoint(location):
-    def saver(path, dir, filename):
-        drive, filename = parse_sharepoint_path(f"{location}/{dir}/{filename}")
-        with open(path, "rb") as FILE:
-            data = FILE.read()
-        upload_file(drive["id"], filename, data)
-        logger.info(f"Uploaded {filename}")
+    from office365.api.sharepoint import API_URL
+
+    uploader = sharepoint_uploader()
+    folders = FolderResolver(uploader, API_URL)
+
+    def saver(source, dir, filename):
+        uploader.upload(source, folders.item_url(f"{location}/{dir}", filename))
+        logger.info(f"Uploaded {dir}/{filename}")
 
     return saver
@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import django
+from django.apps import apps
+from django.db import connections
+
+from teamsite_staff_reviews.models import ReviewerRole
+from teamsite_staff_reviews.util.word_export.assessment import AssessmentDocument
+from teamsite_staff_reviews.util.word_export.records import NominationRecord
+from teamsite_staff_reviews.util.word_export.review import ReviewDocument
+
+
+@dataclass
+class Bundle:
+    """
+    An output document: the records it contains, rendered with the document class, and where
+    it goes. The destination is only used by the caller.
+    """
+
+    document_class: type
+    records: List[NominationRecord]
+    destination: Any = None
+
+    @property
+    def key(self) -> Tuple:
+        return self.document_class, tuple(r.pk for r in self.records)
+
+
+@dataclass
+class ExportPlan:
+    """
+    The documents for an export. The bundles for each reviewee are rendered together, so a
+    nomination is rendered once however many documents it appears in: identical documents
+    are rendered once, and review sections are copied between the single and grouped
+    documents.
+    """
+
+    bundles: List[Bundle] = field(default_factory=list)
+
+    def add(self, document_class, records: List[NominationRecord], destination=None):
+        self.bundles.append(Bundle(document_class, list(records), destination))
+
+    def add_single(self, record: NominationRecord, destination=None):
+        """
+        Adds the document for a single nomination, as an appraisal form for assessments.
+        """
+        if record.role == ReviewerRole.ASSESSMENT_PT_1:
+            self.add(AssessmentDocument, [record], destination)
+        else:
+            self.add(ReviewDocument, [record], destination)
+
+    def batches(self) -> List[List[Bundle]]:
+        """
+        The bundles grouped by the reviewee of their first record, in the order they were
+        added.
+        """
+        batches: Dict[int, List[Bundle]] = {}
+        for bundle in self.bundles:
+            batches.setdefault(bundle.records[0].reviewee_id, []).append(bundle)
+        return list(batches.values())
+
+    def render(self, workers: int = None) -> Iterable[Tuple[Bundle, BytesIO]]:
+        """
+        A generator that renders the bundles and yields (bundle, buffer) tuples, a
+        reviewee at a time. With more than one worker, the reviewees are rendered in a
+        process pool.
+
+        :param workers: The number of worker processes, or None to render in this process
+        """
+        batches = self.batches()
+        # Each distinct document in a batch is rendered once
+        unique = [
+            {b.key: (b.document_class, b.records) for b in batch} for batch in batches
+        ]
+        jobs = [list(documents.values()) for documents in unique]
+        for batch, documents, rendered in zip(
+            batches, unique, render_in_pool(render_batch, jobs, workers)
+        ):
+            rendered = dict(zip(documents, rendered))
+            for bundle in batch:
+                yield bundle, BytesIO(rendered[bundle.key])
+
+
+def render_batch(jobs: List[Tuple]) -> List[bytes]:
+    """
+    Renders (document class, records) jobs to the bytes of each document, sharing the
+    rendered review sections between them.
+    """
+    sections = {}
+    documents = []
+    for document_class, records in jobs:
+        if issubclass(document_class, ReviewDocument):
+            document = document_class(*records, sections=sections)
+        else:
+            document = document_class(*records)
+        buffer = BytesIO()
+        document.save(buffer)
+        documents.append(buffer.getvalue())
+    return documents
+
+
+def _init_worker():
+    if not apps.ready:
+        django.setup()
+
+
+def render_in_pool(render: Callable, jobs: List, workers: int = None) -> Iterable:
+    """
+    A generator that yields render(job) for each job, in order. With more than one worker,
+    the jobs run in a process pool, so render and the jobs must be picklable and must not
+    touch the database.
+    """
+    if not workers or workers <= 1:
+        for job in jobs:
+            yield render(job)
+        return
+
+    # Forked workers must not inherit open database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(render, jobs)
@@ -0,0 +1,111 @@
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+from django.contrib.auth import get_user_model
+
+from teamsite_staff_reviews.models import Nomination, count_words
+
+User = get_user_model()
+
+COLUMNS = ["time", "char_length", "word_length", "reviewers"]
+
+
+class ResponseTimeseries:
+    """
+    Running totals of the length of all responses and of the number of reviewers, by cohort,
+    as response revisions are added in the order they were made. The lengths of the latest
+    revision of each response are kept, so each revision is only counted once.
+    """
+
+    def __init__(self):
+        self.char_length = 0
+        self.word_length = 0
+        self.reviewers = set()
+        self.cohorts = Counter()
+        self.__lengths: Dict[object, Tuple[int, int]] = {}
+
+    def add(self, time, response_id, value, reviewer=None, cohort=None) -> Dict:
+        """
+        Adds a revision of a response.
+
+        :param time: When the revision was made
+        :param response_id: The response the revision is of
+        :param value: The value of the response after the revision
+        :param reviewer: The reviewer, for the revision that created the response
+        :param cohort: The cohort of the reviewer
+        :return: The datapoint for the totals after the revision
+        """
+        chars, words = len(value or ""), count_words(value)
+        previous_chars, previous_words = self.__lengths.get(response_id, (0, 0))
+        self.__lengths[response_id] = chars, words
+        self.char_length += chars - previous_chars
+        self.word_length += words - previous_words
+
+        if reviewer is not None and reviewer not in self.reviewers:
+            self.reviewers.add(reviewer)
+            self.cohorts[cohort] += 1
+
+        return {
+            "time": time,
+            "char_length": self.char_length,
+            "word_length": self.word_length,
+            "reviewers": len(self.reviewers),
+            **self.cohorts,
+        }
+
+
+def reviewer_cohorts(nomination_ids) -> Dict[int, Tuple[str, str]]:
+    """
+    The (reviewer name, cohort name) of each nomination, with the profiles and cohorts
+    loaded in one query. Without the resourcing app's profiles, the cohorts are unknown.
+    """
+    related = "reviewer__profile__cohort" if hasattr(User, "profile") else "reviewer"
+    reviewers = {}
+    for nomination in Nomination.objects.filter(pk__in=nomination_ids).select_related(
+        related
+    ):
+        if nomination.reviewer is None:
+            cohort = "External"
+        else:
+            profile = getattr(nomination.reviewer, "profile", None)
+            cohort = profile.cohort.name if profile and profile.cohort else "Unknown"
+        reviewers[nomination.pk] = (nomination.reviewer_name, cohort)
+    return reviewers
+
+
+def write_timeseries(
+    filename, revisions: Iterable[Tuple], reviewers: Dict[int, Tuple[str, str]]
+):
+    """
+    Writes the running totals after each response revision to a spreadsheet, a row at a
+    time, with a column for the number of reviewers in each cohort.
+
+    :param filename: The spreadsheet to write
+    :param revisions: A (time, response, created) tuple for each response revision, in the
+        order they were made
+    :param reviewers: The (reviewer name, cohort name) of each nomination, in the order of
+        their first response
+    """
+    import xlsxwriter
+
+    cohorts = dict.fromkeys(cohort for _, cohort in reviewers.values())
+    columns = [*COLUMNS, *cohorts]
+
+    workbook = xlsxwriter.Workbook(
+        filename, {"constant_memory": True, "remove_timezone": True}
+    )
+    worksheet = workbook.add_worksheet("Reviews")
+    time_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    worksheet.write_row(0, 0, columns)
+
+    timeseries = ResponseTimeseries()
+    for row, (time, response, created) in enumerate(revisions, start=1):
+        reviewer = cohort = None
+        if created:
+            reviewer, cohort = reviewers.get(response.nomination_id, (None, None))
+
+        datapoint = timeseries.add(time, response.pk, response.value, reviewer, cohort)
+        worksheet.write_datetime(row, 0, datapoint["time"], time_format)
+        worksheet.write_row(row, 1, [datapoint.get(k) for k in columns[1:]])
+
+    workbook.close()
@@ -0,0 +1,200 @@
+import re
+from collections import Counter
+from typing import Iterable, Iterator
+
+from teamsite_staff_reviews.models import ReviewFormResponse
+
+STOPWORDS = frozenset(
+    """
+i
+me
+my
+myself
+we
+our
+ours
+ourselves
+you
+your
+yours
+yourself
+yourselves
+he
+him
+his
+himself
+she
+her
+hers
+herself
+it
+its
+itself
+they
+them
+their
+theirs
+themselves
+what
+which
+who
+whom
+this
+that
+these
+those
+am
+is
+are
+was
+were
+be
+been
+being
+have
+has
+had
+having
+do
+does
+did
+doing
+a
+an
+the
+and
+but
+if
+or
+because
+as
+until
+while
+of
+at
+by
+for
+with
+about
+against
+between
+into
+through
+during
+before
+after
+above
+below
+to
+from
+up
+down
+in
+out
+on
+off
+over
+under
+again
+further
+then
+once
+here
+there
+when
+where
+why
+how
+all
+any
+both
+each
+few
+more
+most
+other
+some
+such
+no
+nor
+not
+only
+own
+same
+so
+than
+too
+very
+s
+t
+can
+will
+just
+don
+should
+now
+ive
+im
+eg
+us
+also
+""".split()
+)
+
+# Anything but letters and whitespace is dropped, so "I've" becomes "ive"
+_non_letters = re.compile(r"[^\w\s]|[\d_]")
+
+# Abbreviations counted as the words they stand for
+EXPANSIONS = {
+    "sf": ("social", "finance"),
+}
+
+
+def stem(word: str) -> str:
+    """
+    Crudely strips plurals and "ing" endings, so "reviews" and "reviewing" both count as
+    "review".
+    """
+    if word.endswith("s"):
+        word = word[:-1]
+    if word.endswith("ing"):
+        word = word[:-3]
+    return word
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """
+    Yields the stemmed words of the text that aren't stopwords.
+    """
+    for word in _non_letters.sub("", (text or "").lower()).split():
+        for word in EXPANSIONS.get(word, (word,)):
+            if word not in STOPWORDS:
+                yield stem(word)
+
+
+def response_values(period=None, role=None, question=None) -> Iterator[str]:
+    """
+    Streams the response values, optionally only those for a period, a reviewer role, or
+    questions whose title contains the question text.
+    """
+    query = ReviewFormResponse.objects.all()
+    if period is not None:
+        query = query.filter(nomination__period=period)
+    if role is not None:
+        query = query.filter(nomination__role=role)
+    if question is not None:
+        query = query.filter(question__title__icontains=question)
+    return query.values_list("value", flat=True).iterator(chunk_size=2000)
+
+
+def word_frequencies(values: Iterable[str], counter: Counter = None) -> Counter:
+    """
+    Counts the words in the values, one value at a time.
+
+    :param values: The texts to count, e.g. from response_values
+    :param counter: A counter to add to
+    """
+    counter = Counter() if counter is None else counter
+    for value in values:
+        counter.update(tokenize(value))
+    return counter
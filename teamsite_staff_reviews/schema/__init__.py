@@ -1,10 +1,13 @@
 import graphene
-from django.utils.timezone import now
 
-from ..models import ReviewStage
+from .cycle import get_current_cycle
 from .nomination_mutation import NominationCreateMutation, NominationDeleteMutation
 from .review_cycle import ReviewCycleNode
-from .reviewer_mutation import ExternalSendMutation, ResponseUpdateMutation
+from .reviewer_mutation import (
+    ExternalSendMutation,
+    ResponseBatchUpdateMutation,
+    ResponseUpdateMutation,
+)
 
 
 class Query(object):
@@ -12,23 +15,17 @@ class Query(object):
 
     @staticmethod
     def resolve_current_review_cycle(obj, info, **kwargs):
-        stage = (
-            ReviewStage.objects.filter(
-                code="OPEN",
-                date__lte=now(),
-            )
-            .order_by("-date")
-            .first()
-        )
-        if stage is None:
+        period = get_current_cycle(info)
+        if period is None:
             return None
 
-        stage.period.user = info.context.user
-        return stage.period
+        period.user = info.context.user
+        return period
 
 
 class Mutation(graphene.ObjectType):
     create_nomination = NominationCreateMutation.Field()
     delete_nomination = NominationDeleteMutation.Field()
     update_review_response = ResponseUpdateMutation.Field()
+    update_review_responses = ResponseBatchUpdateMutation.Field()
     send_external = ExternalSendMutation.Field()
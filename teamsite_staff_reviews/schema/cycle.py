@@ -0,0 +1,17 @@
+from ..models import ReviewPeriod
+from ..util.graphql import get_request_cache
+
+
+def load_current_cycle():
+    """
+    Loads the current review period together with all its stages and forms.
+    """
+    return ReviewPeriod.objects.with_cycle().get_current()
+
+
+def get_current_cycle(info):
+    """
+    Returns the current review period for this request. The period is loaded once and shared
+    by all resolvers and mutations, so stage and form lookups on it do not hit the database.
+    """
+    return get_request_cache(info, "cycle", load_current_cycle)
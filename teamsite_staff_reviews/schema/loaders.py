@@ -0,0 +1,158 @@
+from collections import defaultdict
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from graphene.relay import ConnectionField
+from graphene.utils.thenables import maybe_thenable
+from graphene_django import DjangoConnectionField
+
+from ..models import NominationSummary, ReviewerRole, ReviewForm, ReviewFormResponse
+from ..util.graphql import get_request_cache
+from .cycle import get_current_cycle
+
+User = get_user_model()
+
+
+class DataLoader:
+    """
+    A request-scoped batching loader for synchronous resolvers.
+
+    Connection resolvers `prime` the keys of every node they return. The first `load` of any
+    key then fetches all pending keys in a single batch, so the number of queries does not
+    depend on the number of nodes.
+    """
+
+    def __init__(self, batch_load_fn, default=None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self._cache = {}
+        self._pending = set()
+
+    def prime(self, keys):
+        self._pending.update(key for key in keys if key not in self._cache)
+
+    def set(self, key, value):
+        self._cache[key] = value
+        self._pending.discard(key)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._pending.add(key)
+            keys, self._pending = self._pending, set()
+            values = self.batch_load_fn(keys)
+            for k in keys:
+                if k in values:
+                    self._cache[k] = values[k]
+                else:
+                    self._cache[k] = self.default() if self.default else None
+        return self._cache[key]
+
+
+def load_forms(keys):
+    periods = {period_id for period_id, role in keys}
+    return {
+        (form.period_id, form.role): form
+        for form in ReviewForm.objects.filter(period_id__in=periods)
+    }
+
+
+def load_responses(keys):
+    responses = defaultdict(list)
+    for response in ReviewFormResponse.objects.filter(nomination_id__in=keys):
+        responses[response.nomination_id].append(response)
+    return responses
+
+
+def load_summaries(keys):
+    return NominationSummary.objects.in_bulk(keys)
+
+
+def load_users(keys):
+    return User.objects.in_bulk(keys)
+
+
+class Loaders:
+    def __init__(self, info):
+        self.forms = DataLoader(load_forms)
+        self.responses = DataLoader(load_responses, default=list)
+        self.users = DataLoader(load_users)
+        self.summaries = DataLoader(load_summaries)
+
+        period = get_current_cycle(info)
+        if period is not None:
+            for role in ReviewerRole:
+                self.forms.set((period.pk, role.value), period.get_form(role))
+
+    def prime_nominations(self, nominations):
+        self.forms.prime((n.period_id, n.role) for n in nominations)
+        self.responses.prime(n.pk for n in nominations)
+        self.summaries.prime(n.pk for n in nominations)
+        self.users.prime(n.reviewee_id for n in nominations)
+        self.users.prime(n.reviewer_id for n in nominations if n.reviewer_id)
+
+
+def get_loaders(info):
+    return get_request_cache(info, "loaders", lambda: Loaders(info))
+
+
+def prime_nominations(info, nominations):
+    """
+    Evaluates a nomination queryset and primes the loaders with every nomination in it.
+    """
+    nominations = list(nominations)
+    get_loaders(info).prime_nominations(nominations)
+    return nominations
+
+
+def prime_page(info, connection):
+    """
+    Primes the loaders with the nominations on a resolved page of a connection.
+    """
+    get_loaders(info).prime_nominations([edge.node for edge in connection.edges])
+    return connection
+
+
+class PrimedDjangoConnectionField(DjangoConnectionField):
+    """
+    A connection of nominations that primes the loaders with the page being returned, so
+    only that page is loaded, after the node type's get_queryset and the pagination.
+    """
+
+    @classmethod
+    def connection_resolver(
+        cls,
+        resolver,
+        connection,
+        default_manager,
+        queryset_resolver,
+        max_limit,
+        enforce_first_or_last,
+        root,
+        info,
+        **args,
+    ):
+        connection = super().connection_resolver(
+            resolver,
+            connection,
+            default_manager,
+            queryset_resolver,
+            max_limit,
+            enforce_first_or_last,
+            root,
+            info,
+            **args,
+        )
+        return maybe_thenable(connection, partial(prime_page, info))
+
+
+class PrimedConnectionField(ConnectionField):
+    """
+    As PrimedDjangoConnectionField, for connections of nominations that aren't Django types.
+    """
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection_type, root, info, **args):
+        connection = super().connection_resolver(
+            resolver, connection_type, root, info, **args
+        )
+        return maybe_thenable(connection, partial(prime_page, info))
@@ -7,6 +7,7 @@ from ..models import (
     ExternalInvitation,
     ExternalInvitationMessage,
     Nomination,
+    NominationSummary,
     ReviewerRole,
     ReviewForm,
     ReviewFormQuestion,
@@ -14,7 +15,10 @@ from ..models import (
     ReviewPeriod,
     ReviewRound,
     ReviewStage,
+    SummaryStatus,
 )
+from .cycle import get_current_cycle
+from .loaders import PrimedConnectionField, get_loaders
 
 
 class ReviewStageNode(DjangoObjectType):
@@ -24,6 +28,26 @@ class ReviewStageNode(DjangoObjectType):
         fields = "__all__"
 
 
+class NominationSummaryNode(DjangoObjectType):
+    status_label = graphene.String()
+
+    @staticmethod
+    def resolve_status_label(obj, info, **kwargs):
+        return SummaryStatus(obj.status).label
+
+    class Meta:
+        model = NominationSummary
+        fields = (
+            "questions",
+            "answered",
+            "words",
+            "first_modified",
+            "last_modified",
+            "status",
+            "status_label",
+        )
+
+
 class NominationNodeIF(graphene.relay.Node):
     period = graphene.Field("reviews.schema.nodes.ReviewPeriodNode")
     reviewer = graphene.Field("resourcing.schema.user.UserNode")
@@ -36,6 +60,7 @@ class NominationNodeIF(graphene.relay.Node):
     closes_override = graphene.DateTime()
     external_name = graphene.String()
     external_email = graphene.String()
+    summary = graphene.Field(NominationSummaryNode)
 
 
 class NominationNode(DjangoObjectType):
@@ -43,6 +68,32 @@ class NominationNode(DjangoObjectType):
     def resolve_role_label(obj, info, **kwargs):
         return ReviewerRole(obj.role).label
 
+    @staticmethod
+    def resolve_form(obj, info, **kwargs):
+        return get_loaders(info).forms.load((obj.period_id, obj.role))
+
+    @staticmethod
+    def resolve_responses(obj, info, **kwargs):
+        return get_loaders(info).responses.load(obj.pk)
+
+    @staticmethod
+    def resolve_summary(obj, info, **kwargs):
+        # Reviewees mustn't see how far their reviewers have got
+        user = info.context.user
+        if obj.reviewer_id != user.pk and not user.is_staff:
+            return None
+        return get_loaders(info).summaries.load(obj.pk)
+
+    @staticmethod
+    def resolve_reviewer(obj, info, **kwargs):
+        if obj.reviewer_id is None:
+            return None
+        return get_loaders(info).users.load(obj.reviewer_id)
+
+    @staticmethod
+    def resolve_reviewee(obj, info, **kwargs):
+        return get_loaders(info).users.load(obj.reviewee_id)
+
     class Meta:
         model = Nomination
         fields = "__all__"
@@ -51,8 +102,8 @@ class NominationNode(DjangoObjectType):
 
 class LineReportNode(ObjectType):
     user = graphene.Field("resourcing.schema.user.UserNode")
-    nominations = graphene.relay.ConnectionField(
-        "reviews.schema.special_linemanager.LineManagerNominationConnection"
+    nominations = PrimedConnectionField(
+        "teamsite_staff_reviews.schema.special_linemanager.LineManagerNominationConnection"
     )
 
     @staticmethod
@@ -61,15 +112,18 @@ class LineReportNode(ObjectType):
 
     @staticmethod
     def resolve_nominations(obj, info, **kwargs):
-        return (
-            Nomination.objects.filter(reviewee=obj, period_id=obj.period_id)
-            .annotate(
-                search_name=Concat(
-                    "reviewer__first_name", "reviewer__last_name", "external_name"
-                )
+        period = get_current_cycle(info)
+        if period is not None and period.pk == obj.period_id:
+            nominations = period.nominations.filter(reviewee=obj)
+        else:
+            nominations = Nomination.objects.filter(
+                reviewee=obj, period_id=obj.period_id
             )
-            .order_by("search_name")
-        )
+        return nominations.annotate(
+            search_name=Concat(
+                "reviewer__first_name", "reviewer__last_name", "external_name"
+            )
+        ).order_by("search_name")
 
     class Meta:
         interfaces = (graphene.relay.Node,)
@@ -2,7 +2,10 @@ import graphene
 
 from .auth_mutation import RedeemTokenMutation, SendTokenMutation
 from .auth_query import AuthUserQuery
-from .external_reviewer_mutation import ExternalResponseUpdateMutation
+from .external_reviewer_mutation import (
+    ExternalResponseBatchUpdateMutation,
+    ExternalResponseUpdateMutation,
+)
 from .nodes import ExternalReviewerNode
 
 
@@ -27,3 +30,4 @@ class Mutation(graphene.ObjectType):
     send_token = SendTokenMutation.Field()
     redeem_token = RedeemTokenMutation.Field()
     update_review_response = ExternalResponseUpdateMutation.Field()
+    update_review_responses = ExternalResponseBatchUpdateMutation.Field()
@@ -4,7 +4,6 @@ import graphene
 from django.core.validators import validate_email
 from django.db import transaction
 from django.template.loader import render_to_string
-from django.utils.timezone import now
 
 from ...models import ExternalInvitation, ExternalUser, ExternalUserToken
 
@@ -74,11 +73,13 @@ class RedeemTokenMutation(graphene.Mutation):
     @transaction.atomic
     def mutate(self, info, token):
         try:
-            # token = ExternalUserToken.objects.get(secret=token, redeemed__isnull=True)
-            token = ExternalUserToken.objects.get(secret=token)
+            token = ExternalUserToken.objects.get_by_secret(token)
         except ExternalUserToken.DoesNotExist:
             raise ValueError("This token has already been used.")
 
+        if token.redeemed is not None:
+            raise ValueError("This token has already been used.")
+
         if token.expired:
             raise ValueError("This token has expired. Please request a new one.")
 
@@ -103,11 +104,12 @@ class RedeemTokenMutation(graphene.Mutation):
         jwt_token = SlidingToken.for_user(user)
         jwt_token["email"] = user.email
 
-        token.redeemed = now()
+        client_ip = None
         try:
-            token.client_ip = get_ip(info.context)
+            client_ip = get_ip(info.context)
         except:
             logger.exception("Failed to get user IP address")
-        token.save()
+        if not token.redeem(client_ip):
+            raise ValueError("This token has already been used.")
 
         return RedeemTokenMutation(token=str(jwt_token))
@@ -6,12 +6,26 @@ from graphql_relay.connection.arrayconnection import offset_to_cursor
 
 from teamsite_staff_reviews.util.graphql import get_id_from_type
 
-from ...models import Nomination, ReviewFormQuestion, ReviewFormResponse
+from ...models import Nomination
+from ..reviewer_mutation import ResponseInput, save_responses
 from .nodes import ReviewFormResponseNode
 
 ReviewFormResponseEdge = ReviewFormResponseNode._meta.connection.Edge
 
 
+def get_external_nomination(info, nomination_id):
+    from . import _get_user
+
+    user = _get_user(info.context)
+    try:
+        return Nomination.objects.get(
+            pk=get_id_from_type(nomination_id, "ExternalReviewerNominationNode"),
+            invitation__user=user,
+        )
+    except Nomination.DoesNotExist as ex:
+        raise PermissionDenied("Only reviewer can submit for this question") from ex
+
+
 class ExternalResponseUpdateMutation(graphene.relay.ClientIDMutation):
     response = graphene.Field(ReviewFormResponseNode)
     response_edge = graphene.Field(ReviewFormResponseEdge)
@@ -24,32 +38,26 @@ class ExternalResponseUpdateMutation(graphene.relay.ClientIDMutation):
     @classmethod
     @transaction.atomic()
     def mutate_and_get_payload(cls, root, info, nomination_id, question_id, value):
-        user = _get_user(info.context)
-        try:
-            nomination = Nomination.objects.get(
-                pk=get_id_from_type(nomination_id, "ExternalReviewerNominationNode"),
-                invitation__user=user,
-            )
-        except Nomination.DoesNotExist as ex:
-            raise PermissionDenied("Only reviewer can submit for this question") from ex
-
-        try:
-            question = ReviewFormQuestion.objects.get(
-                pk=get_id_from_type(question_id, "ReviewFormQuestionNode"),
-                form__role=nomination.role,
-            )
-        except ReviewFormQuestion.DoesNotExist as ex:
-            raise PermissionDenied(
-                "Cannot find this question for this nomination"
-            ) from ex
-
-        response, _ = ReviewFormResponse.objects.update_or_create(
-            nomination=nomination, question=question, defaults=dict(value=value)
-        )
-
-        if response.value != value:
-            response.value = value
-            response.save()
+        nomination = get_external_nomination(info, nomination_id)
+        (response,), _ = save_responses(nomination, [(question_id, value)])
 
         edge = ReviewFormResponseEdge(cursor=offset_to_cursor(0), node=response)
         return ExternalResponseUpdateMutation(response=response, response_edge=edge)
+
+
+class ExternalResponseBatchUpdateMutation(graphene.relay.ClientIDMutation):
+    responses = graphene.List(ReviewFormResponseNode)
+    changed = graphene.Int()
+
+    class Input:
+        nomination_id = graphene.ID(required=True)
+        responses = graphene.List(graphene.NonNull(ResponseInput), required=True)
+
+    @classmethod
+    @transaction.atomic()
+    def mutate_and_get_payload(cls, root, info, nomination_id, responses):
+        nomination = get_external_nomination(info, nomination_id)
+        responses, changed = save_responses(
+            nomination, [(r.question_id, r.value) for r in responses]
+        )
+        return ExternalResponseBatchUpdateMutation(responses=responses, changed=changed)
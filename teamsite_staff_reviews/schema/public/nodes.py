@@ -1,9 +1,10 @@
 import graphene
 from django.contrib.auth import get_user_model
-from graphene import ConnectionField, ObjectType
+from graphene import ObjectType
 from graphene_django import DjangoConnectionField, DjangoObjectType
 
-from ...models import ReviewForm
+from ...models import Nomination
+from ..loaders import PrimedConnectionField, get_loaders
 from ..nodes import ReviewFormNode, ReviewFormResponseNode
 
 User = get_user_model()
@@ -24,9 +25,17 @@ class ExternalReviewerNominationNode(ObjectType):
     form = graphene.Field(ReviewFormNode)
     responses = DjangoConnectionField(ReviewFormResponseNode)
 
+    @staticmethod
+    def resolve_reviewee(obj, info, **kwargs):
+        return get_loaders(info).users.load(obj.reviewee_id)
+
     @staticmethod
     def resolve_form(obj, info, **kwargs):
-        return ReviewForm.objects.filter(period=obj.period, role=obj.role).first()
+        return get_loaders(info).forms.load((obj.period_id, obj.role))
+
+    @staticmethod
+    def resolve_responses(obj, info, **kwargs):
+        return get_loaders(info).responses.load(obj.pk)
 
     class Meta:
         interfaces = (graphene.relay.Node,)
@@ -38,11 +47,11 @@ class ExternalReviewerNominationConnection(graphene.relay.Connection):
 
 
 class ExternalReviewerNode(ObjectType):
-    nominations = ConnectionField(ExternalReviewerNominationConnection)
+    nominations = PrimedConnectionField(ExternalReviewerNominationConnection)
 
     @staticmethod
     def resolve_nominations(obj, info, **kwargs):
-        return [inv.nomination for inv in obj.invitations.all()]
+        return Nomination.objects.filter(invitation__user=obj)
 
     class Meta:
         interfaces = (graphene.relay.Node,)
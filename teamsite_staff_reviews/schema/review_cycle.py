@@ -5,6 +5,7 @@ from django.utils.timezone import now
 from graphene import ObjectType
 from graphene_django import DjangoConnectionField
 
+from .loaders import PrimedDjangoConnectionField
 from .nodes import (
     LineReportConnection,
     NominationNode,
@@ -17,16 +18,28 @@ from .special_reviewer import ReviewerNode
 User = get_user_model()
 
 
+class PeriodProgressNode(ObjectType):
+    nominations = graphene.Int()
+    not_started = graphene.Int()
+    in_progress = graphene.Int()
+    complete = graphene.Int()
+    questions = graphene.Int()
+    answered = graphene.Int()
+    words = graphene.Int()
+    last_modified = graphene.DateTime()
+
+
 class ReviewCycleNode(ObjectType):
     period = graphene.Field(ReviewPeriodNode)
     stages = DjangoConnectionField(ReviewStageNode)
     current_stage = graphene.Field(ReviewStageNode)
-    nominations = DjangoConnectionField(NominationNode)
-    to_review = DjangoConnectionField(NominationNode)
+    nominations = PrimedDjangoConnectionField(NominationNode)
+    to_review = PrimedDjangoConnectionField(NominationNode)
     line_reports = graphene.relay.ConnectionField(LineReportConnection)
     forms = DjangoConnectionField(ReviewFormNode)
     reviewer_view = graphene.Field(ReviewerNode)
-    external_invites = DjangoConnectionField(NominationNode)
+    external_invites = PrimedDjangoConnectionField(NominationNode)
+    progress = graphene.Field(PeriodProgressNode)
 
     @staticmethod
     def resolve_id(obj, info, **kwargs):
@@ -42,7 +55,7 @@ class ReviewCycleNode(ObjectType):
 
     @staticmethod
     def resolve_current_stage(obj, info, **kwargs):
-        return obj.stages.filter(date__lte=now()).order_by("-date").first()
+        return obj.get_current_stage()
 
     @staticmethod
     def resolve_nominations(obj, info, **kwargs):
@@ -56,6 +69,12 @@ class ReviewCycleNode(ObjectType):
     def resolve_external_invites(obj, info, **kwargs):
         return obj.nominations.filter(reviewee=obj.user, invitation__isnull=False)
 
+    @staticmethod
+    def resolve_progress(obj, info, **kwargs):
+        if not info.context.user.is_staff:
+            return None
+        return obj.nominations.progress()
+
     @staticmethod
     def resolve_line_reports(obj, info, **kwargs):
         return (
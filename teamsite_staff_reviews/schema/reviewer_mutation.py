@@ -18,6 +18,51 @@ User = get_user_model()
 ReviewFormResponseEdge = ReviewFormResponseNode._meta.connection.Edge
 
 
+class ResponseInput(graphene.InputObjectType):
+    question_id = graphene.ID(required=True)
+    value = graphene.String(required=True)
+
+
+def save_responses(nomination, answers):
+    """
+    Saves a list of (question id, value) answers for a nomination. Unchanged answers are
+    skipped and the remaining ones are written in a single statement.
+
+    :return: A tuple of the stored responses, in question order, and the number written
+    """
+    values = {
+        int(get_id_from_type(question_id, "ReviewFormQuestionNode")): value
+        for question_id, value in answers
+    }
+    questions = ReviewFormQuestion.objects.filter(
+        pk__in=values,
+        form__period_id=nomination.period_id,
+        form__role=nomination.role,
+    ).values_list("pk", flat=True)
+    if set(questions) != set(values):
+        raise PermissionDenied("Cannot find this question for this nomination")
+
+    changed = ReviewFormResponse.objects.upsert(nomination, values)
+    responses = nomination.responses.filter(question_id__in=values).order_by(
+        "question__sequence"
+    )
+    return list(responses), changed
+
+
+def get_reviewer_nomination(info, nomination_id):
+    user = info.context.user
+    _type, _id = from_global_id(nomination_id)
+    try:
+        nomination = Nomination.objects.get(pk=_id, reviewer=user)
+    except Nomination.DoesNotExist as ex:
+        raise PermissionDenied("Only reviewer can submit for this question") from ex
+
+    if nomination.closes is not None and nomination.closes < now():
+        raise PermissionDenied("This nomination is now closed for submissions.")
+
+    return nomination
+
+
 class ResponseUpdateMutation(graphene.relay.ClientIDMutation):
     response = graphene.Field(ReviewFormResponseNode)
     response_edge = graphene.Field(ReviewFormResponseEdge)
@@ -30,36 +75,33 @@ class ResponseUpdateMutation(graphene.relay.ClientIDMutation):
     @classmethod
     @transaction.atomic()
     def mutate_and_get_payload(cls, root, info, nomination_id, question_id, value):
-        user = info.context.user
-        _type, _id = from_global_id(nomination_id)
-        try:
-            nomination = Nomination.objects.get(pk=_id, reviewer=user)
-        except Nomination.DoesNotExist as ex:
-            raise PermissionDenied("Only reviewer can submit for this question") from ex
+        nomination = get_reviewer_nomination(info, nomination_id)
+        (response,), _ = save_responses(nomination, [(question_id, value)])
 
-        if nomination.closes < now():
-            raise PermissionDenied("This nomination is now closed for submissions.")
+        edge = ReviewFormResponseEdge(cursor=offset_to_cursor(0), node=response)
+        return ResponseUpdateMutation(response=response, response_edge=edge)
 
-        try:
-            question = ReviewFormQuestion.objects.get(
-                pk=get_id_from_type(question_id, "ReviewFormQuestionNode"),
-                form__role=nomination.role,
-            )
-        except ReviewFormQuestion.DoesNotExist as ex:
-            raise PermissionDenied(
-                "Cannot find this question for this nomination"
-            ) from ex
 
-        response, created = ReviewFormResponse.objects.update_or_create(
-            nomination=nomination, question=question, defaults=dict(value=value)
-        )
+class ResponseBatchUpdateMutation(graphene.relay.ClientIDMutation):
+    """
+    Saves every changed answer of a nomination in one call.
+    """
 
-        if response.value != value:
-            response.value = value
-            response.save()
+    responses = graphene.List(ReviewFormResponseNode)
+    changed = graphene.Int()
 
-        edge = ReviewFormResponseEdge(cursor=offset_to_cursor(0), node=response)
-        return ResponseUpdateMutation(response=response, response_edge=edge)
+    class Input:
+        nomination_id = graphene.ID(required=True)
+        responses = graphene.List(graphene.NonNull(ResponseInput), required=True)
+
+    @classmethod
+    @transaction.atomic()
+    def mutate_and_get_payload(cls, root, info, nomination_id, responses):
+        nomination = get_reviewer_nomination(info, nomination_id)
+        responses, changed = save_responses(
+            nomination, [(r.question_id, r.value) for r in responses]
+        )
+        return ResponseBatchUpdateMutation(responses=responses, changed=changed)
 
 
 class ExternalSendMutation(graphene.Mutation):
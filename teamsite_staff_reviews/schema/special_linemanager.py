@@ -1,8 +1,9 @@
 import graphene
 from django.contrib.auth import get_user_model
-from django_celery_beat.utils import now
+from django.utils.timezone import now
 
 from ..models import Nomination
+from .loaders import get_loaders
 from .special_reviewer import ReviewerNominationNode, ReviewerNominationNodeIF
 
 User = get_user_model()
@@ -12,10 +13,19 @@ class LineManagerNominationNode(ReviewerNominationNode):
     @staticmethod
     def resolve_responses(obj, info, **kwargs):
         user = info.context.user
-        if obj.closes > now() and obj.reviewer != user:
+        # Without a deadline, the nomination is still open
+        if (obj.closes is None or obj.closes > now()) and obj.reviewer_id != user.pk:
             return []
         else:
-            return obj.responses
+            return get_loaders(info).responses.load(obj.pk)
+
+    @staticmethod
+    def resolve_summary(obj, info, **kwargs):
+        # Line managers follow the progress of their line reports' reviews, but reviewees
+        # mustn't see how far their reviewers have got
+        if obj.reviewee_id == info.context.user.pk:
+            return None
+        return get_loaders(info).summaries.load(obj.pk)
 
     class Meta:
         interfaces = (ReviewerNominationNodeIF,)
@@ -1,9 +1,10 @@
 import graphene
 from django.contrib.auth import get_user_model
-from graphene import ConnectionField, ObjectType
+from graphene import ObjectType
 from graphene_django import DjangoConnectionField
 
-from ..models import Nomination, ReviewForm
+from ..models import Nomination
+from .loaders import PrimedConnectionField
 from .nodes import (
     NominationNode,
     NominationNodeIF,
@@ -20,10 +21,6 @@ class ReviewerNominationNodeIF(NominationNodeIF):
 
 
 class ReviewerNominationNode(NominationNode):
-    @staticmethod
-    def resolve_form(obj, info, **kwargs):
-        return ReviewForm.objects.filter(period=obj.period, role=obj.role).first()
-
     class Meta:
         interfaces = (ReviewerNominationNodeIF,)
         fields = "__all__"
@@ -36,7 +33,7 @@ class ReviewerNominationConnection(graphene.relay.Connection):
 
 
 class ReviewerNode(ObjectType):
-    nominations = ConnectionField(ReviewerNominationConnection)
+    nominations = PrimedConnectionField(ReviewerNominationConnection)
 
     @staticmethod
     def resolve_nominations(obj, info, **kwargs):
@@ -0,0 +1,22 @@
+import logging
+from datetime import timedelta
+
+from teamsite_staff_reviews.models import ExternalUserToken
+
+logger = logging.getLogger(__name__)
+
+
+def purge_tokens(keep_days=7, batch_size=1000):
+    """
+    Deletes the login tokens that expired or were redeemed more than keep_days ago. Intended
+    to be run regularly, e.g. nightly, as a token is added every time a login link is sent.
+
+    :param keep_days: How long to keep used and expired tokens, e.g. to investigate logins
+    :param batch_size: The number of tokens deleted by each statement
+    :return: The number of tokens deleted
+    """
+    deleted = ExternalUserToken.objects.purge(
+        keep=timedelta(days=keep_days), batch_size=batch_size
+    )
+    logger.info("Purged %s login tokens", deleted)
+    return deleted
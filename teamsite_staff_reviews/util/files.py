@@ -0,0 +1,25 @@
+import logging
+import os
+from pathlib import Path
+from stat import S_ISDIR
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+def private_directory(path: Path) -> Optional[Path]:
+    """
+    Creates the directory, accessible only by this user, and returns it if it is a directory
+    that this user owns and no-one else can access, or None if not.
+    """
+    try:
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        stat = path.lstat()
+    except OSError:
+        log.warning(f"Could not create directory {path}", exc_info=True)
+        return None
+    owner = os.getuid() if hasattr(os, "getuid") else stat.st_uid
+    if not S_ISDIR(stat.st_mode) or stat.st_uid != owner or stat.st_mode & 0o077:
+        log.warning(f"Not using directory {path}, which other users can access")
+        return None
+    return path
@@ -7,3 +7,22 @@ def get_id_from_type(id, expected_type):
     if type != expected_type:
         raise ObjectDoesNotExist("That object does not exist")
     return pk
+
+
+def get_request_cache(info, name, factory):
+    """
+    Returns a value that is created once per GraphQL request and stored on the request context.
+
+    :param info: The resolver info
+    :param name: The attribute name to store the value under
+    :param factory: Called without arguments to create the value on first use
+    :return:
+    """
+    context = info.context
+    attr = f"_staff_reviews_{name}"
+    try:
+        return getattr(context, attr)
+    except AttributeError:
+        value = factory()
+        setattr(context, attr, value)
+        return value
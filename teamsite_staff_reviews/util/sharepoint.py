@@ -0,0 +1,169 @@
+import posixpath
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import quote
+
+import requests
+
+from teamsite_staff_reviews.util.upload import Uploader
+
+
+class TTLCache:
+    """
+    A dictionary whose entries expire a fixed time after they were set.
+    """
+
+    def __init__(self, ttl: timedelta = timedelta(minutes=10), clock=time.monotonic):
+        self.ttl = ttl.total_seconds()
+        self.clock = clock
+        self.__values = {}
+
+    def get(self, key, default=None):
+        try:
+            expires, value = self.__values[key]
+        except KeyError:
+            return default
+        if expires <= self.clock():
+            self.__values.pop(key, None)
+            return default
+        return value
+
+    def set(self, key, value):
+        self.__values[key] = (self.clock() + self.ttl, value)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+
+class FolderResolver:
+    """
+    Resolves sharepoint locations to drives and folder ids, creating missing folders. The
+    results are cached, so each drive and folder is looked up, or created, once however many
+    files are saved to it.
+
+    A location is a drive prefix and a path in the drive, e.g. "feedback:/2022 Mid Year".
+    Drives are cached by prefix and folders by drive and path, one level at a time, so
+    locations that share a drive or parent folders share their lookups.
+
+    :param uploader: The uploader whose tokens and retries are used for the requests
+    :param api_url: The graph API url
+    :param parse_path: Splits a sharepoint location into the drive and the path in the drive.
+        Defaults to the office365 parse_sharepoint_path.
+    :param ttl: How long resolved drives and folders are cached
+    """
+
+    def __init__(
+        self,
+        uploader: Uploader,
+        api_url: str,
+        parse_path=None,
+        ttl: timedelta = timedelta(minutes=10),
+    ):
+        self.uploader = uploader
+        self.api_url = api_url
+        self.parse_path = parse_path
+        self.drives = TTLCache(ttl)
+        self.folders = TTLCache(ttl)
+        # Concurrent uploads to the same new folder must not each try to create it, but
+        # uploads to different folders shouldn't wait for each other's requests
+        self.__locks = defaultdict(threading.Lock)
+        self.__locks_lock = threading.Lock()
+
+    def __lock(self, key) -> threading.Lock:
+        with self.__locks_lock:
+            return self.__locks[key]
+
+    def resolve(self, location):
+        """
+        Returns the (drive, path) of a sharepoint location, e.g. "feedback:/2022 Mid Year".
+        """
+        # Only the drive prefix ends at a colon, folder names may contain them too
+        prefix, sep, path = location.partition(":")
+        if not sep:
+            prefix, path = "", location
+        prefix += sep
+        drive = self.drives.get(prefix)
+        if drive is None:
+            with self.__lock(prefix):
+                drive = self.drives.get(prefix)
+                if drive is None:
+                    if self.parse_path is None:
+                        from office365.api.sharepoint.util import parse_sharepoint_path
+
+                        self.parse_path = parse_sharepoint_path
+                    drive, _ = self.parse_path(
+                        prefix, access_token=self.uploader.tokens.get()
+                    )
+                    self.drives.set(prefix, drive)
+        return drive, path.strip("/")
+
+    def folder_id(self, drive_id, path, create=True):
+        """
+        Returns the item id of the folder at path in the drive, or None if it doesn't exist
+        and create is False.
+        """
+        path = path.strip("/")
+        key = (drive_id, path)
+        folder_id = self.folders.get(key)
+        if folder_id is not None:
+            return folder_id
+
+        with self.__lock(key):
+            folder_id = self.folders.get(key)
+            if folder_id is not None:
+                return folder_id
+
+            if path:
+                url = f"{self.api_url}/drives/{drive_id}/root:/{quote(path)}"
+            else:
+                url = f"{self.api_url}/drives/{drive_id}/root"
+            try:
+                folder_id = self.uploader.request("GET", url).json()["id"]
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                if not create:
+                    return None
+                folder_id = self._create_folder(drive_id, path)
+            return self.folders.set(key, folder_id)
+
+    def _create_folder(self, drive_id, path):
+        parent, name = posixpath.split(path)
+        parent_id = self.folder_id(drive_id, parent)
+        try:
+            response = self.uploader.request(
+                "POST",
+                f"{self.api_url}/drives/{drive_id}/items/{parent_id}/children",
+                json={
+                    "name": name,
+                    "folder": {},
+                    "@microsoft.graph.conflictBehavior": "fail",
+                },
+            )
+        except requests.HTTPError as e:
+            # Created elsewhere since we looked
+            if e.response is None or e.response.status_code != 409:
+                raise
+            response = self.uploader.request(
+                "GET", f"{self.api_url}/drives/{drive_id}/root:/{quote(path)}"
+            )
+        return response.json()["id"]
+
+    def location_folder(self, location, create=True):
+        """
+        Returns the (drive, folder id) for a sharepoint folder location.
+        """
+        drive, path = self.resolve(location)
+        return drive, self.folder_id(drive["id"], path, create=create)
+
+    def item_url(self, location, filename):
+        """
+        The url of the file filename in the folder at the sharepoint location, for uploads.
+        """
+        drive, folder_id = self.location_folder(location)
+        return (
+            f"{self.api_url}/drives/{drive['id']}/items/{folder_id}:/{quote(filename)}"
+        )
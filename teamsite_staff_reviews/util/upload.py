@@ -0,0 +1,473 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from hashlib import sha1
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Optional
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.util.files import private_directory
+
+logger = logging.getLogger(__name__)
+
+# Chunks for upload sessions must be a multiple of 320 KiB
+CHUNK_UNIT = 320 * 1024
+CHUNK_SIZE = 10 * CHUNK_UNIT
+
+# Files up to this size are uploaded with a single request
+SIMPLE_UPLOAD_LIMIT = 4 * 1024**2
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class UploadError(Exception):
+    pass
+
+
+class TokenCache:
+    """
+    Reuses an access token until it is due to expire or is rejected.
+    """
+
+    def __init__(self, get_token, lifetime: timedelta = timedelta(minutes=50)):
+        self.__get_token = get_token
+        self.__lifetime = lifetime
+        self.__token = None
+        self.__expires = None
+        self.__lock = threading.Lock()
+
+    def get(self):
+        with self.__lock:
+            if self.__token is None or self.__expires <= now():
+                self.__token = self.__get_token()
+                self.__expires = now() + self.__lifetime
+            return self.__token
+
+    def invalidate(self):
+        with self.__lock:
+            self.__token = None
+
+
+class Throttle:
+    """
+    Holds back every request sharing it once the server has asked to slow down.
+    """
+
+    def __init__(self):
+        self.__until = 0
+        self.__lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self.__lock:
+            self.__until = max(self.__until, time.monotonic() + seconds)
+
+    def wait(self):
+        delay = self.__until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def drive_item_url(api_url, drive_id, path):
+    """
+    The url of a drive item addressed by its path in the drive.
+    """
+    return f"{api_url}/drives/{drive_id}/root:/{quote(path)}"
+
+
+@contextmanager
+def open_source(source):
+    """
+    Opens a file to upload, given either as a path or as a binary file object such as a
+    BytesIO buffer. File objects are left open.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as FILE:
+            yield FILE
+    else:
+        source.seek(0)
+        yield source
+
+
+def file_digest(FILE):
+    digest = sha1()
+    FILE.seek(0)
+    for block in iter(lambda: FILE.read(CHUNK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def next_offset(data):
+    """
+    The first byte the server is waiting for, from an upload session status.
+    """
+    ranges = data.get("nextExpectedRanges") or []
+    if not ranges:
+        return None
+    return int(ranges[0].split("-")[0])
+
+
+class Uploader:
+    """
+    Uploads files to drive items. Small files are uploaded with one request, and larger
+    files through an upload session, one chunk at a time. The progress of an upload
+    session is kept in a state file so that an interrupted upload of the same content to the
+    same item resumes where it stopped.
+
+    :param get_token: Called to get a new access token
+    :param chunk_size: The upload session chunk size, a multiple of 320 KiB
+    :param simple_limit: The largest file uploaded with a single request
+    :param max_retries: How often to retry a request that failed with a network error or a
+        throttling or server error status
+    :param backoff: The initial delay in seconds between retries, doubled on each retry. A
+        Retry-After header from the server takes precedence.
+    :param state_dir: Where to keep the upload session state files, by default
+        STAFF_REVIEWS_UPLOAD_STATE_DIR or a directory in the project's BASE_DIR. The state
+        files hold pre-authorised upload urls, so they are only kept in a directory that no
+        other user can access; otherwise interrupted uploads start again.
+    """
+
+    def __init__(
+        self,
+        get_token,
+        chunk_size: int = CHUNK_SIZE,
+        simple_limit: int = SIMPLE_UPLOAD_LIMIT,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 60,
+        state_dir=None,
+        session: requests.Session = None,
+    ):
+        if chunk_size % CHUNK_UNIT:
+            raise ValueError(f"The chunk size must be a multiple of {CHUNK_UNIT}")
+        self.tokens = TokenCache(get_token)
+        self.throttle = Throttle()
+        self.chunk_size = chunk_size
+        self.simple_limit = simple_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.state_dir = Path(state_dir) if state_dir else default_state_dir()
+        self.__state_checked = False
+        self.session = session or requests.Session()
+
+    def upload(self, source, item_url, content_type="application/binary"):
+        """
+        Uploads a file to the drive item.
+
+        :param source: The path of a local file, or a binary file object
+        :param item_url: The drive item url, e.g. from drive_item_url
+        :return: The drive item metadata
+        """
+        with open_source(source) as FILE:
+            size = FILE.seek(0, os.SEEK_END)
+            FILE.seek(0)
+            if size <= self.simple_limit:
+                response = self.request(
+                    "PUT",
+                    f"{item_url}:/content",
+                    data=FILE.read(),
+                    headers={"Content-Type": content_type},
+                )
+                return response.json()
+
+            return self._upload_session(FILE, item_url, size)
+
+    def request(self, method, url, auth=True, headers=None, **kwargs):
+        """
+        Makes a request, retrying throttled, failed and unauthorised requests.
+        """
+        for attempt in range(self.max_retries + 1):
+            request_headers = dict(headers or {})
+            if auth:
+                request_headers["Authorization"] = f"Bearer {self.tokens.get()}"
+
+            self.throttle.wait()
+            try:
+                response = self.session.request(
+                    method, url, headers=request_headers, timeout=self.timeout, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                logger.warning("Request to %s failed, retrying", url, exc_info=True)
+                time.sleep(self._delay(attempt))
+                continue
+
+            if response.status_code == 401 and auth and attempt < self.max_retries:
+                self.tokens.invalidate()
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                logger.warning(
+                    "Request to %s returned %s, retrying", url, response.status_code
+                )
+                delay = self._delay(attempt, response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    # Throttling applies to all uploads, not just this one
+                    self.throttle.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def _delay(self, attempt, retry_after=None):
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return self.backoff * 2**attempt
+
+    def _state_file(self, item_url) -> Optional[Path]:
+        if not self.__state_checked:
+            if self.state_dir is not None:
+                self.state_dir = private_directory(self.state_dir)
+            self.__state_checked = True
+        if self.state_dir is None:
+            return None
+        return self.state_dir / f"{sha1(item_url.encode()).hexdigest()}.json"
+
+    def _upload_session(self, FILE, item_url, size):
+        state_file = self._state_file(item_url)
+        digest = file_digest(FILE)
+
+        upload_url, offset = None, 0
+        if state_file is not None:
+            upload_url, offset = self._resume(state_file, size, digest)
+        if upload_url is not None:
+            logger.info("Resuming upload to %s from byte %s", item_url, offset)
+        else:
+            response = self.request(
+                "POST",
+                f"{item_url}:/createUploadSession",
+                json={"item": {"@microsoft.graph.conflictBehavior": "replace"}},
+            )
+            session = response.json()
+            upload_url, offset = session["uploadUrl"], 0
+            if state_file is not None:
+                state_file.write_text(
+                    json.dumps(
+                        dict(
+                            upload_url=upload_url,
+                            expires=session.get("expirationDateTime"),
+                            size=size,
+                            digest=digest,
+                        )
+                    )
+                )
+
+        while True:
+            FILE.seek(offset)
+            chunk = FILE.read(self.chunk_size)
+            end = offset + len(chunk) - 1
+            # The upload url is pre-authorised and must not be sent the access token
+            response = self.request(
+                "PUT",
+                upload_url,
+                auth=False,
+                data=chunk,
+                headers={
+                    "Content-Length": str(len(chunk)),
+                    "Content-Range": f"bytes {offset}-{end}/{size}",
+                },
+            )
+            if response.status_code in (200, 201):
+                if state_file is not None:
+                    state_file.unlink(missing_ok=True)
+                return response.json()
+
+            offset = next_offset(response.json())
+            if offset is None or offset >= size:
+                raise UploadError(f"Unexpected upload session status for {item_url}")
+
+    def _resume(self, state_file: Path, size, digest):
+        """
+        Returns the upload url and offset of an unfinished upload session for the same file,
+        or (None, None) if there isn't one that can be continued.
+        """
+        try:
+            state = json.loads(state_file.read_text())
+        except (OSError, ValueError):
+            return None, None
+
+        expires = parse_datetime(state.get("expires") or "")
+        if (
+            state.get("size") != size
+            or state.get("digest") != digest
+            or (expires and expires <= now())
+        ):
+            state_file.unlink(missing_ok=True)
+            return None, None
+
+        try:
+            response = self.request("GET", state["upload_url"], auth=False)
+        except requests.HTTPError:
+            state_file.unlink(missing_ok=True)
+            return None, None
+
+        offset = next_offset(response.json())
+        if offset is None:
+            return None, None
+        return state["upload_url"], offset
+
+
+@dataclass
+class UploadResult:
+    name: str
+    error: Optional[str] = None
+    seconds: float = 0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class UploadQueue:
+    """
+    Runs uploads in the background on an asyncio event loop, at most max_concurrent at a
+    time, so that documents are uploaded while later ones are still being rendered. Use it
+    as a context manager: leaving the block waits for the remaining uploads.
+
+    Submitting blocks while max_pending uploads are queued or in progress, so a renderer
+    that is faster than the uploads doesn't hold every rendered document in memory.
+
+    :param max_concurrent: The maximum number of uploads in progress
+    :param max_pending: The maximum number of uploads queued or in progress, by default
+        twice max_concurrent
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_pending: int = None):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max(max_pending or 2 * max_concurrent, max_concurrent)
+        self.results: List[UploadResult] = []
+        self.__futures = []
+        self.__semaphore = None
+        self.__pending = threading.BoundedSemaphore(self.max_pending)
+
+    def __enter__(self):
+        self.__dir = TemporaryDirectory()
+        self.__loop = asyncio.new_event_loop()
+        self.__loop.set_default_executor(ThreadPoolExecutor(self.max_concurrent))
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.join()
+        finally:
+            self.__loop.call_soon_threadsafe(self.__loop.stop)
+            self.__thread.join()
+            self.__loop.close()
+            self.__dir.cleanup()
+
+    def submit(self, name, source, upload, *args):
+        """
+        Queues upload(source, *args). A file path is first moved into the queue's own
+        directory, so the caller is free to remove its temporary files straight away.
+
+        :param name: A name for the upload in the results
+        :param source: The path of the file to upload, or a buffer
+        :param upload: A blocking upload function
+        """
+        self.__pending.acquire()
+        try:
+            if isinstance(source, (str, os.PathLike)):
+                queued = (
+                    Path(self.__dir.name) / f"{len(self.__futures)}-{Path(source).name}"
+                )
+                shutil.move(source, queued)
+                source = queued
+            future = asyncio.run_coroutine_threadsafe(
+                self.__upload(name, source, upload, args), self.__loop
+            )
+        except BaseException:
+            self.__pending.release()
+            raise
+        self.__futures.append(future)
+
+    def saver(self, saver):
+        """
+        Wraps a saver so that it queues the files instead of saving them straight away.
+        """
+
+        def queued_saver(source, dir, filename):
+            self.submit(f"{dir}/{filename}", source, saver, dir, filename)
+
+        return queued_saver
+
+    def join(self) -> List[UploadResult]:
+        """
+        Waits for the uploads queued so far.
+
+        :return: The results of all uploads, in the order they were queued
+        """
+        for future in self.__futures[len(self.results) :]:
+            self.results.append(future.result())
+        return self.results
+
+    def summary(self) -> str:
+        """
+        The number of uploads that succeeded and failed, then each upload with how long it
+        took, in the order they were queued.
+        """
+        failed = [r for r in self.results if not r.ok]
+        lines = [f"{len(self.results) - len(failed)} uploaded, {len(failed)} failed"]
+        for r in self.results:
+            if r.ok:
+                lines.append(f"    {r.name} ({r.seconds:.1f}s)")
+            else:
+                lines.append(f" ** {r.name} ({r.seconds:.1f}s): {r.error}")
+        return "\n".join(lines)
+
+    async def __upload(self, name, source, upload, args):
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async with self.__semaphore:
+            started = time.monotonic()
+            try:
+                await self.__loop.run_in_executor(None, upload, source, *args)
+                error = None
+            except Exception as e:
+                logger.exception("Failed to upload %s", name)
+                error = str(e) or type(e).__name__
+            finally:
+                if isinstance(source, Path):
+                    source.unlink(missing_ok=True)
+                self.__pending.release()
+            return UploadResult(name, error, time.monotonic() - started)
+
+
+def default_state_dir() -> Optional[Path]:
+    """
+    STAFF_REVIEWS_UPLOAD_STATE_DIR if it is set, or else a directory in the project's
+    BASE_DIR. Without either, upload sessions aren't resumed.
+    """
+    state_dir = getattr(settings, "STAFF_REVIEWS_UPLOAD_STATE_DIR", None)
+    if state_dir is not None:
+        return Path(state_dir)
+    base_dir = getattr(settings, "BASE_DIR", None)
+    if base_dir is None:
+        return None
+    return Path(base_dir) / ".cache" / "staff-reviews-uploads"
+
+
+def sharepoint_uploader(**kwargs) -> Uploader:
+    from office365.api.auth import get_token
+
+    return Uploader(get_token, **kwargs)
@@ -1,6 +1,7 @@
-from reviews.models import Nomination
-from reviews.util.word_export.assessment import AssessmentDocument
-from reviews.util.word_export.util import add_markdown
+from teamsite_staff_reviews.models import Nomination
+from teamsite_staff_reviews.util.word_export.assessment import AssessmentDocument
+from teamsite_staff_reviews.util.word_export.records import NominationRecord
+from teamsite_staff_reviews.util.word_export.util import add_markdown
 
 questions = [
     "2021 Business Objectives (6-12 month forward view)",
@@ -12,7 +13,9 @@ questions = [
 
 class AssessmentDocumentPart2:
     def __init__(self, nomination):
-        exclude_questions = [nomination.form.questions.values("pk").last()["pk"]]
+        if isinstance(nomination, Nomination):
+            nomination = NominationRecord.from_nomination(nomination)
+        exclude_questions = [nomination.questions[-1].pk]
 
         self.__document = ass_doc = AssessmentDocument(
             nomination, exclude_questions=exclude_questions
@@ -26,6 +29,7 @@ class AssessmentDocumentPart2:
 To be complete by line manager and line report **after the moderation meetings** and return
 to HR via email no later than Friday 6 August 2021
         """,
+            cache=True,
         )
 
         for q in questions:
@@ -38,6 +42,7 @@ to HR via email no later than Friday 6 August 2021
   * [your response here]
             """,
                 style_name="Small",
+                cache=True,
             )
 
     def save(self, filename):
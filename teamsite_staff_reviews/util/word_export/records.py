@@ -0,0 +1,96 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List, Optional
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewRound,
+    hash_value,
+)
+
+
+@dataclass
+class QuestionRecord:
+    pk: int
+    title: str
+    description: Optional[str]
+    response: Optional[str] = None
+
+
+@dataclass
+class AssessmentRecord:
+    """
+    The staff information shown at the top of an assessment form.
+    """
+
+    team: Optional[str] = None
+    projects: str = ""
+    joined: Optional[date] = None
+    joined_cohort: Optional[str] = None
+    promoted: Optional[date] = None
+    cohort: Optional[str] = None
+
+
+@dataclass
+class NominationRecord:
+    """
+    Everything needed to render a nomination to a document, as plain picklable values, so that
+    documents can be built without database access (e.g. in a worker process).
+    """
+
+    pk: int
+    role: str
+    period_id: int
+    period: str
+    period_year: int
+    period_round_label: str
+    reviewee_id: int
+    reviewee_first_name: str
+    reviewee_last_name: str
+    reviewer_id: Optional[int]
+    reviewer_name: str
+    reviewer_label: str
+    form_title: str
+    form_description: Optional[str]
+    last_modified: Optional[datetime]
+    questions: List[QuestionRecord] = field(default_factory=list)
+    assessment: Optional[AssessmentRecord] = None
+
+    @property
+    def reviewee_name(self):
+        return f"{self.reviewee_first_name} {self.reviewee_last_name}"
+
+    @property
+    def role_label(self):
+        return ReviewerRole(self.role).label
+
+    @property
+    def content_hash(self):
+        """
+        A hash of everything rendered for this nomination, used to detect changed documents.
+        """
+        return hash_value(repr(self))
+
+    @classmethod
+    def from_nomination(cls, nomination: Nomination):
+        from .snapshot import ExportSnapshot
+
+        (record,) = ExportSnapshot(Nomination.objects.filter(pk=nomination.pk))
+        return record
+
+
+def reviewer_label(nomination, invitation):
+    if invitation and invitation.user:
+        return f"{nomination.external_name} ({invitation.user.email})"
+    elif nomination.reviewer is None:
+        return f"{nomination.external_name}"
+    else:
+        return f"{nomination.reviewer.first_name} {nomination.reviewer.last_name}"
+
+
+def period_dates(period):
+    if period.round == ReviewRound.MID_YEAR:
+        return date(period.year, 1, 1), date(period.year, 6, 30)
+    else:
+        return date(period.year, 7, 1), date(period.year, 12, 31)
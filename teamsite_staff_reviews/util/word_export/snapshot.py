@@ -0,0 +1,188 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q, QuerySet, Sum, prefetch_related_objects
+
+from teamsite_staff_reviews.models import (
+    ExternalInvitation,
+    Nomination,
+    ReviewerRole,
+    ReviewForm,
+    ReviewFormResponse,
+)
+from teamsite_staff_reviews.util.word_export.records import (
+    AssessmentRecord,
+    NominationRecord,
+    QuestionRecord,
+    period_dates,
+    reviewer_label,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ExportSnapshot:
+    """
+    All the data needed to export a set of nominations, loaded with a fixed number of bulk
+    queries however many nominations there are. Documents are then built from the records
+    without going back to the database.
+
+    A nomination that can't be exported, e.g. because its period has no form for its role,
+    is logged and left out, so that it doesn't stop the rest of the export.
+    """
+
+    def __init__(self, nomination_query: QuerySet):
+        self.nominations: List[Nomination] = list(
+            nomination_query.select_related(
+                "period", "reviewee", "reviewer", "invitation__user"
+            )
+        )
+        nomination_ids = nomination_query.values("pk")
+
+        self.forms: Dict[tuple, ReviewForm] = {
+            (form.period_id, form.role): form
+            for form in ReviewForm.objects.filter(
+                period_id__in={n.period_id for n in self.nominations}
+            ).prefetch_related("questions")
+        }
+
+        self.responses: Dict[int, Dict[int, str]] = defaultdict(dict)
+        self.last_modified = {}
+        for nomination_id, question_id, value, last_modified in (
+            ReviewFormResponse.objects.filter(nomination_id__in=nomination_ids)
+            .order_by()
+            .values_list("nomination_id", "question_id", "value", "last_modified")
+        ):
+            self.responses[nomination_id][question_id] = value
+            if last_modified and (
+                nomination_id not in self.last_modified
+                or last_modified > self.last_modified[nomination_id]
+            ):
+                self.last_modified[nomination_id] = last_modified
+
+        self.assessments: Dict[tuple, AssessmentRecord] = {}
+        assessments = [
+            n for n in self.nominations if n.role == ReviewerRole.ASSESSMENT_PT_1
+        ]
+        if assessments:
+            self.assessments = load_assessments(assessments)
+
+        self.records: List[NominationRecord] = []
+        for nomination in self.nominations:
+            record = self._to_record(nomination)
+            if record is not None:
+                self.records.append(record)
+
+    def __iter__(self) -> Iterator[NominationRecord]:
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _to_record(self, nomination: Nomination) -> Optional[NominationRecord]:
+        period = nomination.period
+        form = self.forms.get((nomination.period_id, nomination.role))
+        if form is None:
+            logger.warning(
+                "Not exporting nomination %s: %s has no %s form",
+                nomination.pk,
+                period,
+                nomination.role,
+            )
+            return None
+        reviewee = nomination.reviewee
+        responses = self.responses.get(nomination.pk, {})
+
+        try:
+            invitation = nomination.invitation
+        except ExternalInvitation.DoesNotExist:
+            invitation = None
+
+        return NominationRecord(
+            pk=nomination.pk,
+            role=nomination.role,
+            period_id=period.pk,
+            period=str(period),
+            period_year=period.year,
+            period_round_label=period.round_label,
+            reviewee_id=reviewee.pk,
+            reviewee_first_name=reviewee.first_name,
+            reviewee_last_name=reviewee.last_name,
+            reviewer_id=nomination.reviewer_id,
+            reviewer_name=nomination.reviewer_name,
+            reviewer_label=reviewer_label(nomination, invitation),
+            form_title=form.title,
+            form_description=form.description,
+            last_modified=self.last_modified.get(nomination.pk),
+            questions=[
+                QuestionRecord(q.pk, q.title, q.description, responses.get(q.pk))
+                for q in form.questions.all()
+            ],
+            assessment=self.assessments.get((nomination.period_id, reviewee.pk)),
+        )
+
+
+def load_assessments(nominations: List[Nomination]) -> Dict[tuple, AssessmentRecord]:
+    """
+    Loads the staff information for the assessment forms, keyed by (period id, reviewee id).
+    """
+    from resourcing.models import EmploymentEvent, EmploymentEventType, TrackedTime
+
+    reviewees = {n.reviewee_id: n.reviewee for n in nominations}
+    prefetch_related_objects(list(reviewees.values()), "teams__team", "profile__cohort")
+
+    events = {}
+    for event in (
+        EmploymentEvent.objects.filter(
+            user_id__in=reviewees,
+            event_type__in=[EmploymentEventType.JOINED, EmploymentEventType.PROMOTED],
+        )
+        .select_related("cohort")
+        .order_by("date")
+    ):
+        events[(event.user_id, event.event_type)] = event
+
+    projects = {}
+    for period in {n.period for n in nominations}:
+        period_start, period_end = period_dates(period)
+        period_reviewees = [n.reviewee_id for n in nominations if n.period == period]
+        for p in (
+            TrackedTime.objects.filter(
+                ~Q(project__team__name="Internal"),
+                user_id__in=period_reviewees,
+                week__gte=period_start,
+                week__lte=period_end,
+                time__gt=0,
+            )
+            .values("user_id", "project__survey_form")
+            .annotate(time_sum=Sum("time"))
+            .filter(time_sum__gte=3)
+            .order_by("-time_sum")
+        ):
+            projects.setdefault((period.pk, p["user_id"]), []).append(
+                f"{p['project__survey_form']} ({p['time_sum']})"
+            )
+
+    assessments = {}
+    for nomination in nominations:
+        reviewee = reviewees[nomination.reviewee_id]
+        team = next(iter(reviewee.teams.all()), None)
+        joined = events.get((reviewee.pk, EmploymentEventType.JOINED))
+        promoted = events.get((reviewee.pk, EmploymentEventType.PROMOTED))
+        key = (nomination.period_id, reviewee.pk)
+        try:
+            cohort = reviewee.profile.cohort.name
+        except (ObjectDoesNotExist, AttributeError):
+            logger.warning("No current cohort for %s", reviewee)
+            cohort = None
+        assessments[key] = AssessmentRecord(
+            team=f"{team.team.name}" if team else None,
+            projects=", ".join(projects.get(key, [])),
+            joined=joined.date if joined else None,
+            joined_cohort=joined.cohort.name if joined and joined.cohort else None,
+            promoted=promoted.date if promoted else None,
+            cohort=cohort,
+        )
+    return assessments
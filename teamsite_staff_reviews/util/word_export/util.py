@@ -1,7 +1,16 @@
+from copy import deepcopy
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
+from typing import List, Optional
 
+from django.utils.timezone import now
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
+from docx.shared import Inches, Pt
+from docx.text.paragraph import Paragraph
 from htmldocx import HtmlToDocx
 from marko import Markdown
 
@@ -32,21 +41,165 @@ def add_page_number(run, code="PAGE"):
     run._r.append(fldChar2)
 
 
-def add_markdown(document, text, style_name=None):
+_template: Optional[bytes] = None
+
+
+def _build_template() -> bytes:
+    """
+    Builds the base document with the logo, header, footer and styles shared by all exports.
+    """
+    document = Document()
+    header = document.sections[0].header.paragraphs[0]
+    logo_run = header.add_run()
+    logo_run.add_picture(str(logo.absolute()), width=Inches(1))
+    header.add_run().text = "\t\tConfidential"
+
+    footer = document.sections[0].footer.paragraphs[0]
+    footer.add_run().text = "Created\t\tPage "
+
+    add_page_number(footer.add_run(), "PAGE")
+    footer.add_run(" of ")
+    add_page_number(footer.add_run(), "NUMPAGES")
+
+    style = document.styles.add_style("Normal Small", WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = document.styles["Normal"]
+    style.font.size = Pt(8)
+    style.font.italic = True
+
+    style = document.styles.add_style("List Bullet Small", WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = document.styles["List Bullet"]
+    style.font.size = Pt(8)
+    style.font.italic = True
+
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def new_document():
+    """
+    Opens a new document from the base template, which is built once per process.
+    """
+    global _template
+    if _template is None:
+        _template = _build_template()
+
+    document = Document(BytesIO(_template))
+    footer = document.sections[0].footer.paragraphs[0]
+    footer.runs[0].text = f"Created {now():%d %b %Y %H:%M}\t\tPage "
+    return document
+
+
+_markdown = None
+_html_parser = None
+_scratch = None
+FRAGMENT_CACHE_SIZE = 512
+
+
+def _render(text, document):
+    """
+    Renders markdown text into the document, reusing the markdown and html parsers.
+    """
+    global _markdown, _html_parser
+    if _markdown is None:
+        _markdown = Markdown(extensions=[QuoteRenderer])
+        _html_parser = HtmlToDocx()
+
+    html = _markdown.convert(text)
+    _html_parser.reset()
+    _html_parser.add_html_to_document(html, document)
+
+
+def _added_elements(body, render) -> List:
+    """
+    Returns the elements added to the body by render. New content is inserted before the
+    section properties, which are always the last element of the body.
+    """
+    start = len(body) - 1
+    render()
+    return list(body)[start:-1]
+
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def _render_fragment(text) -> Optional[List]:
+    """
+    Renders the text into a scratch document and returns the new body elements, or None if
+    they can't be moved to another document because they refer to relationships (links,
+    images) of the scratch document. The most recently used fragments are kept.
+    """
+    global _scratch
+    if _scratch is None:
+        _scratch = Document()
+
+    body = _scratch.element.body
+    elements = _added_elements(body, lambda: _render(text, _scratch))
+    for element in elements:
+        body.remove(element)
+
+    return elements if portable(elements) else None
+
+
+def portable(elements) -> bool:
+    """
+    Whether the body elements can be copied to another document, i.e. they don't refer to
+    relationships (links, images) of the document they were rendered in.
+    """
+    return not any(
+        key in (qn("r:id"), qn("r:embed"))
+        for element in elements
+        for child in element.iter()
+        for key in child.keys()
+    )
+
+
+def capture_elements(document, render) -> List:
+    """
+    Calls render, which adds content to the document, and returns the body elements it
+    added.
+    """
+    return _added_elements(document.element.body, render)
+
+
+def graft_elements(document, elements) -> List:
+    """
+    Appends copies of body elements rendered in another document made by new_document.
+
+    :return: The copies added to the document
+    """
+    body = document.element.body
+    elements = [deepcopy(e) for e in elements]
+    for element in elements:
+        body.sectPr.addprevious(element)
+    return elements
+
+
+def add_markdown(document, text, style_name=None, cache=False):
+    """
+    Adds markdown text to the document.
+
+    :param document: The document
+    :param text: The markdown text
+    :param style_name: A suffix for the paragraph styles, e.g. 'Small'
+    :param cache: Cache the rendered text. Use for text repeated across documents, such as
+        form and question descriptions.
+    """
     if text is None:
         document.add_paragraph("")
         return
 
-    doc_length = len(document.paragraphs)
+    elements = _render_fragment(text) if cache else None
 
-    markdown = Markdown(extensions=[QuoteRenderer])
-    html = markdown.convert(text)
-    new_parser = HtmlToDocx()
-    new_parser.add_html_to_document(html, document)
+    body = document.element.body
+    if elements is None:
+        elements = _added_elements(body, lambda: _render(text, document))
+    else:
+        elements = graft_elements(document, elements)
 
     if style_name:
-        for p in document.paragraphs[doc_length:]:
-            p.style = f"{p.style.name} {style_name}"
+        for element in elements:
+            if element.tag == qn("w:p"):
+                p = Paragraph(element, document._body)
+                p.style = f"{p.style.name} {style_name}"
 
 
 class QuoteRendererMixin:
@@ -1,63 +1,373 @@
 import logging
-from pathlib import Path
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Collection, Dict, Iterable, Iterator, List, Mapping, Sequence
 
-import yaml
+from dateutil.relativedelta import MO, relativedelta
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils import timezone
 
-from . import fixtures
+from .form_config import FormConfig, get_form_config
 from .models import (
     Nomination,
+    NominationSummary,
     ReviewerRole,
     ReviewForm,
     ReviewFormQuestion,
+    ReviewFormResponse,
     ReviewPeriod,
+    ReviewStage,
+    StageCode,
 )
 
 log = logging.getLogger(__name__)
 
 
-def create_review_form(period: ReviewPeriod, configuration=None):
-    if configuration is None:
-        configuration = Path(fixtures.__file__).parent / "current-questions.yml"
-    if not isinstance(configuration, dict):
-        with open(configuration) as FILE:
-            configuration = yaml.safe_load(FILE)
+def describe_question(question: ReviewFormQuestion):
+    return f"{question.form.role} {question.sequence}: {question.title}"
 
-    for formdata in configuration["forms"]:
-        form, created = ReviewForm.objects.update_or_create(
-            period=period, role=formdata["role"]
+
+@dataclass
+class FormDiff:
+    """
+    The changes that make a period's forms match a form configuration. Questions are matched
+    by their form's role and their sequence. Forms missing from the configuration are left
+    alone, as are removed questions that already have responses.
+    """
+
+    create_forms: List[ReviewForm] = field(default_factory=list)
+    update_forms: List[ReviewForm] = field(default_factory=list)
+    create_questions: List[ReviewFormQuestion] = field(default_factory=list)
+    update_questions: List[ReviewFormQuestion] = field(default_factory=list)
+    delete_questions: List[ReviewFormQuestion] = field(default_factory=list)
+    keep_questions: List[ReviewFormQuestion] = field(default_factory=list)
+
+    def __bool__(self):
+        return any(
+            (
+                self.create_forms,
+                self.update_forms,
+                self.create_questions,
+                self.update_questions,
+                self.delete_questions,
+            )
+        )
+
+    def __str__(self):
+        return (
+            f"{len(self.create_forms)} forms created, {len(self.update_forms)} updated; "
+            f"{len(self.create_questions)} questions created, "
+            f"{len(self.update_questions)} updated, {len(self.delete_questions)} deleted"
         )
-        form.title = formdata.get("title")
-        form.description = formdata.get("description")
-        form.save()
 
-        for ix, questiondata in enumerate(formdata["questions"]):
-            question, created = ReviewFormQuestion.objects.update_or_create(
-                form=form,
-                sequence=ix + 1,
-                defaults={
-                    "title": questiondata["title"],
-                },
+    def lines(self) -> Iterator[str]:
+        for form in self.create_forms:
+            yield f"+ form {form.role}: {form.title}"
+        for form in self.update_forms:
+            yield f"~ form {form.role}: {form.title}"
+        for prefix, questions in (
+            ("+", self.create_questions),
+            ("~", self.update_questions),
+            ("-", self.delete_questions),
+        ):
+            for question in questions:
+                yield f"{prefix} question {describe_question(question)}"
+        for question in self.keep_questions:
+            yield f"! question {describe_question(question)} (kept, has responses)"
+
+    @transaction.atomic
+    def apply(self):
+        ReviewForm.objects.bulk_create(self.create_forms)
+        if self.update_forms:
+            ReviewForm.objects.bulk_update(self.update_forms, ["title", "description"])
+        ReviewFormQuestion.objects.bulk_create(self.create_questions)
+        if self.update_questions:
+            ReviewFormQuestion.objects.bulk_update(
+                self.update_questions, ["title", "description"]
+            )
+        if self.delete_questions:
+            ReviewFormQuestion.objects.filter(
+                pk__in=[q.pk for q in self.delete_questions]
+            ).delete()
+
+        # The nominations for forms whose questions changed have a different number of
+        # questions to answer
+        changed = [*self.create_questions, *self.delete_questions]
+        if changed:
+            forms = ReviewForm.objects.filter(pk__in={q.form_id for q in changed})
+            NominationSummary.objects.refresh(
+                Nomination.objects.filter(
+                    Exists(
+                        forms.filter(period=OuterRef("period"), role=OuterRef("role"))
+                    )
+                ).values("pk")
+            )
+
+
+def diff_review_forms(period: ReviewPeriod, configuration: FormConfig) -> FormDiff:
+    """
+    Compares the period's forms and questions with a form configuration, without changing
+    anything.
+    """
+    questions = ReviewFormQuestion.objects.annotate(
+        has_responses=Exists(ReviewFormResponse.objects.filter(question=OuterRef("pk")))
+    )
+    forms = {
+        form.role: form
+        for form in period.forms.prefetch_related(Prefetch("questions", questions))
+    }
+
+    diff = FormDiff()
+    for definition in configuration.forms:
+        form = forms.get(definition.role)
+        if form is None:
+            form = ReviewForm(
+                period=period,
+                role=definition.role,
+                title=definition.title,
+                description=definition.description,
+            )
+            diff.create_forms.append(form)
+            existing = {}
+        else:
+            if (form.title, form.description) != (
+                definition.title,
+                definition.description,
+            ):
+                form.title, form.description = definition.title, definition.description
+                diff.update_forms.append(form)
+            existing = {q.sequence: q for q in form.questions.all()}
+
+        for ix, question_definition in enumerate(definition.questions):
+            title, description = (
+                question_definition.title,
+                question_definition.description,
+            )
+            question = existing.pop(ix + 1, None)
+            if question is None:
+                diff.create_questions.append(
+                    ReviewFormQuestion(
+                        form=form,
+                        sequence=ix + 1,
+                        title=title,
+                        description=description,
+                    )
+                )
+            elif (question.title, question.description) != (title, description):
+                question.title, question.description = title, description
+                diff.update_questions.append(question)
+
+        for question in existing.values():
+            if question.has_responses:
+                diff.keep_questions.append(question)
+            else:
+                diff.delete_questions.append(question)
+
+    return diff
+
+
+def create_review_form(period: ReviewPeriod, configuration=None, dry_run=False):
+    """
+    Makes the period's forms and questions match a form configuration.
+
+    :param configuration: A FormConfig, a parsed configuration or a file, by default the
+        current questions
+    :param dry_run: Only work out the changes, without making them
+    :return: The FormDiff of the changes
+    """
+    diff = diff_review_forms(period, get_form_config(configuration))
+    if diff and not dry_run:
+        diff.apply()
+    return diff
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __str__(self):
+        return f"{self.created} created, {self.updated} updated, {self.unchanged} unchanged"
+
+
+def sync_nominations(
+    period: ReviewPeriod,
+    role: str,
+    targets: Iterable[Dict],
+    key: Sequence[str] = ("reviewer_id", "reviewee_id"),
+    fields: Sequence[str] = (),
+    batch_size=1000,
+) -> SyncResult:
+    """
+    Makes sure the period has a nomination of the role for each target, in a fixed number of
+    queries. Existing nominations are never deleted.
+
+    :param targets: The nominations, as dicts of field values by attname e.g. reviewer_id
+    :param key: The fields that identify a nomination of the role in the period
+    :param fields: The fields updated on existing nominations when they differ
+    """
+    targets = {tuple(t[k] for k in key): t for t in targets}
+    result = SyncResult()
+    with transaction.atomic():
+        closes = Nomination(period=period).get_closes()
+        existing = {
+            tuple(getattr(n, k) for k in key): n
+            for n in Nomination.objects.filter(period=period, role=role).order_by("-pk")
+        }
+
+        to_create, to_update = [], []
+        for target_key, target in targets.items():
+            nomination = existing.get(target_key)
+            if nomination is None:
+                nomination = Nomination(period=period, role=role, **target)
+                nomination.closes = nomination.closes_override or closes
+                to_create.append(nomination)
+            elif any(getattr(nomination, f) != target[f] for f in fields):
+                for f in fields:
+                    setattr(nomination, f, target[f])
+                nomination.closes = nomination.closes_override or closes
+                to_update.append(nomination)
+            else:
+                result.unchanged += 1
+
+        Nomination.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            Nomination.objects.bulk_update(
+                to_update, [*fields, "closes"], batch_size=batch_size
             )
-            question.title = questiondata["title"]
-            question.description = questiondata.get("description")
-            question.save()
+    result.created, result.updated = len(to_create), len(to_update)
+    return result
+
+
+def nominate_line_managers(period: ReviewPeriod, profiles=None) -> SyncResult:
+    """
+    Nominates each current staff member to review their line manager.
 
+    :param profiles: The current staff profiles, by default loaded from resourcing
+    """
+    if profiles is None:
+        from resourcing.models import Profile
 
-def nominate_line_managers(period: ReviewPeriod):
-    from resourcing.models import Profile
+        profiles = Profile.objects.current().select_related("user", "line_manager")
 
-    for user in Profile.objects.current():
+    profiles = list(profiles)
+    current = {p.user_id for p in profiles}
+    targets = []
+    for user in profiles:
         line_manager = user.line_manager
         if line_manager is None:
             log.error(f"NominateLineManager: No LM for {user}")
-        elif not line_manager.profile.current:
+        elif user.line_manager_id not in current:
             log.error(
                 f"NominateLineManager: LM {line_manager} not a current staffer for {user}"
             )
         else:
-            Nomination.objects.update_or_create(
-                period=period,
-                reviewer=user.user,
-                role=ReviewerRole.DIRECT_REPORT,
-                defaults=dict(reviewee=line_manager),
+            targets.append(
+                dict(reviewer_id=user.user_id, reviewee_id=user.line_manager_id)
             )
+
+    return sync_nominations(
+        period,
+        ReviewerRole.DIRECT_REPORT,
+        targets,
+        key=("reviewer_id",),
+        fields=("reviewee_id",),
+    )
+
+
+def next_working_day(value: datetime, holidays: Collection[date] = ()) -> datetime:
+    while value.weekday() >= 5 or value.date() in holidays:
+        value += timedelta(days=1)
+    return value
+
+
+def schedule_stages(
+    start: datetime,
+    existing: Mapping[StageCode, datetime] = None,
+    offsets: Mapping[StageCode, timedelta] = None,
+    holidays: Collection[date] = (),
+) -> Dict[StageCode, datetime]:
+    """
+    Works out when each stage of a review cycle should be, in order, a week apart by default.
+    Stages are moved past weekends and holidays.
+
+    :param start: When the first stage should be
+    :param existing: The dates of the stages already scheduled, which are kept and the
+        following stages scheduled from
+    :param offsets: The time from the previous stage, by stage, instead of a week
+    :param holidays: The dates no stage should be on
+    :return: The dates of the stages that aren't already scheduled
+    """
+    existing = existing or {}
+    offsets = offsets or {}
+    timetable = {}
+    previous = None
+    for code in StageCode:
+        if code == StageCode.OTHER:
+            continue
+        if code in existing:
+            previous = existing[code]
+            continue
+        if previous is None:
+            reference = start
+        else:
+            reference = previous + offsets.get(code, timedelta(weeks=1))
+        previous = timetable[code] = code.get_time(
+            next_working_day(reference, holidays)
+        )
+    return timetable
+
+
+def schedule_default_stages(
+    periods: Iterable[ReviewPeriod],
+    start: datetime = None,
+    offsets: Mapping[StageCode, timedelta] = None,
+    holidays: Collection[date] = (),
+) -> int:
+    """
+    Adds the stages each period doesn't have yet, with a single insert. Without a start,
+    the first stage is next Monday.
+
+    :return: The number of stages added
+    """
+    if start is None:
+        start = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        start += relativedelta(weekday=MO(1))
+    holidays = frozenset(holidays)
+
+    periods = list(periods)
+    existing = {period.pk: {} for period in periods}
+    for period_id, code, stage_date in ReviewStage.objects.filter(
+        period__in=periods
+    ).values_list("period_id", "code", "date"):
+        if code in StageCode.__members__:
+            existing[period_id].setdefault(StageCode[code], stage_date)
+
+    stages = [
+        ReviewStage(
+            period=period,
+            code=code.name,
+            date=stage_date,
+            visible=code.visible,
+            title=code.title,
+            description=code.description,
+            configuration=code.configuration,
+        )
+        for period in periods
+        for code, stage_date in schedule_stages(
+            start, existing[period.pk], offsets, holidays
+        ).items()
+    ]
+    with transaction.atomic():
+        ReviewStage.objects.bulk_create(stages)
+        # bulk_create skips ReviewStage.save, which keeps the nomination deadlines in step
+        closes = {
+            stage.period_id
+            for stage in stages
+            if stage.code == StageCode.FEEDBACK_CLOSE.name
+        }
+        if closes:
+            Nomination.objects.filter(period_id__in=closes).recompute_closes()
+    return len(stages)
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.admin.utils import lookup_field
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from teamsite_staff_reviews.models import (
+    ExternalInvitation,
+    ExternalInvitationMessage,
+    ExternalNomination,
+    ExternalUser,
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+)
+
+User = get_user_model()
+
+
+def profile(user):
+    """
+    A stand-in for the profiles from the resourcing app, which isn't installed for the tests.
+    """
+    return SimpleNamespace(short_name=user.username)
+
+
+class AdminChangelistQueriesTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+        self.admin_user = User.objects.create_superuser("admin")
+        self.users = User.objects.bulk_create(
+            User(username=f"user{i}") for i in range(10)
+        )
+
+    def add_responses(self, count):
+        questions = list(
+            self.period.get_form(ReviewerRole.PROJECT_MANAGER).questions.all()
+        )
+        start = Nomination.objects.count()
+        # Alternately internal reviewers and external reviewers with accepted invitations
+        nominations = Nomination.objects.bulk_create(
+            Nomination(
+                period=self.period,
+                reviewee=self.users[i % 10],
+                reviewer=self.users[(i + 1) % 10] if i % 2 else None,
+                external_email=None if i % 2 else f"reviewer{i}@example.com",
+                role=ReviewerRole.PROJECT_MANAGER,
+            )
+            for i in range(start, start + count // len(questions) + 1)
+        )
+        external = [n for n in nominations if n.reviewer_id is None]
+        users = ExternalUser.objects.bulk_create(
+            ExternalUser(email=n.external_email) for n in external
+        )
+        ExternalInvitation.objects.bulk_create(
+            ExternalInvitation(nomination=n, user=user, code=100000 + n.pk)
+            for n, user in zip(external, users)
+        )
+        responses = [
+            ReviewFormResponse(
+                nomination=n, question=q, value="x" * n.pk, value_length=n.pk
+            )
+            for n in nominations
+            for q in questions
+        ]
+        ReviewFormResponse.objects.bulk_create(responses[:count])
+
+    def add_external_nominations(self, count):
+        start = Nomination.objects.count()
+        nominations = Nomination.objects.bulk_create(
+            Nomination(
+                period=self.period,
+                reviewee=self.users[i % 10],
+                external_email=f"external{i}@example.com",
+                role=ReviewerRole.EXTERNAL,
+            )
+            for i in range(start, start + count)
+        )
+        invitations = ExternalInvitation.objects.bulk_create(
+            ExternalInvitation(nomination=n, code=100000 + n.pk) for n in nominations
+        )
+        ExternalInvitationMessage.objects.bulk_create(
+            ExternalInvitationMessage(
+                invitation=invitation, sent_to="a@example.com", sent_by=self.admin_user
+            )
+            for invitation in invitations
+            for _ in range(2)
+        )
+
+    def render_changelist(self, model):
+        """
+        Renders the values of the changelist columns, with every row on one page, and
+        returns the rows and the queries.
+        """
+        model_admin = admin.site._registry[model]
+        request = RequestFactory().get("/")
+        request.user = self.admin_user
+        with mock.patch.object(model_admin, "list_per_page", 2000), mock.patch.object(
+            User, "profile", property(profile), create=True
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                changelist = model_admin.get_changelist_instance(request)
+                rows = [
+                    {
+                        c: lookup_field(c, obj, model_admin)[2]
+                        for c in model_admin.list_display
+                    }
+                    for obj in changelist.result_list
+                ]
+        return rows, queries.captured_queries
+
+    def changelist_queries(self, model):
+        """
+        The number of rows and of queries to render the changelist.
+        """
+        rows, queries = self.render_changelist(model)
+        return len(rows), len(queries)
+
+    def test_response_changelist(self):
+        self.add_responses(100)
+        rows, queries = self.changelist_queries(ReviewFormResponse)
+        assert rows == 100
+
+        self.add_responses(900)
+        assert self.changelist_queries(ReviewFormResponse) == (1000, queries)
+
+        # The answer lengths come from the stored length, without loading the answers
+        rows, queries = self.render_changelist(ReviewFormResponse)
+        assert not any('reviewformresponse"."value"' in q["sql"] for q in queries)
+        assert sorted(row["answer_length"] for row in rows) == sorted(
+            str(len(r.value)) for r in ReviewFormResponse.objects.all()
+        )
+        assert {row["reviewee"] for row in rows} == {u.username for u in self.users}
+
+    def test_external_nomination_changelist(self):
+        self.add_external_nominations(100)
+        rows, queries = self.changelist_queries(ExternalNomination)
+        assert rows == 100
+
+        self.add_external_nominations(900)
+        assert self.changelist_queries(ExternalNomination) == (1000, queries)
+
+        nomination = ExternalNomination.objects.first()
+        model_admin = admin.site._registry[ExternalNomination]
+        request = RequestFactory().get("/")
+        request.user = self.admin_user
+        annotated = model_admin.get_queryset(request).get(pk=nomination.pk)
+        assert model_admin.get_invitation_message_count(annotated) == 2
+        assert model_admin.get_responses(annotated) == 0
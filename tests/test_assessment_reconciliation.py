@@ -0,0 +1,118 @@
+import csv
+import json
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewPeriod,
+    ReviewRound,
+)
+from teamsite_staff_reviews.reports.assessment_reconciliation import (
+    DUPLICATE,
+    MISSING,
+    NO_LINE_MANAGER,
+    ORPHANED,
+    reconcile_assessments,
+    write_csv,
+    write_json,
+    write_text,
+)
+
+User = get_user_model()
+
+
+class ReconcileAssessmentsTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+
+    def staff(self, count):
+        """
+        Creates staff with a self assessment and a Part 1 assessment by their line manager,
+        in teams of ten managed by user0.
+        """
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(count))
+        users = list(User.objects.order_by("pk").values_list("pk", flat=True))
+        line_managers = {pk: users[i // 10 * 10] for i, pk in enumerate(users)}
+        line_managers.update({pk: users[0] for pk in users[::10]})
+        line_managers[users[0]] = None
+
+        nominations = [
+            Nomination(
+                period=self.period,
+                reviewer_id=pk,
+                reviewee_id=pk,
+                role=ReviewerRole.SELF_ASSESSMENT,
+            )
+            for pk in users
+        ]
+        nominations += [
+            Nomination(
+                period=self.period,
+                reviewer_id=line_manager,
+                reviewee_id=pk,
+                role=ReviewerRole.ASSESSMENT_PT_1,
+            )
+            for pk, line_manager in line_managers.items()
+            if line_manager is not None
+        ]
+        Nomination.objects.bulk_create(nominations)
+        return users, line_managers
+
+    def test_discrepancies(self):
+        users, line_managers = self.staff(30)
+        assessments = Nomination.objects.filter(role=ReviewerRole.ASSESSMENT_PT_1)
+        assessments.filter(reviewee=users[5]).delete()
+        duplicate = Nomination.objects.create(
+            period=self.period,
+            reviewer_id=users[20],
+            reviewee_id=users[21],
+            role=ReviewerRole.ASSESSMENT_PT_1,
+            external_email="duplicate@example.com",
+        )
+        line_managers[users[12]] = users[20]
+        orphan = assessments.get(reviewee=users[12])
+
+        with self.assertNumQueries(3):
+            discrepancies = reconcile_assessments(self.period, line_managers)
+        found = {(d.issue, d.reviewee_id, d.reviewer_id) for d in discrepancies}
+        assert found == {
+            (NO_LINE_MANAGER, users[0], None),
+            (MISSING, users[5], users[0]),
+            (MISSING, users[12], users[20]),
+            (ORPHANED, users[12], users[10]),
+            (DUPLICATE, users[21], users[20]),
+        }
+        by_issue = {d.issue: d for d in discrepancies}
+        assert by_issue[ORPHANED].nominations == (orphan.pk,)
+        assert duplicate.pk in by_issue[DUPLICATE].nominations
+
+        text = StringIO()
+        write_text(discrepancies, text)
+        assert "No nomination found for user0 to assess user5\n" in text.getvalue()
+
+        output = StringIO()
+        write_csv(discrepancies, output)
+        rows = list(csv.DictReader(StringIO(output.getvalue())))
+        assert [r["issue"] for r in rows] == [d.issue for d in discrepancies]
+
+        output = StringIO()
+        write_json(discrepancies, output)
+        assert json.loads(output.getvalue())[0]["issue"] == NO_LINE_MANAGER
+
+    def test_query_count_at_scale(self):
+        users, line_managers = self.staff(5000)
+        Nomination.objects.filter(
+            role=ReviewerRole.ASSESSMENT_PT_1, reviewee__in=users[1000:1010]
+        ).delete()
+
+        started = time.perf_counter()
+        with self.assertNumQueries(3):
+            discrepancies = reconcile_assessments(self.period, line_managers)
+        elapsed = time.perf_counter() - started
+        assert len(discrepancies) == 11
+        assert elapsed < 2, elapsed
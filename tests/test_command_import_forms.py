@@ -1,9 +1,18 @@
 from io import StringIO
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.test import TestCase
 
-from teamsite_staff_reviews.models import ReviewPeriod, ReviewRound
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+)
+
+User = get_user_model()
 
 
 class ParseBankHolidaysTest(TestCase):
@@ -25,3 +34,66 @@ class ParseBankHolidaysTest(TestCase):
         out = self.call_command("teamsite_staff_reviews/fixtures/2022MY.yml")
 
         assert period.forms.count() == 6
+
+    def test_dry_run(self):
+        period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+
+        out = self.call_command("teamsite_staff_reviews/fixtures/2022MY.yml", "-n")
+
+        assert period.forms.count() == 0
+        assert "+ form DR: " in out
+        assert "Would make: 6 forms created" in out
+
+
+class CreateReviewFormTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.configuration = {
+            "forms": [
+                {
+                    "role": ReviewerRole.SELF_ASSESSMENT,
+                    "title": "Self assessment",
+                    "questions": [{"title": f"Question {i}"} for i in range(1, 4)],
+                }
+            ]
+        }
+        self.period.add_forms(configuration=self.configuration)
+        self.form = self.period.get_form(ReviewerRole.SELF_ASSESSMENT)
+
+    def test_unchanged(self):
+        with self.assertNumQueries(2):
+            diff = self.period.add_forms(configuration=self.configuration)
+        assert not diff
+
+    def test_changes(self):
+        reviewer = User.objects.create(username="reviewer")
+        nomination = Nomination.objects.create(
+            period=self.period,
+            reviewer=reviewer,
+            reviewee=reviewer,
+            role=ReviewerRole.SELF_ASSESSMENT,
+        )
+        answered = self.form.questions.get(sequence=3)
+        ReviewFormResponse.objects.create(
+            nomination=nomination, question=answered, value="An answer"
+        )
+
+        forms = self.configuration["forms"]
+        forms[0]["description"] = "Describe yourself"
+        forms[0]["questions"][:] = [{"title": "Question 1"}]
+        forms.append(
+            {
+                "role": ReviewerRole.PROJECT_MANAGER,
+                "title": "Project review",
+                "questions": [{"title": "How did it go?"}],
+            }
+        )
+        diff = self.period.add_forms(configuration=self.configuration)
+
+        assert [f.role for f in diff.create_forms] == [ReviewerRole.PROJECT_MANAGER]
+        assert [q.sequence for q in diff.delete_questions] == [2]
+        assert diff.keep_questions == [answered]
+        self.form.refresh_from_db()
+        assert self.form.description == "Describe yourself"
+        assert list(self.form.questions.values_list("sequence", flat=True)) == [1, 3]
+        assert self.period.get_form(ReviewerRole.PROJECT_MANAGER).questions.count() == 1
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.models import (
+    ExportManifestEntry,
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+)
+from teamsite_staff_reviews.util.word_export.snapshot import ExportSnapshot
+
+User = get_user_model()
+
+TARGET = "sharepoint:feedback:"
+
+
+class ExportManifestTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+        reviewee = User.objects.create(username="reviewee")
+        self.nominations = [
+            Nomination.objects.create(
+                period=self.period,
+                reviewee=reviewee,
+                reviewer=User.objects.create(username=f"reviewer-{ix}"),
+                role=ReviewerRole.PROJECT_MANAGER,
+            )
+            for ix in range(3)
+        ]
+        self.question = self.period.get_form(
+            ReviewerRole.PROJECT_MANAGER
+        ).questions.first()
+
+    def changed(self, target=TARGET):
+        return set(
+            Nomination.objects.changed_since_export(target).values_list("pk", flat=True)
+        )
+
+    def export(self):
+        hashes = {
+            r.pk: r.content_hash for r in ExportSnapshot(Nomination.objects.all())
+        }
+        ExportManifestEntry.objects.record(TARGET, hashes, exported=now())
+        return hashes
+
+    def answer(self, nomination, value):
+        ReviewFormResponse.objects.upsert(nomination, {self.question.pk: value})
+
+    def test_changed_since_export(self):
+        assert self.changed() == {n.pk for n in self.nominations}
+
+        self.export()
+        assert self.changed() == set()
+        assert self.changed("elsewhere") == {n.pk for n in self.nominations}
+
+        self.answer(self.nominations[1], "Changed")
+        assert self.changed() == {self.nominations[1].pk}
+
+    def test_record_updates_entries(self):
+        first = self.export()
+        self.answer(self.nominations[0], "Changed")
+        second = self.export()
+
+        assert ExportManifestEntry.objects.count() == 3
+        assert first[self.nominations[0].pk] != second[self.nominations[0].pk]
+        assert first[self.nominations[1].pk] == second[self.nominations[1].pk]
+        assert (
+            ExportManifestEntry.objects.get(nomination=self.nominations[0]).content_hash
+            == second[self.nominations[0].pk]
+        )
+
+    def test_old_export(self):
+        self.answer(self.nominations[0], "Before")
+        ExportManifestEntry.objects.record(
+            TARGET,
+            {n.pk: "" for n in self.nominations},
+            exported=now() - timedelta(days=1),
+        )
+        assert self.changed() == {self.nominations[0].pk}
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from teamsite_staff_reviews.models import (
+    ExternalInvitation,
+    ExternalUser,
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+)
+from teamsite_staff_reviews.util.word_export.snapshot import ExportSnapshot
+
+User = get_user_model()
+
+ROLES = [
+    ReviewerRole.PROJECT_MANAGER,
+    ReviewerRole.WIDER_TEAM,
+    ReviewerRole.SELF_ASSESSMENT,
+]
+
+
+class ExportSnapshotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        cls.period.add_forms()
+        users = User.objects.bulk_create(
+            [
+                User(username=f"user-{ix}", first_name="User", last_name=f"{ix}")
+                for ix in range(50)
+            ]
+        )
+        cls.nominations = Nomination.objects.bulk_create(
+            [
+                Nomination(
+                    period=cls.period,
+                    reviewee=users[ix % 50],
+                    reviewer=users[(ix + 1) % 50],
+                    role=ROLES[ix % 3],
+                )
+                for ix in range(500)
+            ]
+        )
+        responses = []
+        for nomination in cls.nominations:
+            form = cls.period.get_form(nomination.role)
+            for question in form.questions.all():
+                responses.append(
+                    ReviewFormResponse(
+                        nomination=nomination,
+                        question=question,
+                        value=f"Answer {nomination.pk}",
+                    )
+                )
+        ReviewFormResponse.objects.bulk_create(responses)
+
+    def test_constant_queries(self):
+        # Nominations, forms, questions and responses
+        with self.assertNumQueries(4):
+            snapshot = ExportSnapshot(Nomination.objects.order_by("pk"))
+        assert len(snapshot) == 500
+
+        record = snapshot.records[0]
+        nomination = self.nominations[0]
+        assert record.pk == nomination.pk
+        assert record.reviewee_name == "User 0"
+        assert record.reviewer_label == "User 1"
+        assert record.last_modified is not None
+        assert [q.response for q in record.questions] == [
+            f"Answer {nomination.pk}"
+        ] * len(record.questions)
+
+    def test_matches_single_record(self):
+        nomination = Nomination.objects.create(
+            period=self.period,
+            reviewee=User.objects.get(username="user-0"),
+            external_name="Someone Else",
+            role=ReviewerRole.EXTERNAL,
+        )
+        ExternalInvitation.objects.create(
+            nomination=nomination,
+            user=ExternalUser.objects.create(email="ext@example.com"),
+        )
+
+        (record,) = ExportSnapshot(Nomination.objects.filter(pk=nomination.pk))
+        assert record.reviewer_label == "Someone Else (ext@example.com)"
+        assert record.questions and all(q.response is None for q in record.questions)
+        assert record == record.from_nomination(nomination)
+
+    def test_missing_form(self):
+        # The new period has no forms yet, so this nomination can't be exported
+        period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.FULL_YEAR)
+        broken = Nomination.objects.create(
+            period=period,
+            reviewee=User.objects.get(username="user-0"),
+            reviewer=User.objects.get(username="user-1"),
+            role=ReviewerRole.PROJECT_MANAGER,
+        )
+
+        logger = "teamsite_staff_reviews.util.word_export.snapshot"
+        with self.assertLogs(logger, "WARNING") as logs:
+            snapshot = ExportSnapshot(Nomination.objects.order_by("pk"))
+        assert len(snapshot) == 500
+        assert broken.pk not in {record.pk for record in snapshot}
+        assert f"nomination {broken.pk}" in logs.output[0]
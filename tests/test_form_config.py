@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import yaml
+from django.test import SimpleTestCase, override_settings
+
+from teamsite_staff_reviews import fixtures
+from teamsite_staff_reviews.form_config import (
+    DEFAULT_FORMS,
+    FormConfig,
+    FormConfigError,
+    FormConfigRegistry,
+    default_registry,
+)
+
+FIXTURES = Path(fixtures.__file__).parent
+LOGGER = "teamsite_staff_reviews"
+
+
+class FormConfigTest(SimpleTestCase):
+    def test_fixtures(self):
+        registry = FormConfigRegistry()
+        for path in FIXTURES.glob("*.yml"):
+            with self.subTest(path.name):
+                config = registry.get(path)
+                assert len(config.forms) == 6
+                assert all(form.questions for form in config.forms)
+        assert registry.get(FIXTURES / "2022MY.yml").year == 2022
+
+    def test_validation(self):
+        form = {"role": "SA", "title": "Self", "questions": [{"title": "How?"}]}
+        config = FormConfig.from_dict({"forms": [form]})
+        assert config.forms[0].questions[0].title == "How?"
+        assert config.forms[0].questions[0].description is None
+
+        for data, message in (
+            ([], "must be a mapping"),
+            ({"forms": [{**form, "role": "XX"}]}, r"forms\[0\]\.role must be one of"),
+            ({"forms": [form, form]}, "role SA is repeated"),
+            ({"forms": [form], "period": "Q1"}, "period must be one of"),
+            (
+                {"forms": [{**form, "questions": [{"description": "No title"}]}]},
+                r"forms\[0\]\.questions\[0\]\.title is required",
+            ),
+        ):
+            with self.subTest(message):
+                with self.assertRaisesRegex(FormConfigError, message):
+                    FormConfig.from_dict(data, source="test.yml")
+
+
+class FormConfigRegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = self.directory / "forms.yml"
+        shutil.copy(DEFAULT_FORMS, self.path)
+        self.cache_dir = self.directory / "cache"
+
+    def test_memory_cache(self):
+        registry = FormConfigRegistry()
+        with mock.patch("yaml.safe_load", wraps=yaml.safe_load) as load:
+            config = registry.get(self.path)
+            assert registry.get(self.path) is config
+            assert load.call_count == 1
+
+            stat = self.path.stat()
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            assert registry.get(self.path) == config
+            assert load.call_count == 2
+
+    def test_disk_cache(self):
+        config = FormConfigRegistry(self.cache_dir).get(self.path)
+        assert len(list(self.cache_dir.glob("*.pickle"))) == 1
+
+        with mock.patch("yaml.safe_load") as load:
+            assert FormConfigRegistry(self.cache_dir).get(self.path) == config
+            load.assert_not_called()
+
+    def test_stale_disk_cache(self):
+        FormConfigRegistry(self.cache_dir).get(self.path)
+        self.path.write_text(
+            "forms:\n  - role: SA\n    title: Self\n    questions:\n      - title: Why?\n"
+        )
+        config = FormConfigRegistry(self.cache_dir).get(self.path)
+        assert config.forms[0].questions[0].title == "Why?"
+
+    def test_private_cache_dir(self):
+        config = FormConfigRegistry(self.cache_dir, private=True).get(self.path)
+        assert self.cache_dir.stat().st_mode & 0o777 == 0o700
+        assert len(list(self.cache_dir.glob("*.pickle"))) == 1
+
+        with mock.patch("yaml.safe_load") as load:
+            registry = FormConfigRegistry(self.cache_dir, private=True)
+            assert registry.get(self.path) == config
+            load.assert_not_called()
+
+    def test_shared_cache_dir(self):
+        FormConfigRegistry(self.cache_dir).get(self.path)
+        # Anyone could have replaced the pickle
+        self.cache_dir.chmod(0o777)
+        registry = FormConfigRegistry(self.cache_dir, private=True)
+        with mock.patch("pickle.load") as load, self.assertLogs(LOGGER, "WARNING"):
+            config = registry.get(self.path)
+            load.assert_not_called()
+        assert registry.cache_dir is None
+        assert config == FormConfigRegistry().get(self.path)
+
+    def test_cache_dir_owner(self):
+        self.cache_dir.mkdir(mode=0o700)
+        owner = self.cache_dir.stat().st_uid
+        with mock.patch("os.getuid", return_value=owner + 1, create=True):
+            registry = FormConfigRegistry(self.cache_dir, private=True)
+            with self.assertLogs(LOGGER, "WARNING"):
+                registry.get(self.path)
+        assert registry.cache_dir is None
+        assert not list(self.cache_dir.glob("*.pickle"))
+
+    def test_default_registry(self):
+        with override_settings(STAFF_REVIEWS_FORM_CACHE_DIR=str(self.cache_dir)):
+            assert default_registry().cache_dir == self.cache_dir
+        with override_settings(BASE_DIR=self.directory):
+            registry = default_registry()
+            assert not registry.cache_dir.exists()
+            registry.get(self.path)
+            assert registry.cache_dir.parent.parent == self.directory
+            assert registry.cache_dir.stat().st_mode & 0o777 == 0o700
+        with override_settings(BASE_DIR=None):
+            assert default_registry().cache_dir is None
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewPeriod,
+    ReviewRound,
+    ReviewStage,
+)
+from teamsite_staff_reviews.schema.special_linemanager import LineManagerNominationNode
+
+User = get_user_model()
+
+CLOSES = datetime(2022, 6, 10, 23, 59, tzinfo=timezone.utc)
+EXTENDED = datetime(2022, 6, 17, 23, 59, tzinfo=timezone.utc)
+
+
+class NominationClosesTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.stage = ReviewStage.objects.create(
+            period=self.period, code="FEEDBACK_CLOSE", title="Closes", date=CLOSES
+        )
+        reviewee = User.objects.create(username="reviewee")
+        for ix in range(3):
+            Nomination.objects.create(
+                period=self.period,
+                reviewee=reviewee,
+                reviewer=User.objects.create(username=f"reviewer-{ix}"),
+                role=ReviewerRole.WIDER_TEAM,
+            )
+
+    def closes(self):
+        return set(Nomination.objects.values_list("closes", flat=True))
+
+    def test_closes_from_stage(self):
+        assert self.closes() == {CLOSES}
+
+        nomination = Nomination.objects.first()
+        with self.assertNumQueries(0):
+            assert nomination.closes == CLOSES
+
+    def test_stage_changes(self):
+        self.stage.date = EXTENDED
+        self.stage.save()
+        assert self.closes() == {EXTENDED}
+
+        stage = ReviewStage.objects.get(pk=self.stage.pk)
+        stage.code = "PART1"
+        stage.save()
+        assert self.closes() == {None}
+
+        stage.code = "FEEDBACK_CLOSE"
+        stage.save()
+        assert self.closes() == {EXTENDED}
+
+        stage.delete()
+        assert self.closes() == {None}
+
+    def test_override(self):
+        nomination = Nomination.objects.first()
+        nomination.closes_override = EXTENDED
+        nomination.save(update_fields=["closes_override"])
+        assert Nomination.objects.filter(closes__gt=CLOSES).count() == 1
+
+        self.stage.date = CLOSES - timedelta(days=1)
+        self.stage.save()
+        assert self.closes() == {EXTENDED, CLOSES - timedelta(days=1)}
+
+    def test_bulk_override(self):
+        with self.assertNumQueries(1):
+            Nomination.objects.filter(period=self.period).set_closes_override(EXTENDED)
+        assert self.closes() == {EXTENDED}
+
+        with self.assertNumQueries(1):
+            Nomination.objects.filter(period=self.period).set_closes_override(None)
+        assert self.closes() == {CLOSES}
+
+    def test_line_manager_responses(self):
+        nomination = Nomination.objects.first()
+        request = RequestFactory().get("/")
+        request.user = User.objects.create(username="manager")
+        info = SimpleNamespace(context=request)
+
+        def responses():
+            with mock.patch(
+                "teamsite_staff_reviews.schema.special_linemanager.get_loaders"
+            ) as get_loaders:
+                get_loaders.return_value.responses.load.return_value = ["answers"]
+                return LineManagerNominationNode.resolve_responses(nomination, info)
+
+        # Still open before the deadline, and when there is no deadline
+        with mock.patch(
+            "teamsite_staff_reviews.schema.special_linemanager.now",
+            return_value=CLOSES - timedelta(days=1),
+        ):
+            assert responses() == []
+        self.stage.delete()
+        nomination.refresh_from_db()
+        assert nomination.closes is None
+        assert responses() == []
+
+        # The reviewer always sees their own answers
+        request.user = nomination.reviewer
+        assert responses() == ["answers"]
+
+        # Line managers see the answers once the nomination has closed
+        request.user = User.objects.get(username="manager")
+        nomination.closes = CLOSES
+        assert responses() == ["answers"]
@@ -0,0 +1,261 @@
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    NominationSummary,
+    ReviewerRole,
+    ReviewFormQuestion,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+    SummaryStatus,
+)
+from teamsite_staff_reviews.schema.loaders import prime_nominations
+from teamsite_staff_reviews.schema.nodes import NominationNode
+from teamsite_staff_reviews.schema.review_cycle import ReviewCycleNode
+from teamsite_staff_reviews.schema.special_linemanager import LineManagerNominationNode
+from teamsite_staff_reviews.workflow import FormDiff
+
+User = get_user_model()
+
+
+class NominationSummaryTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+        self.questions = list(
+            self.period.get_form(ReviewerRole.PROJECT_MANAGER).questions.all()
+        )
+        reviewee = User.objects.create(username="reviewee")
+        self.nominations = [
+            Nomination.objects.create(
+                period=self.period,
+                reviewer=User.objects.create(username=f"reviewer{i}"),
+                reviewee=reviewee,
+                role=ReviewerRole.PROJECT_MANAGER,
+            )
+            for i in range(3)
+        ]
+
+    def test_upsert(self):
+        nomination = self.nominations[0]
+        ReviewFormResponse.objects.upsert(
+            nomination,
+            {self.questions[0].pk: "Three short words", self.questions[1].pk: " "},
+        )
+        summary = NominationSummary.objects.get(nomination=nomination)
+        assert summary.questions == len(self.questions)
+        assert summary.answered == 1
+        assert summary.words == 3
+        assert summary.status == SummaryStatus.IN_PROGRESS
+        assert summary.first_modified is not None
+        assert summary.last_modified >= summary.first_modified
+
+        ReviewFormResponse.objects.upsert(
+            nomination, {q.pk: "Done" for q in self.questions}
+        )
+        summary.refresh_from_db()
+        assert summary.answered == len(self.questions)
+        assert summary.words == len(self.questions)
+        assert summary.status == SummaryStatus.COMPLETE
+
+    def test_save_and_delete(self):
+        nomination = self.nominations[1]
+        response = ReviewFormResponse.objects.create(
+            nomination=nomination, question=self.questions[0], value="Hello there"
+        )
+        assert nomination.summary.words == 2
+
+        response.delete()
+        nomination.summary.refresh_from_db()
+        assert nomination.summary.answered == 0
+        assert nomination.summary.status == SummaryStatus.NOT_STARTED
+
+    def assert_matches_refresh(self, nomination):
+        fields = ["questions", "answered", "words", "status"]
+        summary = NominationSummary.objects.get(nomination=nomination)
+        NominationSummary.objects.refresh([nomination.pk])
+        refreshed = NominationSummary.objects.get(nomination=nomination)
+        assert [getattr(summary, f) for f in fields] == [
+            getattr(refreshed, f) for f in fields
+        ]
+
+    def test_counters(self):
+        nomination = self.nominations[0]
+        first, second = self.questions[:2]
+        ReviewFormResponse.objects.upsert(nomination, {first.pk: "One two"})
+        self.assert_matches_refresh(nomination)
+
+        # Changed values are counted from the stored word counts, without reading the
+        # answers or the other responses
+        with self.assertNumQueries(3):
+            ReviewFormResponse.objects.upsert(
+                nomination, {first.pk: "One two three", second.pk: "Four"}
+            )
+        self.assert_matches_refresh(nomination)
+        assert nomination.summary.words == 4
+
+        response = ReviewFormResponse.objects.get(nomination=nomination, question=first)
+        response.value = ""
+        with self.assertNumQueries(3):
+            response.save()
+        self.assert_matches_refresh(nomination)
+
+        response.value = "Back again"
+        response.save()
+        ReviewFormResponse.objects.get(pk=response.pk).delete()
+        self.assert_matches_refresh(nomination)
+        nomination.summary.refresh_from_db()
+        assert (nomination.summary.answered, nomination.summary.words) == (1, 1)
+
+        ReviewFormResponse.objects.upsert(
+            nomination, {q.pk: "Done" for q in self.questions}
+        )
+        self.assert_matches_refresh(nomination)
+        nomination.summary.refresh_from_db()
+        assert nomination.summary.status == SummaryStatus.COMPLETE
+
+    def test_bulk_delete(self):
+        for nomination in self.nominations[:2]:
+            ReviewFormResponse.objects.upsert(
+                nomination, {q.pk: "Done" for q in self.questions}
+            )
+        ReviewFormResponse.objects.filter(question=self.questions[0]).delete()
+
+        summaries = NominationSummary.objects.filter(nomination__in=self.nominations)
+        assert [s.answered for s in summaries.order_by("pk")] == [
+            len(self.questions) - 1
+        ] * 2
+        assert {s.status for s in summaries} == {SummaryStatus.IN_PROGRESS}
+
+    def test_form_changes(self):
+        nomination = self.nominations[0]
+        ReviewFormResponse.objects.upsert(
+            nomination, {q.pk: "Done" for q in self.questions}
+        )
+        form = self.period.get_form(ReviewerRole.PROJECT_MANAGER)
+        FormDiff(
+            create_questions=[
+                ReviewFormQuestion(form=form, sequence=99, title="One more thing")
+            ]
+        ).apply()
+
+        nomination.summary.refresh_from_db()
+        assert nomination.summary.questions == len(self.questions) + 1
+        assert nomination.summary.status == SummaryStatus.IN_PROGRESS
+        # The other nominations for the form have summaries now too
+        assert NominationSummary.objects.filter(
+            nomination__in=self.nominations
+        ).count() == len(self.nominations)
+
+    def test_progress(self):
+        ReviewFormResponse.objects.upsert(
+            self.nominations[0], {q.pk: "Done" for q in self.questions}
+        )
+        ReviewFormResponse.objects.upsert(
+            self.nominations[1], {self.questions[0].pk: "Half way there"}
+        )
+
+        with self.assertNumQueries(1):
+            progress = self.period.nominations.progress()
+        assert progress["nominations"] == 3
+        assert progress["not_started"] == 1
+        assert progress["in_progress"] == 1
+        assert progress["complete"] == 1
+        assert progress["answered"] == len(self.questions) + 1
+        assert progress["words"] == len(self.questions) + 3
+
+        request = RequestFactory().get("/")
+        request.user = User.objects.create(username="admin", is_staff=True)
+        info = SimpleNamespace(context=request)
+        assert ReviewCycleNode.resolve_progress(self.period, info) == progress
+
+        request.user = self.nominations[0].reviewer
+        assert ReviewCycleNode.resolve_progress(self.period, info) is None
+
+    def test_command(self):
+        ReviewFormResponse.objects.bulk_create(
+            ReviewFormResponse(
+                nomination=n, question=self.questions[0], value="Hi", value_words=1
+            )
+            for n in self.nominations
+        )
+        assert not NominationSummary.objects.exists()
+
+        call_command("refresh-nomination-summaries", "--batch-size", "2")
+        answered = NominationSummary.objects.values_list("answered", flat=True)
+        assert list(answered) == [1, 1, 1]
+
+    def test_backfill_migration(self):
+        migration = import_module(
+            "teamsite_staff_reviews.migrations.0010_backfill_nomination_summaries"
+        )
+        ReviewFormResponse.objects.bulk_create(
+            [
+                ReviewFormResponse(
+                    nomination=self.nominations[0],
+                    question=q,
+                    value="Two words",
+                    value_words=2,
+                )
+                for q in self.questions
+            ]
+            + [
+                ReviewFormResponse(
+                    nomination=self.nominations[1],
+                    question=self.questions[0],
+                    value="Hi",
+                    value_words=1,
+                ),
+                ReviewFormResponse(
+                    nomination=self.nominations[1], question=self.questions[1], value=""
+                ),
+            ]
+        )
+        assert not NominationSummary.objects.exists()
+
+        migration.backfill(apps, None)
+        statuses = NominationSummary.objects.order_by("nomination_id").values_list(
+            "status", flat=True
+        )
+        assert list(statuses) == [
+            SummaryStatus.COMPLETE,
+            SummaryStatus.IN_PROGRESS,
+            SummaryStatus.NOT_STARTED,
+        ]
+        for nomination in self.nominations:
+            self.assert_matches_refresh(nomination)
+
+    def test_node(self):
+        ReviewFormResponse.objects.upsert(
+            self.nominations[0], {self.questions[0].pk: "Hello"}
+        )
+        request = RequestFactory().get("/")
+        request.user = self.nominations[0].reviewer
+        info = SimpleNamespace(context=request)
+
+        nominations = prime_nominations(
+            info, Nomination.objects.filter(pk__in=[n.pk for n in self.nominations])
+        )
+        with self.assertNumQueries(1):
+            summaries = [NominationNode.resolve_summary(n, info) for n in nominations]
+        assert [s.answered if s else None for s in summaries] == [1, None, None]
+
+        # Reviewees don't see their reviewers' progress, but staff and line managers do
+        request.user = nominations[0].reviewee
+        assert NominationNode.resolve_summary(nominations[0], info) is None
+        assert LineManagerNominationNode.resolve_summary(nominations[0], info) is None
+
+        request.user = User.objects.create(username="manager")
+        summary = LineManagerNominationNode.resolve_summary(nominations[0], info)
+        assert summary.answered == 1
+        assert NominationNode.resolve_summary(nominations[0], info) is None
+
+        request.user.is_staff = True
+        assert NominationNode.resolve_summary(nominations[0], info) == summary
@@ -0,0 +1,94 @@
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewPeriod,
+    ReviewRound,
+    ReviewStage,
+    StageCode,
+)
+from teamsite_staff_reviews.workflow import nominate_line_managers, sync_nominations
+
+User = get_user_model()
+
+CLOSES = datetime(2022, 6, 30, 17, tzinfo=timezone.utc)
+
+
+def profile(user, line_manager=None):
+    return SimpleNamespace(
+        user=user,
+        user_id=user.pk,
+        line_manager=line_manager,
+        line_manager_id=line_manager and line_manager.pk,
+    )
+
+
+class NominationSyncTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        ReviewStage.objects.create(
+            period=self.period, code=StageCode.FEEDBACK_CLOSE.name, date=CLOSES
+        )
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(1000))
+        self.users = list(User.objects.order_by("pk"))
+
+    def organisation(self):
+        """
+        Ten teams of a hundred, each managed by its first member, who reports to user0.
+        """
+        return [profile(self.users[0])] + [
+            profile(user, self.users[0 if i % 100 == 0 else i // 100 * 100])
+            for i, user in enumerate(self.users[1:], 1)
+        ]
+
+    def test_line_managers(self):
+        profiles = self.organisation()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            result = nominate_line_managers(self.period, profiles)
+        assert time.perf_counter() - started < 1
+        # SQLite splits the insert into batches of its maximum number of variables
+        assert len(queries) < 20, len(queries)
+        assert (result.created, result.updated, result.unchanged) == (999, 0, 0)
+
+        nomination = Nomination.objects.get(reviewer=self.users[250])
+        assert nomination.reviewee == self.users[200]
+        assert nomination.role == ReviewerRole.DIRECT_REPORT
+        assert nomination.closes == CLOSES
+
+        profiles[250] = profile(self.users[250], self.users[300])
+        profiles[251] = profile(self.users[251], User(pk=-1, username="left"))
+        result = nominate_line_managers(self.period, profiles)
+        assert (result.created, result.updated, result.unchanged) == (0, 1, 997)
+        nomination.refresh_from_db()
+        assert nomination.reviewee == self.users[300]
+        assert Nomination.objects.count() == 999
+
+    def test_closes_override(self):
+        override = datetime(2022, 7, 15, 17, tzinfo=timezone.utc)
+        targets = [
+            dict(reviewer_id=self.users[0].pk, reviewee_id=self.users[1].pk),
+            dict(reviewer_id=self.users[0].pk, reviewee_id=self.users[2].pk),
+        ]
+        role = ReviewerRole.ASSESSMENT_PT_1
+        sync_nominations(self.period, role, targets, fields=("closes_override",))
+
+        targets[1]["closes_override"] = override
+        targets[0]["closes_override"] = None
+        with self.assertNumQueries(5):
+            result = sync_nominations(
+                self.period, role, targets, fields=("closes_override",)
+            )
+        assert (result.created, result.updated, result.unchanged) == (0, 1, 1)
+        closes = Nomination.objects.order_by("reviewee").values_list(
+            "closes", flat=True
+        )
+        assert list(closes) == [CLOSES, override]
@@ -0,0 +1,155 @@
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.models import (
+    ExternalInvitation,
+    ExternalUserToken,
+    Nomination,
+    ReviewerRole,
+    ReviewPeriod,
+    ReviewRound,
+    ReviewStage,
+    StageCode,
+)
+from teamsite_staff_reviews.schema.cycle import load_current_cycle
+from teamsite_staff_reviews.schema.loaders import (
+    load_forms,
+    load_responses,
+    load_summaries,
+)
+from teamsite_staff_reviews.schema.nodes import ExternalInvitationNode
+from teamsite_staff_reviews.schema.review_cycle import ReviewCycleNode
+from teamsite_staff_reviews.util.word_export.snapshot import ExportSnapshot
+
+User = get_user_model()
+
+
+def query_plan(sql) -> str:
+    """
+    The SQLite query plan of a statement, one step per line.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return "\n".join(row[-1] for row in cursor.fetchall())
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are checked with SQLite")
+class QueryPlanTest(TestCase):
+    """
+    Checks the plans of the statements that the code actually runs, captured as it runs.
+    """
+
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+        ReviewStage.objects.create(
+            period=self.period,
+            code=StageCode.OPEN.name,
+            title="Open",
+            date=now() - timedelta(days=1),
+        )
+        self.user = User.objects.create(username="user")
+        self.nomination = Nomination.objects.create(
+            period=self.period,
+            reviewee=self.user,
+            reviewer=User.objects.create(username="reviewer"),
+            role=ReviewerRole.PROJECT_MANAGER,
+        )
+
+    @contextmanager
+    def plans(self):
+        """
+        Collects the query plan of each statement run in the block.
+        """
+        plans = []
+        with CaptureQueriesContext(connection) as queries:
+            yield plans
+        for query in queries:
+            plans.append(query_plan(query["sql"]))
+
+    def assertUsesIndex(self, plan, index=r"\w+"):
+        self.assertRegex(plan, rf"USING (COVERING )?INDEX {index}\b", plan)
+
+    def assertNoScans(self, plans):
+        """
+        Every table is searched with an index rather than scanned, apart from the scans
+        of the small result of a subquery.
+        """
+        for plan in plans:
+            scans = re.findall(r"^\s*SCAN (?!\()(\w+)\b(?! USING)", plan, re.M)
+            assert not scans, plan
+
+    def test_current_cycle(self):
+        with self.plans() as plans:
+            assert load_current_cycle() == self.period
+        # The period, then the prefetched stages and forms
+        assert len(plans) == 3
+        self.assertUsesIndex(plans[0], "stage_code_date")
+        self.assertNoScans(plans)
+
+    def test_cycle_nominations(self):
+        cycle = self.period
+        cycle.user = self.user
+        with self.plans() as plans:
+            list(ReviewCycleNode.resolve_nominations(cycle, None))
+            list(ReviewCycleNode.resolve_to_review(cycle, None))
+        self.assertUsesIndex(plans[0], "nomination_period_reviewee")
+        self.assertUsesIndex(plans[1], "nomination_period_reviewer")
+
+    def test_loaders(self):
+        with self.plans() as plans:
+            load_forms({(self.period.pk, ReviewerRole.PROJECT_MANAGER.value)})
+            load_responses({self.nomination.pk})
+            load_summaries({self.nomination.pk})
+        assert len(plans) == 3
+        self.assertNoScans(plans)
+
+    def test_export_snapshot(self):
+        nominations = self.period.nominations.filter(role=ReviewerRole.PROJECT_MANAGER)
+        with self.plans() as plans:
+            (record,) = ExportSnapshot(nominations)
+        # The nominations, forms, questions and responses
+        assert len(plans) == 4
+        self.assertUsesIndex(plans[0], "nomination_period_role")
+        self.assertNoScans(plans)
+
+    def test_changed_since_export(self):
+        with self.plans() as plans:
+            list(
+                Nomination.objects.filter(period=self.period).changed_since_export(
+                    "target"
+                )
+            )
+        # The last export is looked up by (nomination, target) for each nomination
+        self.assertUsesIndex(
+            plans[0], r"\w*exportmanifestentry_nomination_id_target\w*"
+        )
+        self.assertNoScans(plans)
+
+    def test_closes(self):
+        with self.plans() as plans:
+            self.nomination.get_closes()
+            Nomination.objects.filter(pk=self.nomination.pk).recompute_closes()
+        for plan in plans:
+            self.assertUsesIndex(plan, "stage_period_code")
+
+    def test_tokens(self):
+        token = ExternalUserToken.objects.create(email="someone@example.com")
+        with self.plans() as plans:
+            ExternalUserToken.objects.get_by_secret(token.secret)
+        self.assertRegex(plans[0], r"^SEARCH \w+ USING INDEX", plans[0])
+
+    def test_invitation_last_sent(self):
+        invitation = ExternalInvitation.objects.create(nomination=self.nomination)
+        with self.plans() as plans:
+            ExternalInvitationNode.resolve_last_sent(invitation, None)
+        self.assertUsesIndex(plans[0], "invitation_message_sent")
+        assert "TEMP B-TREE" not in plans[0]
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from graphql_relay import to_global_id
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+    hash_value,
+)
+from teamsite_staff_reviews.schema.reviewer_mutation import (
+    ResponseBatchUpdateMutation,
+    ResponseUpdateMutation,
+)
+
+User = get_user_model()
+
+
+class ResponseAutosaveTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+        self.reviewer = User.objects.create(username="reviewer")
+        self.nomination = Nomination.objects.create(
+            period=self.period,
+            reviewer=self.reviewer,
+            reviewee=User.objects.create(username="reviewee"),
+            role=ReviewerRole.PROJECT_MANAGER,
+        )
+        self.questions = [
+            to_global_id("ReviewFormQuestionNode", q.pk)
+            for q in self.period.get_form(ReviewerRole.PROJECT_MANAGER).questions.all()
+        ]
+
+        request = RequestFactory().post("/")
+        request.user = self.reviewer
+        self.info = SimpleNamespace(context=request)
+
+    def save(self, *values):
+        answers = [
+            SimpleNamespace(question_id=q, value=v)
+            for q, v in zip(self.questions, values)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            result = ResponseBatchUpdateMutation.mutate_and_get_payload(
+                None,
+                self.info,
+                nomination_id=to_global_id("NominationNode", self.nomination.pk),
+                responses=answers,
+            )
+        # The nomination summary is refreshed after the responses are written
+        writes = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE"))
+            and "nominationsummary" not in q["sql"]
+        ]
+        return result, writes
+
+    def test_batch_upsert(self):
+        result, writes = self.save("One", "Two")
+        assert result.changed == 2
+        assert [r.value for r in result.responses] == ["One", "Two"]
+        assert len(writes) == 1
+
+        result, writes = self.save("One", "Two")
+        assert result.changed == 0
+        assert len(result.responses) == 2
+        assert writes == []
+
+        result, writes = self.save("One", "Two and a bit", "Three")
+        assert result.changed == 2
+        assert [r.value for r in result.responses] == ["One", "Two and a bit", "Three"]
+        assert len(writes) == 1
+        assert ReviewFormResponse.objects.count() == 3
+        assert sorted(
+            ReviewFormResponse.objects.values_list("value_length", flat=True)
+        ) == [3, 5, 13]
+
+    def test_single_update(self):
+        result = ResponseUpdateMutation.mutate_and_get_payload(
+            None,
+            self.info,
+            nomination_id=to_global_id("NominationNode", self.nomination.pk),
+            question_id=self.questions[0],
+            value="Hello",
+        )
+        assert result.response.value == "Hello"
+        response = ReviewFormResponse.objects.get()
+        assert response.value_hash == hash_value("Hello")
+        assert response.value_length == 5
+
+    def test_question_from_other_form(self):
+        other = self.period.get_form(ReviewerRole.SELF_ASSESSMENT).questions.first()
+        self.questions = [to_global_id("ReviewFormQuestionNode", other.pk)]
+        with self.assertRaises(PermissionDenied):
+            self.save("Not mine")
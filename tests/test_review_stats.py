@@ -0,0 +1,229 @@
+import os
+import zipfile
+from datetime import datetime, timedelta, timezone
+from importlib.util import find_spec
+from tempfile import TemporaryDirectory
+from unittest import skipUnless
+from xml.etree import ElementTree
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+)
+from teamsite_staff_reviews.reports.review_stats import (
+    ResponseTimeseries,
+    reviewer_cohorts,
+    write_timeseries,
+)
+
+User = get_user_model()
+
+# The spreadsheet is written with the optional xlsxwriter
+XLSXWRITER = find_spec("xlsxwriter") is not None
+# The change log and the profiles come from the teamsite and resourcing apps
+CHANGE_LOG = apps.is_installed("teamsite") and apps.is_installed("resourcing")
+
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def read_rows(filename):
+    """
+    The values of each row of the first worksheet, as strings.
+    """
+    with zipfile.ZipFile(filename) as archive:
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    return [
+        ["".join(cell.itertext()) for cell in row.iterfind("x:c", NS)]
+        for row in sheet.iterfind("x:sheetData/x:row", NS)
+    ]
+
+
+class ResponseTimeseriesTest(SimpleTestCase):
+    def test_running_totals(self):
+        timeseries = ResponseTimeseries()
+        points = [
+            timeseries.add(1, "r1", "one two", "Alice", "2020"),
+            timeseries.add(2, "r2", "three", "Bob", "External"),
+            timeseries.add(3, "r1", "one two three four"),
+            timeseries.add(4, "r3", None, "Alice", "2020"),
+            timeseries.add(5, "r2", ""),
+        ]
+
+        assert [p["word_length"] for p in points] == [2, 3, 5, 5, 4]
+        assert [p["char_length"] for p in points] == [7, 12, 23, 23, 18]
+        assert [p["reviewers"] for p in points] == [1, 2, 2, 2, 2]
+        assert points[0] == dict(
+            time=1, char_length=7, word_length=2, reviewers=1, **{"2020": 1}
+        )
+        assert points[-1]["2020"] == 1
+        assert points[-1]["External"] == 1
+
+
+class ResponseFixture:
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+        self.reviewee = User.objects.create(username="reviewee")
+        self.question = self.period.get_form(
+            ReviewerRole.PROJECT_MANAGER
+        ).questions.first()
+
+    def add_nomination(self, ix, external=False):
+        if external:
+            return Nomination.objects.create(
+                period=self.period,
+                reviewee=self.reviewee,
+                external_name=f"External {ix}",
+                external_email=f"external{ix}@example.com",
+                role=ReviewerRole.PROJECT_MANAGER,
+            )
+        return Nomination.objects.create(
+            period=self.period,
+            reviewee=self.reviewee,
+            reviewer=User.objects.create(
+                username=f"reviewer{ix}", first_name="Reviewer", last_name=str(ix)
+            ),
+            role=ReviewerRole.PROJECT_MANAGER,
+        )
+
+    def add_response(self, nomination, value):
+        return ReviewFormResponse.objects.create(
+            nomination=nomination, question=self.question, value=value
+        )
+
+
+@skipUnless(XLSXWRITER, "xlsxwriter is not installed")
+class WriteTimeseriesTest(ResponseFixture, TestCase):
+    def test_spreadsheet(self):
+        internal, external = self.add_nomination(1), self.add_nomination(2, True)
+        first = self.add_response(internal, "one two")
+        second = self.add_response(external, "three")
+        edited = ReviewFormResponse.objects.get(pk=first.pk)
+        edited.value = "one two three four"
+
+        started = datetime(2022, 7, 1, tzinfo=timezone.utc)
+        revisions = [
+            (started, first, True),
+            (started + timedelta(hours=1), second, True),
+            (started + timedelta(hours=2), edited, False),
+        ]
+        reviewers = {
+            internal.pk: ("Reviewer 1", "Unknown"),
+            external.pk: ("External 2", "External"),
+        }
+        with TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "review-stats.xlsx")
+            with self.assertNumQueries(0):
+                write_timeseries(filename, revisions, reviewers)
+            rows = read_rows(filename)
+
+        assert rows[0] == [
+            "time",
+            "char_length",
+            "word_length",
+            "reviewers",
+            "Unknown",
+            "External",
+        ]
+        assert [row[1:] for row in rows[1:]] == [
+            ["7", "2", "1", "1"],
+            ["12", "3", "2", "1", "1"],
+            ["23", "5", "2", "1", "1"],
+        ]
+
+
+@skipUnless(XLSXWRITER, "xlsxwriter is not installed")
+class ChangesByTimeQueriesTest(ResponseFixture, TestCase):
+    """
+    The report after the change log has been read, which runs here without the teamsite
+    app: the revisions are given as the command builds them from the change log entries.
+    """
+
+    def add_reviews(self, start, count):
+        for ix in range(start, start + count):
+            response = self.add_response(self.add_nomination(ix, ix % 2), "First draft")
+            edited = ReviewFormResponse.objects.get(pk=response.pk)
+            edited.value = "Second draft, a bit longer"
+            edited.save()
+            self.revisions += [(now(), response, True), (now(), edited, False)]
+
+    def changes_by_time(self):
+        """
+        Writes the report and returns the rows written and the number of queries.
+        """
+        nomination_ids = dict.fromkeys(
+            r.nomination_id for _, r, created in self.revisions if created
+        )
+        with TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "review-stats.xlsx")
+            with CaptureQueriesContext(connection) as queries:
+                reviewers = reviewer_cohorts(nomination_ids)
+                write_timeseries(
+                    filename,
+                    self.revisions,
+                    {pk: reviewers[pk] for pk in nomination_ids},
+                )
+            return read_rows(filename), len(queries)
+
+    def test_constant_queries(self):
+        self.revisions = []
+        self.add_reviews(0, 2)
+        rows, queries = self.changes_by_time()
+        assert queries == 1
+        assert rows[0][4:] == ["Unknown", "External"]
+        assert len(rows) == 1 + 2 * 2
+
+        self.add_reviews(2, 8)
+        rows, more_queries = self.changes_by_time()
+        assert more_queries == queries
+        assert len(rows) == 1 + 10 * 2
+        assert rows[-1][2:] == ["50", "10", "5", "5"]
+
+
+@skipUnless(XLSXWRITER and CHANGE_LOG, "The change log report's apps aren't installed")
+class ChangesByTimeTest(ResponseFixture, TestCase):
+    def changes_by_time(self):
+        """
+        Runs the report and returns the rows written and the number of queries.
+        """
+        with TemporaryDirectory() as dirname:
+            filename = os.path.join(dirname, "review-stats.xlsx")
+            with CaptureQueriesContext(connection) as queries:
+                call_command("review-stats", "--changes-by-time", filename)
+            return read_rows(filename), len(queries)
+
+    def add_reviews(self, start, count):
+        for ix in range(start, start + count):
+            response = self.add_response(self.add_nomination(ix, ix % 2), "First draft")
+            response.value = "Second draft, a bit longer"
+            response.save()
+
+    def test_changes_by_time(self):
+        self.add_reviews(0, 2)
+        rows, queries = self.changes_by_time()
+        assert rows[0] == [
+            "time",
+            "char_length",
+            "word_length",
+            "reviewers",
+            "Unknown",
+            "External",
+        ]
+        assert len(rows) == 1 + 2 * 2
+
+        self.add_reviews(2, 8)
+        rows, more_queries = self.changes_by_time()
+        assert len(rows) == 1 + 10 * 2
+        assert rows[-1][3:] == ["10", "5", "5"]
+        assert more_queries == queries
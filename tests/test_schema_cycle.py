@@ -0,0 +1,87 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewPeriod,
+    ReviewRound,
+    ReviewStage,
+    StageCode,
+)
+from teamsite_staff_reviews.schema import Query
+from teamsite_staff_reviews.schema.review_cycle import ReviewCycleNode
+from teamsite_staff_reviews.schema.special_reviewer import ReviewerNominationNode
+
+User = get_user_model()
+
+
+class CurrentCycleTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+
+        date = now() - timedelta(weeks=4)
+        for stage in StageCode:
+            if stage != StageCode.OTHER:
+                ReviewStage.objects.create(
+                    period=self.period, code=stage.name, title=stage.title, date=date
+                )
+                date += timedelta(weeks=1)
+
+        self.user = User.objects.create(username="reviewer")
+
+    def add_nominations(self, count):
+        for ix in range(count):
+            reviewee = User.objects.create(username=f"reviewee-{count}-{ix}")
+            Nomination.objects.create(
+                period=self.period,
+                reviewer=self.user,
+                reviewee=reviewee,
+                role=ReviewerRole.WIDER_TEAM,
+            )
+            Nomination.objects.create(
+                period=self.period,
+                reviewer=reviewee,
+                reviewee=self.user,
+                role=ReviewerRole.PROJECT_MANAGER,
+            )
+
+    def load_dashboard(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        info = SimpleNamespace(context=request)
+
+        period = Query.resolve_current_review_cycle(None, info)
+        ReviewCycleNode.resolve_current_stage(period, info)
+        for resolver in (
+            ReviewCycleNode.resolve_nominations,
+            ReviewCycleNode.resolve_to_review,
+        ):
+            for nomination in resolver(period, info):
+                nomination.closes
+                nomination.form
+                ReviewerNominationNode.resolve_form(nomination, info)
+
+        # A second lookup within the same request is served from the cache
+        assert Query.resolve_current_review_cycle(None, info) is period
+        return period
+
+    def test_current_cycle(self):
+        self.add_nominations(1)
+        period = self.load_dashboard()
+        assert period == self.period
+        assert period.get_current_stage().code == "FEEDBACK_CLOSE"
+
+    def test_dashboard_query_count(self):
+        self.add_nominations(2)
+        with self.assertNumQueries(5):
+            self.load_dashboard()
+
+        self.add_nominations(10)
+        with self.assertNumQueries(5):
+            self.load_dashboard()
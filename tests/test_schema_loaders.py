@@ -0,0 +1,148 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.db.models import IntegerField, Value
+from django.test import RequestFactory, TestCase
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+    ReviewStage,
+)
+from teamsite_staff_reviews.schema import Query
+from teamsite_staff_reviews.schema.loaders import get_loaders
+from teamsite_staff_reviews.schema.nodes import LineReportNode, NominationNode
+from teamsite_staff_reviews.schema.review_cycle import ReviewCycleNode
+from teamsite_staff_reviews.schema.special_linemanager import LineManagerNominationNode
+from teamsite_staff_reviews.schema.special_reviewer import (
+    ReviewerNode,
+    ReviewerNominationNode,
+)
+
+User = get_user_model()
+
+
+class DataLoaderTest(TestCase):
+    def setUp(self):
+        self.period = ReviewPeriod.objects.create(year=2022, round=ReviewRound.MID_YEAR)
+        self.period.add_forms()
+        ReviewStage.objects.create(
+            period=self.period,
+            code="OPEN",
+            title="Opens",
+            date=now() - timedelta(weeks=1),
+        )
+        ReviewStage.objects.create(
+            period=self.period,
+            code="FEEDBACK_CLOSE",
+            title="Feedback Closes",
+            date=now() - timedelta(days=1),
+        )
+        self.manager = User.objects.create(username="manager")
+
+    def add_report(self, name, nomination_count):
+        report = User.objects.create(username=name)
+        question = self.period.get_form(ReviewerRole.WIDER_TEAM).questions.first()
+        for ix in range(nomination_count):
+            reviewer = User.objects.create(username=f"{name}-reviewer-{ix}")
+            nomination = Nomination.objects.create(
+                period=self.period,
+                reviewer=reviewer,
+                reviewee=report,
+                role=ReviewerRole.WIDER_TEAM,
+            )
+            ReviewFormResponse.objects.create(
+                nomination=nomination, question=question, value="Great work"
+            )
+        return report
+
+    def get_info(self):
+        request = RequestFactory().get("/")
+        request.user = self.manager
+        return SimpleNamespace(context=request)
+
+    def resolve_connection(self, node, name, obj, info, **args):
+        field = node._meta.fields[name]
+        resolver = field.wrap_resolve(getattr(node, f"resolve_{name}"))
+        return [edge.node for edge in resolver(obj, info, **args).edges]
+
+    def resolve_nomination(self, node, nomination, info):
+        assert node.resolve_form(nomination, info).role == nomination.role
+        assert node.resolve_reviewee(nomination, info).pk == nomination.reviewee_id
+        assert node.resolve_reviewer(nomination, info).pk == nomination.reviewer_id
+        return node.resolve_responses(nomination, info)
+
+    def test_reviewer_nominations(self):
+        question = self.period.get_form(ReviewerRole.WIDER_TEAM).questions.first()
+        for ix in range(8):
+            nomination = Nomination.objects.create(
+                period=self.period,
+                reviewer=self.manager,
+                reviewee=User.objects.create(username=f"reviewee-{ix}"),
+                role=ReviewerRole.WIDER_TEAM,
+            )
+            ReviewFormResponse.objects.create(
+                nomination=nomination, question=question, value="Great work"
+            )
+
+        info = self.get_info()
+        period = Query.resolve_current_review_cycle(None, info)
+        with self.assertNumQueries(3):
+            nominations = self.resolve_connection(
+                ReviewerNode, "nominations", period, info
+            )
+            for nomination in nominations:
+                responses = self.resolve_nomination(
+                    ReviewerNominationNode, nomination, info
+                )
+                assert [r.value for r in responses] == ["Great work"]
+        assert len(nominations) == 8
+
+    def test_line_report_nominations(self):
+        for count in (2, 10):
+            report = self.add_report(f"report-{count}", count)
+            info = self.get_info()
+            Query.resolve_current_review_cycle(None, info)
+            report = User.objects.annotate(
+                period_id=Value(self.period.pk, output_field=IntegerField())
+            ).get(pk=report.pk)
+
+            with self.assertNumQueries(3):
+                nominations = self.resolve_connection(
+                    LineReportNode, "nominations", report, info
+                )
+                for nomination in nominations:
+                    responses = self.resolve_nomination(
+                        LineManagerNominationNode, nomination, info
+                    )
+                    assert len(responses) == 1
+            assert len(nominations) == count
+
+    def test_primes_page(self):
+        for ix in range(5):
+            Nomination.objects.create(
+                period=self.period,
+                reviewer=self.manager,
+                reviewee=User.objects.create(username=f"reviewee-{ix}"),
+                role=ReviewerRole.WIDER_TEAM,
+            )
+
+        info = self.get_info()
+        period = Query.resolve_current_review_cycle(None, info)
+        with self.assertNumQueries(4):
+            nominations = self.resolve_connection(
+                ReviewCycleNode, "to_review", period, info, first=2
+            )
+            for nomination in nominations:
+                self.resolve_nomination(NominationNode, nomination, info)
+        assert len(nominations) == 2
+
+        loaders = get_loaders(info)
+        assert set(loaders.users._cache) == {self.manager.pk} | {
+            n.reviewee_id for n in nominations
+        }
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from django.test import SimpleTestCase
+
+from teamsite_staff_reviews.util.sharepoint import FolderResolver, TTLCache
+from teamsite_staff_reviews.util.upload import Uploader
+
+
+def make_handler(folders, requests, gate=None):
+    """
+    A stand-in for the drive folder API. folders maps paths to ids, with "" for the root.
+    Lookups of paths in gate wait for its event first.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, data=None):
+            body = json.dumps(data or {}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            requests.append(("GET", unquote(self.path)))
+            path = unquote(self.path).split("/root", 1)[1].lstrip(":/")
+            if gate and path in gate:
+                gate[path].wait(5)
+            if path in folders:
+                self.reply(200, {"id": folders[path]})
+            else:
+                self.reply(404)
+
+        def do_POST(self):
+            requests.append(("POST", unquote(self.path)))
+            data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            parent_id = self.path.split("/items/")[1].split("/")[0]
+            parent = next(p for p, i in folders.items() if i == parent_id)
+            path = f"{parent}/{data['name']}".lstrip("/")
+            folders[path] = f"id-{len(folders)}"
+            self.reply(201, {"id": folders[path]})
+
+    return Handler
+
+
+class FolderResolverTest(SimpleTestCase):
+    def setUp(self):
+        self.folders = {"": "root", "2022 Mid Year": "year"}
+        self.requests = []
+        self.gate = {}
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), make_handler(self.folders, self.requests, self.gate)
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        api_url = f"http://127.0.0.1:{self.server.server_port}"
+
+        self.parsed = []
+
+        def parse_path(location, access_token=None):
+            self.parsed.append(location)
+            drive, path = location.split(":", 1)
+            return {"id": drive}, path
+
+        self.resolver = FolderResolver(
+            Uploader(lambda: "token", backoff=0), api_url, parse_path=parse_path
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_creates_folders_once(self):
+        for name in ["Ann", "Bob"]:
+            for filename in ["one.docx", "two.docx", "three.docx"]:
+                url = self.resolver.item_url(
+                    f"feedback:/2022 Mid Year/responses/{name}", filename
+                )
+                assert url.endswith(f":/{filename}")
+
+        assert set(self.folders) == {
+            "",
+            "2022 Mid Year",
+            "2022 Mid Year/responses",
+            "2022 Mid Year/responses/Ann",
+            "2022 Mid Year/responses/Bob",
+        }
+        assert len([r for r in self.requests if r[0] == "POST"]) == 3
+        # One lookup per folder, and none for the files
+        assert len([r for r in self.requests if r[0] == "GET"]) == 4
+        # One lookup per drive
+        assert self.parsed == ["feedback:"]
+
+    def test_missing_folder(self):
+        drive, folder_id = self.resolver.location_folder(
+            "feedback:/2022 Mid Year/responses/Ann", create=False
+        )
+        assert folder_id is None
+        assert "2022 Mid Year/responses" not in self.folders
+
+    def test_drives_cached_by_prefix(self):
+        self.resolver.item_url("feedback:/2022 Mid Year", "one.docx")
+        self.resolver.item_url("feedback:", "two.docx")
+        self.resolver.item_url("archive:/2022 Mid Year", "three.docx")
+
+        assert self.parsed == ["feedback:", "archive:"]
+        assert self.resolver.resolve("feedback:/a/b/") == ({"id": "feedback"}, "a/b")
+
+    def test_colon_in_folder_name(self):
+        drive, folder_id = self.resolver.location_folder("feedback:/Review: 2022")
+        assert drive == {"id": "feedback"}
+        assert "Review: 2022" in self.folders
+        assert self.parsed == ["feedback:"]
+        assert self.resolver.resolve("feedback:/a:b/c") == ({"id": "feedback"}, "a:b/c")
+
+    def test_concurrent_creation(self):
+        barrier = threading.Barrier(4)
+        ids = []
+
+        def save():
+            barrier.wait()
+            ids.append(
+                self.resolver.location_folder("feedback:/2022 Mid Year/responses")[1]
+            )
+
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(set(ids)) == 1 and len(ids) == 4
+        assert len([r for r in self.requests if r[0] == "POST"]) == 1
+
+    def test_other_folders_not_blocked(self):
+        self.gate["Slow"] = threading.Event()
+        slow = threading.Thread(
+            target=self.resolver.location_folder, args=("feedback:/Slow",)
+        )
+        slow.start()
+        deadline = time.monotonic() + 5
+        while not any(r[1].endswith("/Slow") for r in self.requests):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        try:
+            # Resolved while the slow lookup is still waiting for its reply
+            drive, folder_id = self.resolver.location_folder("feedback:/2022 Mid Year")
+            assert folder_id == "year"
+            assert slow.is_alive()
+        finally:
+            self.gate["Slow"].set()
+            slow.join(5)
+        assert "Slow" in self.folders
+
+
+class TTLCacheTest(SimpleTestCase):
+    def test_expiry(self):
+        clock = [0]
+        cache = TTLCache(timedelta(seconds=10), clock=lambda: clock[0])
+        cache.set("a", 1)
+        clock[0] = 9
+        assert cache.get("a") == 1
+        clock[0] = 10
+        assert "a" not in cache
+        assert cache.get("a", "gone") == "gone"
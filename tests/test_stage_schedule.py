@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewPeriod,
+    ReviewRound,
+    ReviewStage,
+    StageCode,
+)
+from teamsite_staff_reviews.workflow import schedule_default_stages, schedule_stages
+
+User = get_user_model()
+
+# A Monday
+START = datetime(2022, 5, 2, 12, tzinfo=timezone.utc)
+
+
+class StageCodeTest(SimpleTestCase):
+    def test_metadata(self):
+        assert [code.index for code in StageCode] == list(range(len(StageCode)))
+        assert StageCode.PART1.label == "6. Part 1"
+        assert StageCode.choices()[0] == ("OPEN", "1. Opens")
+        assert StageCode.choices() is StageCode.choices()
+
+
+class ScheduleStagesTest(SimpleTestCase):
+    def test_weekly(self):
+        timetable = schedule_stages(START)
+        assert StageCode.OTHER not in timetable
+        assert list(timetable) == list(StageCode)[:-1]
+        assert timetable[StageCode.OPEN] == START.replace(hour=0)
+        assert timetable[StageCode.NOMINATIONS_CLOSE] == datetime(
+            2022, 5, 16, 23, 59, 59, tzinfo=timezone.utc
+        )
+        assert {d.weekday() for d in timetable.values()} == {0}
+
+    def test_holidays_and_offsets(self):
+        timetable = schedule_stages(
+            START,
+            offsets={StageCode.NOMINATIONS_CLOSE: timedelta(days=4)},
+            holidays={date(2022, 5, 9)},
+        )
+        assert timetable[StageCode.NOMINATIONS].date() == date(2022, 5, 10)
+        # Four days after the Tuesday is a Saturday, so it moves to Monday
+        assert timetable[StageCode.NOMINATIONS_CLOSE].date() == date(2022, 5, 16)
+        assert timetable[StageCode.FEEDBACK_OPENS].date() == date(2022, 5, 23)
+
+    def test_existing(self):
+        feedback_close = datetime(2022, 7, 1, 23, 59, 59, tzinfo=timezone.utc)
+        timetable = schedule_stages(
+            START, existing={StageCode.FEEDBACK_CLOSE: feedback_close}
+        )
+        assert StageCode.FEEDBACK_CLOSE not in timetable
+        assert timetable[StageCode.PART1].date() == date(2022, 7, 8)
+
+
+class ScheduleDefaultStagesTest(TestCase):
+    def test_periods(self):
+        periods = [
+            ReviewPeriod.objects.create(year=2022, round=round)
+            for round in (ReviewRound.MID_YEAR, ReviewRound.FULL_YEAR)
+        ]
+        ReviewStage.objects.create(
+            period=periods[1],
+            code=StageCode.OPEN.name,
+            title="Opens",
+            date=START + timedelta(weeks=26),
+        )
+        user = User.objects.create(username="user")
+        nomination = Nomination.objects.create(
+            period=periods[0],
+            reviewer=user,
+            reviewee=user,
+            role=ReviewerRole.SELF_ASSESSMENT,
+        )
+        assert nomination.closes is None
+
+        with self.assertNumQueries(5):
+            added = schedule_default_stages(periods, start=START)
+        assert added == 17
+
+        stage = periods[0].stages.get(code=StageCode.NOMINATIONS.name)
+        assert stage.title == StageCode.NOMINATIONS.title
+        assert stage.description == StageCode.NOMINATIONS.description
+        feedback_close = periods[1].stages.get(code=StageCode.FEEDBACK_CLOSE.name)
+        assert feedback_close.date.date() == date(2022, 11, 28)
+        nomination.refresh_from_db()
+        assert nomination.closes == datetime(
+            2022, 5, 30, 23, 59, 59, tzinfo=timezone.utc
+        )
+
+        assert periods[0].add_default_stages() == 0
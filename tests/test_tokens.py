@@ -0,0 +1,113 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.utils.timezone import now
+
+from teamsite_staff_reviews.models import ExternalUserToken, hash_secret
+from teamsite_staff_reviews.schema.public.auth_mutation import RedeemTokenMutation
+
+
+class ExternalUserTokenTest(TestCase):
+    def test_secret_is_hashed(self):
+        token = ExternalUserToken.objects.create(email="someone@example.com")
+        assert token.secret
+        assert token.secret_hash == hash_secret(token.secret)
+        assert token.secret not in token.secret_hash
+
+        assert ExternalUserToken.objects.get_by_secret(token.secret) == token
+        with self.assertRaises(ExternalUserToken.DoesNotExist):
+            ExternalUserToken.objects.get_by_secret(token.secret_hash)
+
+        token.save()
+        token.refresh_from_db()
+        assert token.secret_hash == hash_secret(token.secret)
+
+    def test_purge(self):
+        old = now() - timedelta(days=30)
+        for i in range(5):
+            ExternalUserToken.objects.create(email=f"{i}@example.com", expiry=old)
+        ExternalUserToken.objects.create(
+            email="redeemed@example.com", redeemed=old, expiry=now()
+        )
+        recent = ExternalUserToken.objects.create(
+            email="recent@example.com", redeemed=now() - timedelta(days=1)
+        )
+        expired = ExternalUserToken.objects.create(
+            email="expired@example.com", expiry=now() - timedelta(days=1)
+        )
+        pending = ExternalUserToken.objects.create(email="pending@example.com")
+
+        # A select and a delete for each of the three batches, and a last select that
+        # finds nothing
+        with self.assertNumQueries(2 * 3 + 1):
+            assert ExternalUserToken.objects.purge(batch_size=2) == 6
+        assert set(ExternalUserToken.objects.all()) == {recent, expired, pending}
+
+        call_command("purge-tokens", "--keep-days", "0")
+        assert list(ExternalUserToken.objects.all()) == [pending]
+
+    def test_purge_batches(self):
+        old = now() - timedelta(days=30)
+        ExternalUserToken.objects.bulk_create(
+            ExternalUserToken(
+                email=f"{i}@example.com", secret_hash=hash_secret(str(i)), expiry=old
+            )
+            for i in range(100)
+        )
+        pending = ExternalUserToken.objects.create(email="pending@example.com")
+
+        # The number of queries depends on the number of batches, not of tokens
+        with self.assertNumQueries(2 * 4 + 1):
+            assert ExternalUserToken.objects.purge(batch_size=25) == 100
+        assert list(ExternalUserToken.objects.all()) == [pending]
+
+    def test_redeem(self):
+        token = ExternalUserToken.objects.create(email="someone@example.com")
+        stale = ExternalUserToken.objects.get(pk=token.pk)
+
+        with self.assertNumQueries(1):
+            assert token.redeem("127.0.0.1")
+        assert token.redeemed is not None
+        token.refresh_from_db()
+        assert token.client_ip == "127.0.0.1"
+
+        # A second request that loaded the token before it was redeemed
+        assert not stale.redeem("10.0.0.1")
+        stale.refresh_from_db()
+        assert stale.client_ip == "127.0.0.1"
+
+    def test_redeem_mutation(self):
+        token = ExternalUserToken.objects.create(email="someone@example.com")
+        token.redeem()
+        info = SimpleNamespace(context=RequestFactory().post("/"))
+
+        with self.assertRaisesMessage(ValueError, "This token has already been used."):
+            RedeemTokenMutation.mutate(None, info, token=token.secret)
+
+
+class TokenSecretHashMigrationTest(TransactionTestCase):
+    app = "teamsite_staff_reviews"
+
+    def migrate(self, name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([(self.app, name)])
+        return executor.loader.project_state([(self.app, name)]).apps
+
+    def test_unapply_with_tokens(self):
+        ExternalUserToken.objects.create(email="someone@example.com")
+
+        old_apps = self.migrate("0007_lookup_indexes")
+        assert not old_apps.get_model(self.app, "ExternalUserToken").objects.exists()
+
+        old_apps.get_model(self.app, "ExternalUserToken").objects.create(
+            email="someone@example.com", secret="secret", expiry=now()
+        )
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes(self.app)[0]
+        self.migrate(latest[1])
+        assert ExternalUserToken.objects.get_by_secret("secret").email == (
+            "someone@example.com"
+        )
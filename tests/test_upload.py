@@ -0,0 +1,280 @@
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from teamsite_staff_reviews.util.upload import (
+    CHUNK_UNIT,
+    Uploader,
+    UploadQueue,
+    default_state_dir,
+    drive_item_url,
+)
+
+
+class FakeDrive:
+    """
+    Just enough of the drive upload API to exercise the uploader.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.sessions = {}
+        self.requests = []
+        # Status codes to return, in order, for the next chunk uploads. None accepts the chunk.
+        self.chunk_failures = []
+
+
+def make_handler(drive: FakeDrive):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, data=None, headers=None):
+            body = json.dumps(data or {}).encode()
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def do_POST(self):
+            drive.requests.append(
+                ("POST", self.path, self.headers.get("Authorization"))
+            )
+            self.body()
+            name = self.path.split(":/")[1]
+            session = f"/session/{len(drive.sessions)}"
+            drive.sessions[session] = dict(name=name, data=b"")
+            self.reply(200, {"uploadUrl": f"http://{self.headers['Host']}{session}"})
+
+        def do_GET(self):
+            drive.requests.append(("GET", self.path, self.headers.get("Authorization")))
+            session = drive.sessions[self.path]
+            self.reply(200, {"nextExpectedRanges": [f"{len(session['data'])}-"]})
+
+        def do_PUT(self):
+            drive.requests.append(("PUT", self.path, self.headers.get("Authorization")))
+            data = self.body()
+            if self.path.endswith(":/content"):
+                name = self.path.split(":/")[1]
+                drive.files[name] = data
+                return self.reply(201, {"name": name})
+
+            status = drive.chunk_failures.pop(0) if drive.chunk_failures else None
+            if status is not None:
+                return self.reply(status, headers={"Retry-After": "0"})
+
+            session = drive.sessions[self.path]
+            start, end, size = map(
+                int,
+                self.headers["Content-Range"]
+                .split(" ")[1]
+                .replace("/", "-")
+                .split("-"),
+            )
+            assert start == len(session["data"])
+            session["data"] += data
+            if end + 1 == size:
+                drive.files[session["name"]] = session["data"]
+                return self.reply(201, {"name": session["name"]})
+            self.reply(202, {"nextExpectedRanges": [f"{end + 1}-"]})
+
+    return Handler
+
+
+class UploaderTest(SimpleTestCase):
+    def setUp(self):
+        self.drive = FakeDrive()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self.drive))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = f"http://127.0.0.1:{self.server.server_port}"
+
+        self.dir = TemporaryDirectory()
+        self.tokens = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.dir.cleanup()
+
+    def get_token(self):
+        self.tokens.append(f"token-{len(self.tokens)}")
+        return self.tokens[-1]
+
+    def uploader(self, **kwargs):
+        kwargs.setdefault("chunk_size", CHUNK_UNIT)
+        kwargs.setdefault("simple_limit", CHUNK_UNIT)
+        return Uploader(
+            self.get_token, backoff=0, state_dir=self.dir.name + "/state", **kwargs
+        )
+
+    def write_file(self, size):
+        path = os.path.join(self.dir.name, "upload.docx")
+        data = os.urandom(size)
+        with open(path, "wb") as FILE:
+            FILE.write(data)
+        return path, data
+
+    def test_small_file(self):
+        path, data = self.write_file(1000)
+        uploader = self.uploader()
+        for name in ("a.docx", "b.docx"):
+            uploader.upload(path, drive_item_url(self.api_url, "drive", name))
+
+        assert self.drive.files == {"a.docx": data, "b.docx": data}
+        assert self.tokens == ["token-0"]
+
+    def test_chunked_upload_with_retries(self):
+        path, data = self.write_file(3 * CHUNK_UNIT + 100)
+        self.drive.chunk_failures = [429, 503]
+
+        self.uploader().upload(path, drive_item_url(self.api_url, "drive", "big.docx"))
+
+        assert self.drive.files["big.docx"] == data
+        chunk_puts = [r for r in self.drive.requests if r[1].startswith("/session/")]
+        assert len(chunk_puts) == 4 + 2
+        assert all(auth is None for _, _, auth in chunk_puts)
+
+    def test_buffer(self):
+        data = os.urandom(2 * CHUNK_UNIT + 10)
+        uploader = self.uploader()
+        uploader.upload(BytesIO(data), drive_item_url(self.api_url, "drive", "a.docx"))
+        uploader.upload(
+            BytesIO(b"small"), drive_item_url(self.api_url, "drive", "b.docx")
+        )
+        assert self.drive.files == {"a.docx": data, "b.docx": b"small"}
+
+    def test_resume(self):
+        path, data = self.write_file(3 * CHUNK_UNIT + 100)
+        url = drive_item_url(self.api_url, "drive", "big.docx")
+
+        # The second chunk keeps failing, and the upload gives up
+        self.drive.chunk_failures = [None, 500, 500]
+        uploader = self.uploader(max_retries=1)
+        with self.assertRaises(requests.HTTPError):
+            uploader.upload(path, url)
+        assert "big.docx" not in self.drive.files
+
+        self.drive.requests = []
+        self.uploader().upload(path, url)
+        assert self.drive.files["big.docx"] == data
+        assert len(self.drive.sessions) == 1
+        assert self.drive.requests[0][0] == "GET"
+        chunk_puts = [r for r in self.drive.requests if r[0] == "PUT"]
+        assert len(chunk_puts) == 3
+
+    def test_state_dir(self):
+        uploader = self.uploader()
+        path, data = self.write_file(2 * CHUNK_UNIT)
+        uploader.upload(path, drive_item_url(self.api_url, "drive", "big.docx"))
+        assert uploader.state_dir.stat().st_mode & 0o777 == 0o700
+
+    def test_shared_state_dir(self):
+        state_dir = Path(self.dir.name) / "state"
+        state_dir.mkdir(mode=0o777)
+        state_dir.chmod(0o777)
+        path, data = self.write_file(3 * CHUNK_UNIT + 100)
+        url = drive_item_url(self.api_url, "drive", "big.docx")
+
+        # Other users could read the upload url, so there is nothing to resume from
+        self.drive.chunk_failures = [None, 500, 500]
+        with self.assertLogs("teamsite_staff_reviews", "WARNING"):
+            with self.assertRaises(requests.HTTPError):
+                self.uploader(max_retries=1).upload(path, url)
+        assert not list(state_dir.iterdir())
+
+        self.drive.requests = []
+        with self.assertLogs("teamsite_staff_reviews", "WARNING"):
+            self.uploader().upload(path, url)
+        assert self.drive.files["big.docx"] == data
+        assert len(self.drive.sessions) == 2
+
+    def test_default_state_dir(self):
+        with override_settings(STAFF_REVIEWS_UPLOAD_STATE_DIR=self.dir.name):
+            assert default_state_dir() == Path(self.dir.name)
+        with override_settings(BASE_DIR=Path(self.dir.name)):
+            assert default_state_dir().parent.parent == Path(self.dir.name)
+        with override_settings(BASE_DIR=None):
+            assert default_state_dir() is None
+            path, data = self.write_file(2 * CHUNK_UNIT)
+            uploader = Uploader(self.get_token, chunk_size=CHUNK_UNIT, simple_limit=0)
+            uploader.upload(path, drive_item_url(self.api_url, "drive", "big.docx"))
+            assert self.drive.files["big.docx"] == data
+
+
+class UploadQueueTest(SimpleTestCase):
+    def test_queue(self):
+        running, peak, uploaded = [], [], []
+        lock = threading.Lock()
+
+        def upload(path, name):
+            with lock:
+                running.append(name)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(name)
+            if name == "bad":
+                raise ValueError("Rejected")
+            uploaded.append((name, open(path).read()))
+
+        with UploadQueue(max_concurrent=2) as queue:
+            with TemporaryDirectory() as dirname:
+                for name in ["a", "b", "bad", "c", "d"]:
+                    path = os.path.join(dirname, "upload.docx")
+                    with open(path, "w") as FILE:
+                        FILE.write(name)
+                    queue.submit(name, path, upload, name)
+
+        assert max(peak) == 2
+        assert sorted(uploaded) == [(n, n) for n in ["a", "b", "c", "d"]]
+        assert [r.name for r in queue.results] == ["a", "b", "bad", "c", "d"]
+        assert [r.name for r in queue.results if not r.ok] == ["bad"]
+        assert queue.summary().startswith("4 uploaded, 1 failed")
+        lines = queue.summary().splitlines()[1:]
+        assert [re.search(r"(\w+) \(\d+\.\ds\)", l)[1] for l in lines] == [
+            "a",
+            "b",
+            "bad",
+            "c",
+            "d",
+        ]
+        assert lines[2].startswith(" ** bad (") and lines[2].endswith("s): Rejected")
+
+    def test_pending_is_bounded(self):
+        release = threading.Event()
+        submitted = []
+
+        def upload(data, name):
+            release.wait(5)
+
+        with UploadQueue(max_concurrent=1, max_pending=2) as queue:
+
+            def submit():
+                for name in ["a", "b", "c", "d"]:
+                    queue.submit(name, b"", upload, name)
+                    submitted.append(name)
+
+            producer = threading.Thread(target=submit)
+            producer.start()
+            time.sleep(0.1)
+            assert submitted == ["a", "b"]
+            release.set()
+            producer.join(5)
+
+        assert submitted == ["a", "b", "c", "d"]
+        assert all(r.ok for r in queue.results)
@@ -0,0 +1,263 @@
+import time
+import zipfile
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from teamsite_staff_reviews.models import ReviewerRole
+from teamsite_staff_reviews.util.word_export.records import (
+    NominationRecord,
+    QuestionRecord,
+)
+
+# The Word export dependencies aren't part of the package requirements
+WORD_EXPORT = all(find_spec(m) for m in ("docx", "htmldocx", "marko", "humanize"))
+
+if WORD_EXPORT:
+    import docx
+    from lxml import etree
+
+    from teamsite_staff_reviews.reports.review_export.exporter import (
+        plan_grouped_reviews,
+        single_review_location,
+    )
+    from teamsite_staff_reviews.reports.review_export.planner import (
+        ExportPlan,
+        render_in_pool,
+    )
+    from teamsite_staff_reviews.util.word_export import util
+    from teamsite_staff_reviews.util.word_export.assessment import AssessmentDocument
+    from teamsite_staff_reviews.util.word_export.review import ReviewDocument
+
+CREATED = datetime(2022, 7, 1, 9, 30, tzinfo=timezone.utc)
+
+
+def make_record(pk, reviewee_id, role=ReviewerRole.WIDER_TEAM, response="Good *work*"):
+    return NominationRecord(
+        pk=pk,
+        role=role,
+        period_id=1,
+        period="2022 Mid Year",
+        period_year=2022,
+        period_round_label="Mid Year",
+        reviewee_id=reviewee_id,
+        reviewee_first_name=f"Reviewee{reviewee_id}",
+        reviewee_last_name="Smith",
+        reviewer_id=100 + pk,
+        reviewer_name=f"Reviewer{pk}",
+        reviewer_label=f"Reviewer{pk} Jones",
+        form_title=ReviewerRole(role).label,
+        form_description="Please be **constructive**.",
+        last_modified=CREATED,
+        questions=[
+            QuestionRecord(1, "How did it go?", "Think about:\n\n* delivery", response),
+            QuestionRecord(2, "What next?", None, f"Answer for {pk}"),
+        ],
+    )
+
+
+def document_parts(buffer):
+    """
+    The contents of each part of a docx file. The zip entries themselves also hold the time
+    they were written, so files rendered at different times are compared by their parts.
+    """
+    buffer.seek(0)
+    with zipfile.ZipFile(buffer) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+def body_xml(document):
+    body = document.element.body
+    return [etree.tostring(element) for element in body if element is not body.sectPr]
+
+
+@skipUnless(WORD_EXPORT, "Word export dependencies are not installed")
+class NewDocumentTest(SimpleTestCase):
+    def test_documents_are_independent(self):
+        first, second = util.new_document(), util.new_document()
+        assert util._template is not None
+
+        first.add_paragraph("Only in the first")
+        first.styles["Normal Small"].font.bold = True
+        first.sections[0].header.paragraphs[0].add_run("First header")
+
+        assert "Only in the first" not in [p.text for p in second.paragraphs]
+        assert not second.styles["Normal Small"].font.bold
+        assert "First header" not in second.sections[0].header.paragraphs[0].text
+
+        third = util.new_document()
+        assert body_xml(third) == body_xml(second)
+        assert "Only in the first" not in [p.text for p in third.paragraphs]
+
+    def test_created_time(self):
+        with mock.patch.object(util, "now", lambda: CREATED):
+            document = util.new_document()
+        footer = document.sections[0].footer.paragraphs[0]
+        assert footer.runs[0].text == "Created 01 Jul 2022 09:30\t\tPage "
+
+
+@skipUnless(WORD_EXPORT, "Word export dependencies are not installed")
+class MarkdownFragmentTest(SimpleTestCase):
+    TEXT = (
+        "Some **bold** and *italic* text.\n\n"
+        "* A point\n* Another point\n\n"
+        "> A quote"
+    )
+
+    def setUp(self):
+        util._render_fragment.cache_clear()
+
+    def render(self, text, **kwargs):
+        document = util.new_document()
+        util.add_markdown(document, text, **kwargs)
+        return body_xml(document)
+
+    def test_cached_matches_fresh(self):
+        for style_name in (None, "Small"):
+            with self.subTest(style_name):
+                fresh = self.render(self.TEXT, style_name=style_name)
+                first = self.render(self.TEXT, style_name=style_name, cache=True)
+                second = self.render(self.TEXT, style_name=style_name, cache=True)
+                assert fresh == first == second
+        assert util._render_fragment.cache_info().hits == 3
+
+    def test_links_are_not_cached(self):
+        text = "See [the guide](https://example.com/guide)."
+        assert self.render(text, cache=True) == self.render(text)
+        assert util._render_fragment(text) is None
+
+    def test_cached_is_faster(self):
+        text = "\n\n".join([self.TEXT] * 20)
+
+        def timed(**kwargs):
+            document = util.new_document()
+            started = time.perf_counter()
+            for i in range(10):
+                util.add_markdown(document, text, **kwargs)
+            return time.perf_counter() - started
+
+        fresh, cached = timed(), timed(cache=True)
+        # Typically about ten times faster; a conservative bound keeps the test stable
+        assert cached < fresh / 2, (fresh, cached)
+
+    def test_cache_size(self):
+        # Least recently used fragments are evicted, instead of the whole cache emptying
+        assert util._render_fragment.cache_info().maxsize == util.FRAGMENT_CACHE_SIZE
+
+
+@skipUnless(WORD_EXPORT, "Word export dependencies are not installed")
+class SectionGraftingTest(SimpleTestCase):
+    def test_grafted_matches_rendered(self):
+        first, second = make_record(1, 1), make_record(2, 1, response="Fine")
+        sections = {}
+        ReviewDocument(first, sections=sections)
+        assert set(sections) == {1}
+
+        with mock.patch(
+            "teamsite_staff_reviews.util.word_export.review.add_markdown",
+            wraps=util.add_markdown,
+        ) as add:
+            grafted = ReviewDocument(first, second, sections=sections)
+        # Only the second nomination is rendered: a description and two questions
+        assert add.call_count == 1 + 2 * 2
+        assert set(sections) == {1, 2}
+
+        assert body_xml(grafted._ReviewDocument__document) == body_xml(
+            ReviewDocument(first, second)._ReviewDocument__document
+        )
+
+    def test_links_are_not_shared(self):
+        record = make_record(1, 1, response="See [the guide](https://example.com).")
+        sections = {}
+        ReviewDocument(record, sections=sections)
+        assert sections == {1: None}
+
+        document = ReviewDocument(record, sections=sections)
+        assert body_xml(document._ReviewDocument__document) == body_xml(
+            ReviewDocument(record)._ReviewDocument__document
+        )
+
+
+def headings(buffer):
+    buffer.seek(0)
+    return [p.text for p in docx.Document(buffer).paragraphs if p.style.name == "Title"]
+
+
+@skipUnless(WORD_EXPORT, "Word export dependencies are not installed")
+@mock.patch("teamsite_staff_reviews.util.word_export.util.now", lambda: CREATED)
+class ExportPlanTest(SimpleTestCase):
+    def make_plan(self):
+        records = [
+            make_record(1, 1),
+            make_record(2, 1, role=ReviewerRole.PROJECT_MANAGER),
+            make_record(3, 2),
+        ]
+        plan = ExportPlan()
+        for record in records:
+            plan.add_single(record, single_review_location(record))
+        plan_grouped_reviews(plan, records)
+        return plan
+
+    def test_documents(self):
+        rendered = list(self.make_plan().render())
+
+        assert [bundle.destination[1] for bundle, _ in rendered] == [
+            "Reviewer1 - Wider Team.docx",
+            "Reviewer2 - Project Manager.docx",
+            "2022 Mid Year - Reviewee1 Smith - All Feedback.docx",
+            "Reviewer3 - Wider Team.docx",
+            "2022 Mid Year - Reviewee2 Smith - All Feedback.docx",
+        ]
+        assert [headings(buffer) for _, buffer in rendered[:3]] == [
+            ["Reviewee1 Smith\n2022 Mid Year Wider Team"],
+            ["Reviewee1 Smith\n2022 Mid Year Project Manager"],
+            [
+                "Reviewee1 Smith\n2022 Mid Year Wider Team",
+                "Reviewee1 Smith\n2022 Mid Year Project Manager",
+            ],
+        ]
+
+    def test_assessments(self):
+        plan = ExportPlan()
+        records = [make_record(1, 1, role=ReviewerRole.ASSESSMENT_PT_1)]
+        plan.add_single(records[0])
+        # Assessments have their own document and aren't in the grouped reviews
+        assert plan_grouped_reviews(plan, records) == {}
+        assert [bundle.document_class for bundle in plan.bundles] == [
+            AssessmentDocument
+        ]
+
+    def test_identical_documents_rendered_once(self):
+        plan = ExportPlan()
+        record = make_record(1, 1)
+        plan.add_single(record, "first")
+        plan.add_single(record, "second")
+
+        with mock.patch.object(
+            ReviewDocument, "save", autospec=True, side_effect=ReviewDocument.save
+        ) as save:
+            rendered = list(plan.render())
+        assert save.call_count == 1
+        assert [bundle.destination for bundle, _ in rendered] == ["first", "second"]
+        assert document_parts(rendered[0][1]) == document_parts(rendered[1][1])
+
+    def test_workers(self):
+        in_process = list(self.make_plan().render())
+        in_pool = list(self.make_plan().render(workers=2))
+
+        assert [b.destination for b, _ in in_pool] == [
+            b.destination for b, _ in in_process
+        ]
+        assert [document_parts(buffer) for _, buffer in in_pool] == [
+            document_parts(buffer) for _, buffer in in_process
+        ]
+
+
+@skipUnless(WORD_EXPORT, "Word export dependencies are not installed")
+class RenderInPoolTest(SimpleTestCase):
+    def test_order(self):
+        jobs = list(range(-10, 10))
+        assert list(render_in_pool(abs, jobs)) == [abs(j) for j in jobs]
+        assert list(render_in_pool(abs, jobs, workers=2)) == [abs(j) for j in jobs]
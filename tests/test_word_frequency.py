@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from teamsite_staff_reviews.models import (
+    Nomination,
+    ReviewerRole,
+    ReviewFormResponse,
+    ReviewPeriod,
+    ReviewRound,
+)
+from teamsite_staff_reviews.reports.word_frequency import (
+    response_values,
+    tokenize,
+    word_frequencies,
+)
+
+User = get_user_model()
+
+
+class TokenizeTest(SimpleTestCase):
+    def test_tokenize(self):
+        text = "I've enjoyed REVIEWING the projects,\nwith teams' help! 2022"
+        assert list(tokenize(text)) == ["enjoyed", "review", "project", "team", "help"]
+
+    def test_expansion(self):
+        assert list(tokenize("Working at SF")) == ["work", "social", "finance"]
+
+    def test_empty(self):
+        assert list(tokenize(None)) == []
+        assert list(tokenize(" \n ")) == []
+
+
+class WordFrequencyTest(TestCase):
+    def setUp(self):
+        self.periods = [
+            ReviewPeriod.objects.create(year=2022, round=round)
+            for round in (ReviewRound.MID_YEAR, ReviewRound.FULL_YEAR)
+        ]
+        user = User.objects.create(username="reviewee")
+        for period in self.periods:
+            period.add_forms()
+            for role in (ReviewerRole.SELF_ASSESSMENT, ReviewerRole.PROJECT_MANAGER):
+                nomination = Nomination.objects.create(
+                    period=period,
+                    reviewee=user,
+                    reviewer=User.objects.create(username=f"{period.pk}{role}"),
+                    role=role,
+                )
+                for question in period.get_form(role).questions.all():
+                    ReviewFormResponse.objects.create(
+                        nomination=nomination,
+                        question=question,
+                        value=f"{period.round_label} {role} answers",
+                    )
+
+    def test_counts(self):
+        counter = word_frequencies(response_values())
+        responses = ReviewFormResponse.objects.count()
+        assert counter["answer"] == responses
+        assert counter["mid"] + counter["full"] == responses
+
+    def test_filters(self):
+        period = self.periods[0]
+        counter = word_frequencies(
+            response_values(period=period, role=ReviewerRole.PROJECT_MANAGER)
+        )
+        assert set(counter) == {"mid", "year", "pm", "answer"}
+        assert counter["pm"] == period.get_form("PM").questions.count()
+
+        question = period.get_form("PM").questions.first()
+        counter = word_frequencies(
+            response_values(period=period, question=question.title)
+        )
+        assert (
+            counter["answer"]
+            == ReviewFormResponse.objects.filter(
+                nomination__period=period, question__title__icontains=question.title
+            ).count()
+        )